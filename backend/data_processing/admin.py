@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import LLMInstructionLog, UploadedFile
+from .models import LLMCacheEntry, LLMInstructionLog, UploadedFile
 
 
 @admin.register(UploadedFile)
@@ -12,3 +12,9 @@ class UploadedFileAdmin(admin.ModelAdmin):
 class LLMInstructionLogAdmin(admin.ModelAdmin):
     list_display = ["id", "file", "success", "user_instruction", "created_at"]
     search_fields = ["user_instruction"]
+
+
+@admin.register(LLMCacheEntry)
+class LLMCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ["key", "user_instruction", "hits", "last_used_at"]
+    search_fields = ["user_instruction"]
@@ -1,6 +1,28 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 
 class DataProcessingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "data_processing"
+
+    def ready(self):
+        if _serves_requests():
+            from .jobs import modification_job_runner
+
+            modification_job_runner.start()
+
+
+def _serves_requests():
+    """Whether this process serves requests, so should run background jobs.
+
+    Management commands other than runserver do not, nor does runserver's
+    autoreloading parent process.
+    """
+    if os.path.basename(sys.argv[0]) != "manage.py":
+        return True
+    if sys.argv[1:2] != ["runserver"]:
+        return False
+    return os.environ.get("RUN_MAIN") == "true" or "--noreload" in sys.argv
@@ -0,0 +1,305 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+
+from .file_cache import iter_dataframe_chunks
+from .file_io import CHUNK_ROWS
+from .models import UploadedFile
+
+logger = logging.getLogger(__name__)
+
+# Smallest hashes kept per column for the distinct-count (KMV) estimate
+DISTINCT_SKETCH_SIZE = 1024
+# Counters kept per column for the most common values and shapes
+HEAVY_HITTER_CAPACITY = 64
+# Values per chunk whose shape is taken; shapes of free text vary little
+SHAPE_SAMPLE_ROWS = 1_000
+TOP_VALUES = 5
+TOP_SHAPES = 3
+MAX_VALUE_CHARS = 40
+MAX_SHAPE_CHARS = 20
+
+# Profiled type -> the dtype a whole-file read gives such a column; boolean
+# columns are left to inference, which reads True/False the same either way
+_DTYPE_BY_TYPE = {
+    "integer": "int64",
+    "float": "float64",
+    "string": "object",
+    "empty": "float64",
+}
+_TYPE_BY_KIND = {
+    "i": "integer",
+    "u": "integer",
+    "f": "float",
+    "b": "boolean",
+    "M": "datetime",
+}
+
+
+def value_shapes(values):
+    """Shape of each string: digits become 9, ASCII letters a or A, e.g. 999-999-9999"""
+    return (
+        values.str.slice(0, MAX_SHAPE_CHARS)
+        .str.replace(r"[0-9]", "9", regex=True)
+        .str.replace(r"[a-z]", "a", regex=True)
+        .str.replace(r"[A-Z]", "A", regex=True)
+    )
+
+
+class HeavyHitters:
+    """Mergeable Misra-Gries summary of the most frequent items.
+
+    Counts are lower bounds that undercount by at most total / capacity, so
+    any item making up more than that share of the stream is kept.
+    """
+
+    def __init__(self, capacity=HEAVY_HITTER_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+
+    def update(self, counts):
+        """Merge a value_counts() result into the summary"""
+        merged = self.counts.add(self._reduce(counts), fill_value=0)
+        self.counts = self._reduce(merged.astype("int64"))
+
+    def most_common(self, n):
+        """Up to n items seen more than once, most frequent first"""
+        counts = self.counts[self.counts > 1]
+        return list(counts.sort_values(ascending=False, kind="stable")[:n].items())
+
+    def _reduce(self, counts):
+        if len(counts) <= self.capacity:
+            return counts
+        counts = counts.sort_values(ascending=False, kind="stable")
+        cutoff = counts.iloc[self.capacity]
+        counts = counts.iloc[: self.capacity] - cutoff
+        return counts[counts > 0]
+
+
+class ColumnProfiler:
+    """Streaming per-column profile of a table, fed one chunk at a time.
+
+    Memory is bounded per column whatever the row count: a KMV sketch of
+    DISTINCT_SKETCH_SIZE hashes and two HeavyHitters summaries.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._columns = {}
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for position, name in enumerate(chunk.columns):
+            values = chunk.iloc[:, position]
+            state = self._columns.get(name)
+            if state is None:
+                state = self._columns[name] = {
+                    "types": set(),
+                    "nulls": 0,
+                    "hashes": np.empty(0, dtype=np.uint64),
+                    "values": HeavyHitters(),
+                    "shapes": HeavyHitters(),
+                    "shaped": 0,
+                }
+            self._update_column(state, values)
+
+    def _update_column(self, state, values):
+        non_null = values.dropna()
+        state["nulls"] += len(values) - len(non_null)
+        state["types"].add(self._column_type(non_null))
+        if not len(non_null):
+            return
+        state["hashes"] = update_distinct_sketch(
+            state["hashes"],
+            pd.util.hash_pandas_object(non_null, index=False).to_numpy(),
+        )
+        # Counted as they are; only the values reported get turned into text
+        state["values"].update(non_null.value_counts(sort=False))
+        step = max(len(non_null) // SHAPE_SAMPLE_ROWS, 1)
+        sample = non_null.iloc[::step].astype(str)
+        state["shaped"] += len(sample)
+        state["shapes"].update(value_shapes(sample).value_counts(sort=False))
+
+    def _column_type(self, values):
+        if not len(values):
+            return None
+        if values.dtype.kind == "O":
+            inferred = pd.api.types.infer_dtype(values, skipna=True)
+            if inferred == "boolean":
+                return "boolean"
+            return "string"
+        return _TYPE_BY_KIND.get(values.dtype.kind, "string")
+
+    def result(self):
+        """The profile as JSON-serializable data"""
+        return {
+            "rows": self.rows,
+            "columns": [
+                self._column_result(name, state)
+                for name, state in self._columns.items()
+            ],
+        }
+
+    def _column_result(self, name, state):
+        types = state["types"] - {None}
+        if types <= {"integer"} and types:
+            column_type = "integer"
+        elif types and types <= {"integer", "float"}:
+            column_type = "float"
+        elif len(types) == 1:
+            column_type = types.pop()
+        else:
+            column_type = "string" if types else "empty"
+        non_null = self.rows - state["nulls"]
+        return {
+            "name": str(name),
+            "type": column_type,
+            "null_rate": state["nulls"] / self.rows if self.rows else 0,
+            "distinct": estimate_distinct(state["hashes"]),
+            "top_values": [
+                [str(value)[:MAX_VALUE_CHARS], count / non_null]
+                for value, count in state["values"].most_common(TOP_VALUES)
+            ],
+            "shapes": [
+                [shape, count / state["shaped"]]
+                for shape, count in state["shapes"].most_common(TOP_SHAPES)
+            ],
+        }
+
+
+def update_distinct_sketch(sketch, hashes):
+    """Merge a chunk's value hashes into the sorted sketch of smallest hashes"""
+    if len(sketch) == DISTINCT_SKETCH_SIZE:
+        hashes = hashes[hashes < sketch[-1]]
+    hashes = pd.unique(hashes)
+    if len(hashes) > DISTINCT_SKETCH_SIZE:
+        hashes = np.partition(hashes, DISTINCT_SKETCH_SIZE)[:DISTINCT_SKETCH_SIZE]
+    return np.unique(np.concatenate([sketch, hashes]))[:DISTINCT_SKETCH_SIZE]
+
+
+def profile_dtypes(profile):
+    """Column name -> dtype of the profiled file, for reading parts of it alike"""
+    return {
+        column["name"]: _DTYPE_BY_TYPE[column["type"]]
+        for column in profile["columns"]
+        if column["type"] in _DTYPE_BY_TYPE
+    }
+
+
+def estimate_distinct(hashes):
+    """Distinct count from the smallest distinct 64-bit hashes (KMV estimate)"""
+    if len(hashes) < DISTINCT_SKETCH_SIZE:
+        return len(hashes)
+    kth_smallest = float(hashes[DISTINCT_SKETCH_SIZE - 1]) / 2.0**64
+    return int(round((DISTINCT_SKETCH_SIZE - 1) / kth_smallest))
+
+
+def profile_chunks(chunks):
+    """Profile an iterable of DataFrame chunks in one pass"""
+    profiler = ColumnProfiler()
+    for chunk in chunks:
+        profiler.update(chunk)
+    return profiler.result()
+
+
+def profile_upload(file_obj):
+    """Profile an UploadedFile by streaming it chunk by chunk"""
+    return profile_chunks(iter_dataframe_chunks(file_obj))
+
+
+def format_profile(profile):
+    """Render a profile as compact prompt text, one line per column"""
+    lines = []
+    for column in profile["columns"]:
+        distinct = column["distinct"]
+        approx = "~" if distinct >= DISTINCT_SKETCH_SIZE else ""
+        line = (
+            f"- {column['name']} ({column['type']}, "
+            f"{column['null_rate']:.0%} null, {approx}{distinct} distinct)"
+        )
+        if column["top_values"]:
+            line += "; top: " + ", ".join(
+                f"{value!r} {share:.0%}" for value, share in column["top_values"]
+            )
+        if column["shapes"]:
+            line += "; shapes: " + ", ".join(
+                f"{shape!r} {share:.0%}" for shape, share in column["shapes"]
+            )
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def describe_data(df, preview_rows, profile=None, columns=None):
+    """The data section of an LLM prompt: the column profile, else the first rows.
+
+    columns limits it to some of df's columns.
+    """
+    if profile:
+        if columns is not None:
+            shown = {str(column) for column in columns}
+            profile = dict(
+                profile,
+                columns=[c for c in profile["columns"] if c["name"] in shown],
+            )
+        return (
+            "Column profile (type, null rate, distinct values, most common values "
+            "and value shapes, where 9 is a digit and a/A a letter):\n"
+            + format_profile(profile)
+        )
+    if columns is not None:
+        df = df.loc[:, list(columns)]
+    return "Sample data (first few rows):\n" + df.head(preview_rows).to_string(
+        index=False
+    )
+
+
+def ensure_column_profile(file_obj, df=None):
+    """file_obj's profile, computed and saved on first use; None if unreadable.
+
+    df, the whole file when already loaded, is profiled instead of reading
+    the file again. A failure is saved too, as {"error": ...}, so an
+    unreadable file is not scanned again on every prompt.
+    """
+    if file_obj.column_profile is None:
+        file_obj.column_profile = compute_column_profile(file_obj, df)
+        UploadedFile.objects.filter(pk=file_obj.pk).update(
+            column_profile=file_obj.column_profile
+        )
+    return saved_profile(file_obj)
+
+
+async def aensure_column_profile(file_obj, df=None):
+    """ensure_column_profile for async views; the scan runs in a thread pool,
+    off the thread shared by every thread-sensitive sync_to_async call"""
+    if file_obj.column_profile is None:
+        file_obj.column_profile = await sync_to_async(
+            compute_column_profile, thread_sensitive=False
+        )(file_obj, df)
+        await UploadedFile.objects.filter(pk=file_obj.pk).aupdate(
+            column_profile=file_obj.column_profile
+        )
+    return saved_profile(file_obj)
+
+
+def compute_column_profile(file_obj, df=None):
+    """Profile df, or file_obj streamed chunk by chunk; {"error": ...} on failure"""
+    try:
+        if df is not None:
+            return profile_chunks(
+                df.iloc[start : start + CHUNK_ROWS]
+                for start in range(0, max(len(df), 1), CHUNK_ROWS)
+            )
+        return profile_upload(file_obj)
+    except Exception as e:
+        logger.exception("Could not profile uploaded file %s", file_obj.pk)
+        return {"error": str(e)}
+
+
+def saved_profile(file_obj):
+    """file_obj's saved profile, or None if it has none or profiling failed"""
+    profile = file_obj.column_profile
+    if not profile or "error" in profile:
+        return None
+    return profile
@@ -0,0 +1,99 @@
+import re
+
+from django.conf import settings
+
+# Words that say what to do rather than which column to do it to
+_STOPWORDS = set(
+    "a all an and as at by change column columns convert each every field fields "
+    "for format from in into is it make of on or remove replace that the their "
+    "them to value values with".split()
+)
+# A column scores this much when its whole name appears in the instruction,
+# and this much when one of its common values does
+NAME_MATCH_BONUS = 1.0
+VALUE_MATCH_BONUS = 0.5
+
+
+def tokenize(text):
+    """Lowercase word tokens, splitting snake_case and camelCase, minus stopwords"""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(text))
+    return [
+        token
+        for token in re.findall(r"[a-z0-9]+", text.lower())
+        if token not in _STOPWORDS
+    ]
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(left, right):
+    """Jaccard similarity of two tokens' character trigrams"""
+    return len(left & right) / len(left | right)
+
+
+class ColumnRanker:
+    """Ranks a table's columns by lexical relevance to an instruction.
+
+    Each column token is matched to its most similar instruction token by
+    character trigrams, so "emails" finds customer_email and "zip" finds
+    ZipCode. Columns whose whole name, or one of whose profiled common
+    values, appears in the instruction score extra. Runs locally and costs
+    microseconds per column.
+    """
+
+    def __init__(self, columns, profile=None):
+        self.columns = list(columns)
+        self._names = [" ".join(tokenize(column)) for column in self.columns]
+        self._tokens = [
+            [(token, _trigrams(token)) for token in name.split()]
+            for name in self._names
+        ]
+        common_values = {}
+        for column in (profile or {}).get("columns", []):
+            common_values[column["name"]] = {
+                token
+                for value, _ in column["top_values"]
+                for token in tokenize(value)
+                if len(token) > 2
+            }
+        self._values = [common_values.get(str(column), set()) for column in columns]
+
+    def scores(self, instruction):
+        tokens = tokenize(instruction)
+        grams = [_trigrams(token) for token in set(tokens)]
+        text = f" {' '.join(tokens)} "
+        scores = []
+        for name, column_tokens, values in zip(self._names, self._tokens, self._values):
+            if not column_tokens or not grams:
+                scores.append(0.0)
+                continue
+            score = sum(
+                max(_similarity(trigrams, other) for other in grams)
+                for _, trigrams in column_tokens
+            ) / len(column_tokens)
+            if f" {name} " in text:
+                score += NAME_MATCH_BONUS
+            if values & set(tokens):
+                score += VALUE_MATCH_BONUS
+            scores.append(score)
+        return scores
+
+    def top(self, instructions, limit):
+        """The limit best columns for any of instructions, in table order"""
+        best = [0.0] * len(self.columns)
+        for instruction in instructions:
+            best = [max(pair) for pair in zip(best, self.scores(instruction))]
+        ranked = sorted(range(len(self.columns)), key=lambda i: -best[i])
+        return [self.columns[i] for i in sorted(ranked[:limit])]
+
+
+def prompt_columns(instructions, columns, profile=None):
+    """The columns to show the LLM for instructions: all of them unless too many"""
+    columns = list(columns)
+    limit = settings.LLM_PROMPT_MAX_COLUMNS
+    if len(columns) <= limit:
+        return columns
+    return ColumnRanker(columns, profile).top(instructions, limit)
@@ -0,0 +1,59 @@
+import io
+
+# Leading bytes of each supported codec's stream -> pyarrow codec name
+MAGIC_BYTES = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+# Codec -> file name suffix for compressed outputs
+COMPRESSION_SUFFIXES = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+
+def detect_compression(file_path):
+    """Return "gzip" or "zstd" if the file starts with that codec's magic bytes"""
+    with open(file_path, "rb") as f:
+        head = f.read(4)
+    for magic, codec in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def open_binary(file_path):
+    """Open a file for reading bytes, decompressing gzip or zstd on the fly.
+
+    Nothing is decompressed to disk; pyarrow inflates the stream as it is
+    read, so memory stays bounded by the reader's buffer.
+    """
+    compression = detect_compression(file_path)
+    if compression is None:
+        return open(file_path, "rb")
+    import pyarrow as pa
+
+    return pa.input_stream(file_path, compression=compression)
+
+
+def open_text(file_path):
+    """Text counterpart of open_binary, decoded the way the CSV readers expect"""
+    return io.TextIOWrapper(
+        open_binary(file_path), encoding="utf-8-sig", errors="replace", newline=""
+    )
+
+
+def open_compressed_output(file_path, compression):
+    """Open file_path for writing bytes through a gzip or zstd encoder"""
+    import pyarrow as pa
+
+    return pa.output_stream(file_path, compression=compression)
+
+
+def strip_compression_suffix(filename):
+    """Drop a trailing .gz or .zst from filename, e.g. data.csv.gz -> data.csv"""
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if filename.lower().endswith(suffix):
+            return filename[: -len(suffix)]
+    return filename
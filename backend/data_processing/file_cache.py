@@ -0,0 +1,330 @@
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+
+from .file_io import (
+    CHUNK_ROWS,
+    arrow_to_frame,
+    iter_csv_chunks,
+    iter_feather_chunks,
+    iter_xlsx_chunks,
+    read_dataframe,
+    read_parquet,
+)
+from .file_metadata import AmbiguousCSVError
+from .row_index import (
+    build_csv_row_index,
+    iter_csv_positions,
+    read_csv_rows,
+    read_csv_rows_slow,
+)
+
+
+class ParsedFileCache:
+    """Columnar (Parquet) copies of uploaded files, evicted in LRU order.
+
+    Entries are keyed by the upload's content hash (or primary key, if it
+    has none yet) plus the mtime and size of the stored file, so duplicate
+    uploads sharing one blob share their entries too, and a replaced file
+    never serves stale data. Every hit bumps the entry's mtime, which is
+    what eviction orders by. CSV uploads can also get a sparse row index
+    under the same key, used to page through them without a Parquet copy.
+    Parquet uploads need no copy at all and are read in place.
+    """
+
+    suffix = ".parquet"
+    row_index_suffix = ".rows.npy"
+    row_group_size = 100_000
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def cache_dir(self):
+        return Path(self._cache_dir or settings.PARSED_FILE_CACHE_DIR)
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return settings.PARSED_FILE_CACHE_MAX_BYTES
+
+    def content_key(self, file_obj):
+        return file_obj.content_hash or str(file_obj.pk)
+
+    def cache_key(self, file_obj):
+        stat = os.stat(file_obj.file.path)
+        return f"{self.content_key(file_obj)}_{stat.st_mtime_ns}_{stat.st_size}"
+
+    def path_for(self, file_obj):
+        return self.cache_dir / f"{self.cache_key(file_obj)}{self.suffix}"
+
+    def lookup(self, file_obj):
+        """Return the cached Parquet path for file_obj, or None on a miss"""
+        if file_obj.file_type == "parquet":
+            return Path(file_obj.file.path)
+        path = self.path_for(file_obj)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def load(self, file_obj, nrows=None, columns=None):
+        """Load file_obj as a DataFrame, building the cache entry on a full read.
+
+        Partial reads (``nrows``) never trigger a build: parsing a multi-GB
+        file to show its first rows would defeat the point of the cache.
+        ``columns`` narrows the result, and columnar sources only read those.
+        """
+        path = self.lookup(file_obj)
+        if path is not None:
+            return read_parquet(path, nrows=nrows, columns=columns)
+        if nrows is not None:
+            return read_dataframe(
+                file_obj.file.path, file_obj.file_type, nrows=nrows, columns=columns
+            )
+        with self._lock_for(self.content_key(file_obj)):
+            path = self.lookup(file_obj)
+            if path is not None:
+                return read_parquet(path, columns=columns)
+            df = read_dataframe(file_obj.file.path, file_obj.file_type)
+            self.store(file_obj, df)
+        return df if columns is None else df[columns]
+
+    def iter_chunks(self, file_obj, chunksize=CHUNK_ROWS):
+        """Yield file_obj as DataFrame chunks without loading it whole.
+
+        A warm cache entry is streamed by record batch; otherwise CSV, .xlsx
+        and Feather uploads are streamed straight from the source, and legacy
+        .xls ones are loaded whole and sliced. At least one (possibly empty) chunk
+        is always yielded so callers see the columns.
+        """
+        path = self.lookup(file_obj)
+        if path is not None:
+            parquet_file = pq.ParquetFile(path)
+            empty = True
+            for batch in parquet_file.iter_batches(batch_size=chunksize):
+                empty = False
+                yield arrow_to_frame(batch)
+            if empty:
+                yield arrow_to_frame(parquet_file.schema_arrow.empty_table())
+        elif file_obj.file_type == "csv":
+            yield from iter_csv_chunks(file_obj.file.path, chunksize=chunksize)
+        elif file_obj.file_type == "feather":
+            yield from iter_feather_chunks(file_obj.file.path, chunksize=chunksize)
+        elif file_obj.file.path.endswith(".xlsx"):
+            yield from iter_xlsx_chunks(file_obj.file.path, chunksize=chunksize)
+        else:
+            df = self.load(file_obj)
+            for start in range(0, max(len(df), 1), chunksize):
+                yield df.iloc[start : start + chunksize]
+
+    def read_rows(self, file_obj, offset, limit, columns=None):
+        """Read rows [offset, offset + limit) of file_obj in time independent of offset.
+
+        Warm entries are read by Parquet row group; cold CSVs seek through
+        their row index. Other files get a cache entry built first.
+        """
+        path = self.lookup(file_obj)
+        if path is None and file_obj.file_type == "csv":
+            row_index = self.row_index(file_obj)
+            if not len(row_index):
+                df = read_csv_rows_slow(
+                    file_obj.file.path, offset, limit, chunksize=CHUNK_ROWS
+                )
+            else:
+                df = read_csv_rows(file_obj.file.path, row_index, offset, limit)
+            return df if columns is None else df[columns]
+        if path is None:
+            df = self.load(file_obj)
+            path = self.lookup(file_obj)
+            if path is None:
+                df = df.iloc[offset : offset + limit].reset_index(drop=True)
+                return df if columns is None else df[columns]
+        return self._read_range(path, offset, limit, columns)
+
+    def iter_positions(self, file_obj, positions, columns=None, dtypes=None):
+        """Yield the rows at positions, one storage block at a time.
+
+        Blocks are Parquet row groups, or stretches between CSV row index
+        checkpoints, and are visited in the order their first position
+        appears, so shuffled positions give a random block order. Each
+        DataFrame is indexed by row position. dtypes, the whole file's, are
+        applied to CSV stretches. A file with neither is loaded whole and
+        yielded as one block.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        path = self.lookup(file_obj)
+        if path is None and file_obj.file_type == "csv":
+            row_index = self.row_index(file_obj)
+            if len(row_index):
+                yield from iter_csv_positions(
+                    file_obj.file.path,
+                    row_index,
+                    positions,
+                    usecols=columns,
+                    dtype=dtypes,
+                )
+                return
+        if path is None:
+            df = self.load(file_obj, columns=columns)
+            path = self.lookup(file_obj)
+            if path is None:
+                yield df.iloc[np.sort(positions)].set_axis(np.sort(positions))
+                return
+        parquet_file = pq.ParquetFile(path)
+        sizes = [
+            parquet_file.metadata.row_group(group).num_rows
+            for group in range(parquet_file.metadata.num_row_groups)
+        ]
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        groups = np.searchsorted(starts, positions, side="right") - 1
+        for group in pd.unique(groups):
+            wanted = np.sort(positions[groups == group])
+            table = parquet_file.read_row_group(int(group), columns=columns)
+            rows = arrow_to_frame(table.take(wanted - starts[group]))
+            yield rows.set_axis(wanted)
+
+    def reads_positions(self, file_obj):
+        """Whether iter_positions reads file_obj block by block, not whole"""
+        if self.lookup(file_obj) is not None:
+            return True
+        return file_obj.file_type == "csv" and len(self.row_index(file_obj)) > 0
+
+    def row_index(self, file_obj):
+        """The CSV row index for file_obj, built on first use.
+
+        An empty index means the file could not be indexed (or has no rows).
+        """
+        path = self.cache_dir / f"{self.cache_key(file_obj)}{self.row_index_suffix}"
+        try:
+            return np.load(path)
+        except FileNotFoundError:
+            pass
+        with self._lock_for(self.content_key(file_obj)):
+            try:
+                return np.load(path)
+            except FileNotFoundError:
+                pass
+            try:
+                row_index = build_csv_row_index(file_obj.file.path)
+            except AmbiguousCSVError:
+                row_index = np.empty(0, dtype=np.int64)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = _temp_path_for(path)
+            with open(temp_path, "wb") as f:
+                np.save(f, row_index)
+            os.replace(temp_path, path)
+        return row_index
+
+    def store(self, file_obj, df):
+        """Write df as the cache entry for file_obj; returns False if unsupported"""
+        path = self.path_for(file_obj)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = _temp_path_for(path)
+        try:
+            df.to_parquet(temp_path, index=False, row_group_size=self.row_group_size)
+        except (ValueError, TypeError, pa.ArrowException):
+            # Mixed-type object columns and non-string headers cannot be
+            # represented in Parquet; such files are simply read uncached.
+            temp_path.unlink(missing_ok=True)
+            return False
+        self._remove_entries(file_obj, (self.suffix,))
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+        return True
+
+    def invalidate(self, file_obj):
+        """Remove every cache entry and row index built from file_obj's content"""
+        self._remove_entries(file_obj, (self.suffix, self.row_index_suffix))
+
+    def _remove_entries(self, file_obj, suffixes):
+        for suffix in suffixes:
+            pattern = f"{self.content_key(file_obj)}_*{suffix}"
+            for path in self.cache_dir.glob(pattern):
+                path.unlink(missing_ok=True)
+
+    def evict(self, keep=None):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        entries = []
+        paths = list(self.cache_dir.glob(f"*{self.suffix}"))
+        paths += self.cache_dir.glob(f"*{self.row_index_suffix}")
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _read_range(self, path, offset, limit, columns=None):
+        parquet_file = pq.ParquetFile(path)
+        groups, first_row, start = [], None, 0
+        for group in range(parquet_file.metadata.num_row_groups):
+            num_rows = parquet_file.metadata.row_group(group).num_rows
+            if start + num_rows > offset and start < offset + limit:
+                if first_row is None:
+                    first_row = start
+                groups.append(group)
+            start += num_rows
+        if not groups:
+            table = parquet_file.schema_arrow.empty_table()
+            if columns is not None:
+                table = table.select(columns)
+        else:
+            table = parquet_file.read_row_groups(groups, columns=columns)
+            table = table.slice(offset - first_row, limit)
+        return arrow_to_frame(table)
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+
+parsed_file_cache = ParsedFileCache()
+
+
+def load_dataframe(file_obj, nrows=None, columns=None):
+    """Load an UploadedFile as a DataFrame through the parsed-file cache"""
+    return parsed_file_cache.load(file_obj, nrows=nrows, columns=columns)
+
+
+def load_rows(file_obj, offset, limit, columns=None):
+    """Read a page of an UploadedFile's rows through the parsed-file cache"""
+    return parsed_file_cache.read_rows(file_obj, offset, limit, columns=columns)
+
+
+def _temp_path_for(path):
+    """A new, uniquely named file next to path to write it through.
+
+    Unique across processes as well as threads, so workers building the
+    same entry at once never write into each other's file.
+    """
+    fd, temp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    os.close(fd)
+    return Path(temp_path)
+
+
+def iter_dataframe_chunks(file_obj, chunksize=CHUNK_ROWS):
+    """Stream an UploadedFile as DataFrame chunks through the parsed-file cache"""
+    return parsed_file_cache.iter_chunks(file_obj, chunksize=chunksize)
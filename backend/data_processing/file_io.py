@@ -0,0 +1,480 @@
+import pickle
+import tempfile
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.io.parsers import TextParser
+
+from .compression import open_binary, open_compressed_output
+
+CHUNK_ROWS = 100_000
+
+
+def read_dataframe(file_path, file_type, nrows=None, columns=None):
+    """Read a raw upload into a DataFrame, optionally only some of its columns.
+
+    Parquet and Feather files read just the requested columns; row-based
+    formats are parsed whole and then narrowed.
+    """
+    if file_type == "parquet":
+        return read_parquet(file_path, nrows=nrows, columns=columns)
+    if file_type == "feather":
+        return read_feather(file_path, nrows=nrows, columns=columns)
+    if file_type == "csv":
+        with open_binary(file_path) as f:
+            df = pd.read_csv(f, nrows=nrows)
+    elif file_type == "excel":
+        if file_path.endswith(".xlsx"):
+            df = read_xlsx(file_path, nrows=nrows)
+        else:
+            df = pd.read_excel(file_path, nrows=nrows, engine="xlrd")
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    return df if columns is None else df[columns]
+
+
+def arrow_to_frame(table):
+    """Convert an Arrow table or batch to a DataFrame like the other readers give.
+
+    Index columns stored by pandas become ordinary columns again, since
+    every upload is handled as a flat table.
+    """
+    df = table.to_pandas()
+    if not isinstance(df.index, pd.RangeIndex):
+        df = df.reset_index()
+    elif df.index.start != 0 or df.index.step != 1:
+        df = df.reset_index(drop=True)
+    # Arrow hands back nulls in string columns as None, whereas pandas' own
+    # readers use NaN; keep the readers interchangeable for astype(str) etc.
+    for column in df.select_dtypes(include="object").columns:
+        df[column] = df[column].where(df[column].notna(), np.nan)
+    return df
+
+
+def read_parquet(file_path, nrows=None, columns=None):
+    """Read a Parquet file, stopping after nrows rows and reading only columns"""
+    if nrows is None:
+        return arrow_to_frame(pq.read_table(file_path, columns=columns))
+    parquet_file = pq.ParquetFile(file_path)
+    batches, remaining = [], nrows
+    for batch in parquet_file.iter_batches(batch_size=nrows, columns=columns):
+        if remaining <= 0:
+            break
+        batches.append(batch.slice(0, remaining))
+        remaining -= batch.num_rows
+    schema = parquet_file.schema_arrow
+    if columns is not None:
+        schema = pa.schema([schema.field(column) for column in columns])
+    return arrow_to_frame(pa.Table.from_batches(batches, schema=schema))
+
+
+def read_feather(file_path, nrows=None, columns=None):
+    """Read an Arrow IPC (Feather v2) file, decoding only the requested columns"""
+    with pa.memory_map(file_path) as source:
+        reader = _open_ipc(source, columns)
+        if nrows is None:
+            table = reader.read_all()
+        else:
+            batches, remaining = [], nrows
+            for index in range(reader.num_record_batches):
+                if remaining <= 0:
+                    break
+                batch = reader.get_batch(index).slice(0, remaining)
+                batches.append(batch)
+                remaining -= batch.num_rows
+            table = pa.Table.from_batches(batches, schema=reader.schema)
+        if columns is not None:
+            table = table.select(columns)
+        return arrow_to_frame(table)
+
+
+def iter_feather_chunks(file_path, chunksize=CHUNK_ROWS):
+    """Yield an Arrow IPC file in DataFrame chunks of chunksize rows.
+
+    The file is memory-mapped and its record batches are regrouped to
+    chunksize rows. At least one (possibly empty) chunk is yielded.
+    """
+    with pa.memory_map(file_path) as source:
+        reader = pa.ipc.open_file(source)
+        pending, pending_rows, yielded = [], 0, False
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            while batch.num_rows:
+                take = min(chunksize - pending_rows, batch.num_rows)
+                pending.append(batch.slice(0, take))
+                pending_rows += take
+                batch = batch.slice(take)
+                if pending_rows == chunksize:
+                    yield arrow_to_frame(pa.Table.from_batches(pending))
+                    pending, pending_rows, yielded = [], 0, True
+        if pending or not yielded:
+            yield arrow_to_frame(pa.Table.from_batches(pending, schema=reader.schema))
+
+
+def _open_ipc(source, columns=None):
+    if columns is None:
+        return pa.ipc.open_file(source)
+    schema = pa.ipc.open_file(source).schema
+    fields = sorted(schema.get_field_index(column) for column in columns)
+    if -1 in fields:
+        missing = [column for column in columns if column not in schema.names]
+        raise KeyError(f"Columns not found: {missing}")
+    options = pa.ipc.IpcReadOptions(included_fields=fields)
+    return pa.ipc.open_file(source, options=options)
+
+
+def iter_csv_chunks(file_path, chunksize=CHUNK_ROWS):
+    """Yield a CSV in DataFrame chunks whose dtypes match a whole-file read.
+
+    Left alone, read_csv infers dtypes per chunk, so an integer column with a
+    gap far down the file reads as int in early chunks and float later, and
+    stringifies differently from a single read_csv. A first pass collects the
+    dtypes seen per column and settles each the way a whole-file read would.
+    """
+    seen = {}
+    with open_binary(file_path) as f:
+        for chunk in pd.read_csv(f, chunksize=chunksize):
+            for column, dtype in chunk.dtypes.items():
+                seen.setdefault(column, set()).add(dtype)
+    dtypes = {column: _merge_dtypes(found) for column, found in seen.items()}
+    with open_binary(file_path) as f:
+        yield from pd.read_csv(f, chunksize=chunksize, dtype=dtypes)
+
+
+def _merge_dtypes(dtypes):
+    if len(dtypes) == 1:
+        return next(iter(dtypes))
+    if all(np.issubdtype(dtype, np.number) for dtype in dtypes):
+        return np.dtype("float64")
+    return np.dtype("object")
+
+
+class CSVChunkWriter:
+    """Append DataFrame chunks to a CSV file, writing the header once.
+
+    With compression ("gzip" or "zstd") every chunk goes through one
+    compressed stream, which close() finishes.
+    """
+
+    def __init__(self, file_path, compression=None):
+        self.file_path = file_path
+        self.compression = compression
+        self.columns = None
+        self.rows = 0
+        self._stream = None
+
+    def __call__(self, chunk):
+        first = self.columns is None
+        if self.compression is None:
+            chunk.to_csv(
+                self.file_path, mode="w" if first else "a", header=first, index=False
+            )
+        else:
+            if self._stream is None:
+                self._stream = open_compressed_output(self.file_path, self.compression)
+            chunk.to_csv(self._stream, header=first, index=False)
+        if first:
+            self.columns = list(chunk.columns)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+
+
+def iter_xlsx_rows(file_path):
+    """Yield the first sheet's rows of an .xlsx file, converted as read_excel does.
+
+    The workbook is opened in openpyxl's read-only mode, which parses the
+    sheet XML as it is iterated instead of building every cell up front.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(
+        file_path, read_only=True, data_only=True, keep_links=False
+    )
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()
+        yield from iter_sheet_rows(sheet)
+    finally:
+        workbook.close()
+
+
+def iter_sheet_rows(sheet):
+    """Yield a worksheet's rows as lists of the values read_excel would see.
+
+    Empty cells become "", error cells NaN and integral numbers int, and
+    trailing empty cells are dropped, so blank rows come back as [].
+    """
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    for cells in sheet.rows:
+        row = []
+        for cell in cells:
+            value = cell.value
+            if value is None:
+                value = ""
+            elif cell.data_type == TYPE_ERROR:
+                value = np.nan
+            elif cell.data_type == TYPE_NUMERIC:
+                if int(value) == value:
+                    value = int(value)
+                else:
+                    value = float(value)
+            row.append(value)
+        while row and row[-1] == "":
+            row.pop()
+        yield row
+
+
+def read_xlsx(file_path, nrows=None):
+    """Read an .xlsx upload like pd.read_excel, streaming the sheet.
+
+    With nrows only that many data rows are parsed, and dtypes are inferred
+    from them alone, as read_excel does.
+    """
+    if nrows is None:
+        chunks = list(iter_xlsx_chunks(file_path))
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=True)
+    rows = list(islice(iter_xlsx_rows(file_path), nrows + 1))
+    while rows and not rows[-1]:
+        rows.pop()
+    if not rows:
+        return pd.DataFrame()
+    width = max(len(row) for row in rows)
+    return _parse_xlsx_rows(_xlsx_columns(rows[0], width), rows[1:], width)
+
+
+def iter_xlsx_chunks(file_path, chunksize=CHUNK_ROWS):
+    """Yield an .xlsx sheet in DataFrame chunks matching a whole-sheet read_excel.
+
+    The sheet XML is parsed once. Converted rows are spilled to a temporary
+    file while the sheet's width is found, then read back twice: first to
+    settle each column's dtype over the whole sheet, as iter_csv_chunks
+    does, then to parse the chunks with those dtypes.
+    """
+    with tempfile.TemporaryFile() as spill:
+        header, width, chunk, blank_rows = None, 0, [], 0
+        for row in iter_xlsx_rows(file_path):
+            if header is None:
+                header = row
+                width = len(row)
+                continue
+            if not row:
+                # Blank rows only count if data follows them
+                blank_rows += 1
+                continue
+            for _ in range(blank_rows):
+                chunk.append([])
+                if len(chunk) == chunksize:
+                    pickle.dump(chunk, spill, pickle.HIGHEST_PROTOCOL)
+                    chunk = []
+            blank_rows = 0
+            chunk.append(row)
+            width = max(width, len(row))
+            if len(chunk) == chunksize:
+                pickle.dump(chunk, spill, pickle.HIGHEST_PROTOCOL)
+                chunk = []
+        if header is None or (not header and spill.tell() == 0 and not chunk):
+            yield pd.DataFrame()
+            return
+        if chunk or spill.tell() == 0:
+            pickle.dump(chunk, spill, pickle.HIGHEST_PROTOCOL)
+        columns = _xlsx_columns(header, width)
+
+        seen, empty = {}, set()
+        for frame in _iter_spilled_frames(spill, columns, width):
+            for column, dtype in frame.dtypes.items():
+                if frame[column].isna().all() and len(frame):
+                    empty.add(column)
+                else:
+                    seen.setdefault(column, set()).add(dtype)
+        dtypes = {
+            column: _merge_xlsx_dtypes(seen.get(column, set()), column in empty)
+            for column in columns
+        }
+
+        for frame in _iter_spilled_frames(spill, columns, width, dtypes):
+            yield frame
+
+
+def _iter_spilled_frames(spill, columns, width, dtypes=None):
+    spill.seek(0)
+    while True:
+        try:
+            rows = pickle.load(spill)
+        except EOFError:
+            return
+        frame = _parse_xlsx_rows(columns, rows, width)
+        if dtypes is None:
+            yield frame
+            continue
+        # Only columns whose chunk dtype differs need fixing; object ones
+        # are parsed again so their cells keep the types read_excel gives.
+        mismatched = [c for c, dtype in frame.dtypes.items() if dtype != dtypes[c]]
+        reparse = {
+            c: object for c in mismatched if pd.api.types.is_object_dtype(dtypes[c])
+        }
+        if reparse:
+            frame = _parse_xlsx_rows(columns, rows, width, dtype=reparse)
+        yield frame.astype({c: dtypes[c] for c in mismatched if c not in reparse})
+
+
+def _xlsx_columns(header, width):
+    # Parsed once so blank and repeated names are mangled as read_excel does;
+    # chunks are then parsed under these unique names
+    header = header + [""] * (width - len(header))
+    return list(TextParser([header], header=0).read().columns)
+
+
+def _parse_xlsx_rows(columns, rows, width, dtype=None):
+    data = [row + [""] * (width - len(row)) for row in rows]
+    return TextParser(
+        data, names=columns, header=None, skip_blank_lines=False, dtype=dtype
+    ).read()
+
+
+def _merge_xlsx_dtypes(dtypes, had_empty_chunk):
+    # read_excel treats booleans as numbers, and a chunk with no values at
+    # all stands for NaN, which turns any numeric column float
+    if not dtypes:
+        return np.dtype("float64")
+    if all(dtype.kind in "biuf" for dtype in dtypes):
+        if had_empty_chunk or any(dtype.kind == "f" for dtype in dtypes):
+            return np.dtype("float64")
+        if len(dtypes) > 1:
+            return np.dtype("int64")
+    return _merge_dtypes(dtypes)
+
+
+class XLSXChunkWriter:
+    """Append DataFrame chunks to an .xlsx file through openpyxl's write-only mode.
+
+    Rows are streamed into the sheet as they arrive, so memory does not grow
+    with the file. Cells are written as to_excel writes them, header style
+    included; close() saves the workbook.
+    """
+
+    def __init__(self, file_path):
+        from openpyxl import Workbook
+
+        self.file_path = file_path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Sheet1")
+        self.columns = None
+        self.rows = 0
+
+    def __call__(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            if self.columns:
+                self.sheet.append([self._header_cell(c) for c in self.columns])
+        values = [_excel_values(chunk.iloc[:, i]) for i in range(chunk.shape[1])]
+        for row in zip(*values):
+            self.sheet.append(row)
+        self.rows += len(chunk)
+
+    def close(self):
+        self.workbook.save(self.file_path)
+
+    def _header_cell(self, value):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Border, Font, Side
+
+        cell = WriteOnlyCell(self.sheet, value=value)
+        cell.font = Font(bold=True)
+        thin = Side(style="thin")
+        cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        cell.alignment = Alignment(horizontal="center", vertical="top")
+        return cell
+
+
+def _excel_values(series):
+    """A column as plain Python values for openpyxl, missing values as None"""
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        raise ValueError(
+            "Excel does not support datetimes with timezones. Please ensure "
+            "that datetimes are timezone unaware before writing to Excel."
+        )
+    values = series.astype(object).where(series.notna(), None)
+    if series.dtype.kind in "fO":
+        values = values.map(_excel_scalar)
+    return values.tolist()
+
+
+def _excel_scalar(value):
+    # to_excel writes infinities as "inf" / "-inf"; Excel has no such number
+    if isinstance(value, float) and np.isinf(value):
+        return "inf" if value > 0 else "-inf"
+    return value
+
+
+class ArrowChunkWriter:
+    """Append DataFrame chunks to a columnar file, one row group or batch each.
+
+    The first chunk fixes the schema. A column holding only nulls there is
+    typed as string so that later chunks with values still fit. Subclasses
+    open the format's writer.
+    """
+
+    file_format = None
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.columns = None
+        self.rows = 0
+        self._schema = None
+        self._writer = None
+
+    def __call__(self, chunk):
+        if self._writer is None:
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            self._schema = pa.schema(
+                [
+                    field.with_type(pa.string())
+                    if pa.types.is_null(field.type)
+                    else field
+                    for field in schema
+                ],
+                metadata=schema.metadata,
+            )
+            self._writer = self._open(self._schema)
+            self.columns = list(chunk.columns)
+        try:
+            table = pa.Table.from_pandas(
+                chunk, schema=self._schema, preserve_index=False
+            )
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"Cannot write {self.file_format}: {e}") from e
+        self._writer.write_table(table)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def _open(self, schema):
+        raise NotImplementedError
+
+
+class ParquetChunkWriter(ArrowChunkWriter):
+    file_format = "Parquet"
+
+    def _open(self, schema):
+        return pq.ParquetWriter(self.file_path, schema)
+
+
+class FeatherChunkWriter(ArrowChunkWriter):
+    """Arrow IPC file writer, LZ4-compressed like pyarrow.feather's default"""
+
+    file_format = "Feather"
+
+    def _open(self, schema):
+        options = pa.ipc.IpcWriteOptions(compression="lz4")
+        return pa.ipc.new_file(self.file_path, schema, options=options)
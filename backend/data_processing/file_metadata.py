@@ -0,0 +1,231 @@
+import csv
+
+import numpy as np
+
+from .compression import open_binary, open_text
+
+SCAN_CHUNK_BYTES = 8 * 1024 * 1024
+
+QUOTE = ord('"')
+NEWLINE = ord("\n")
+FIELD_START_BYTES = np.array([ord(","), NEWLINE, ord("\r"), QUOTE], dtype=np.uint8)
+WHITESPACE_BYTES = np.array([ord(" "), ord("\t"), ord("\r"), NEWLINE], dtype=np.uint8)
+
+
+class AmbiguousCSVError(ValueError):
+    """The fast scanner cannot be sure where records end"""
+
+
+def extract_file_metadata(file_path, file_type):
+    """Return (headers, row_count) for an upload without building a DataFrame"""
+    if file_type == "csv":
+        return extract_csv_metadata(file_path)
+    if file_type == "excel":
+        if file_path.endswith(".xlsx"):
+            return extract_xlsx_metadata(file_path)
+        return extract_xls_metadata(file_path)
+    if file_type == "parquet":
+        return extract_parquet_metadata(file_path)
+    if file_type == "feather":
+        return extract_feather_metadata(file_path)
+    raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def extract_csv_metadata(file_path):
+    """Read the header record and count data records in a single stream.
+
+    Rows are counted the way pandas.read_csv does: quoted newlines stay
+    inside their record and blank or whitespace-only lines are skipped.
+    Gzip and zstd files are decompressed as they are scanned.
+    """
+    try:
+        with open_binary(file_path) as f:
+            record_count = sum(len(ends) for ends in scan_csv_records(f))
+    except AmbiguousCSVError:
+        record_count = _count_csv_records_slow(file_path)
+    headers = _read_csv_header(file_path)
+    if headers is None:
+        return None, None
+    return headers, max(record_count - 1, 0)
+
+
+def scan_csv_records(stream, chunk_size=SCAN_CHUNK_BYTES):
+    """Yield, chunk by chunk, arrays of byte offsets just past each record.
+
+    Record boundaries are newlines outside quotes, found by tracking quote
+    parity with numpy rather than a per-byte Python loop. Blank records are
+    dropped. A quote that opens mid-field (``12" pipe``) makes parity
+    meaningless, so AmbiguousCSVError is raised for the caller to fall back.
+    """
+    base = 0
+    in_quotes = 0
+    pending_content = False
+    previous_byte = NEWLINE
+    saw_newline = False
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buf = np.frombuffer(chunk, dtype=np.uint8)
+        quote_positions = np.flatnonzero(buf == QUOTE)
+
+        opening = quote_positions[
+            (np.arange(len(quote_positions)) + in_quotes) % 2 == 0
+        ]
+        if len(opening):
+            before = np.where(opening > 0, buf[opening - 1], previous_byte)
+            if not np.isin(before, FIELD_START_BYTES).all():
+                raise AmbiguousCSVError("Quote found inside an unquoted field")
+
+        newlines = np.flatnonzero(buf == NEWLINE)
+        saw_newline = saw_newline or len(newlines) > 0
+        quotes_at = np.searchsorted(quote_positions, newlines) + in_quotes
+        boundaries = newlines[quotes_at % 2 == 0]
+
+        # Only records that are empty or start with whitespace can be blank
+        starts = np.concatenate(([0], boundaries[:-1] + 1))
+        maybe_blank = (starts == boundaries) | np.isin(
+            buf[np.minimum(starts, len(buf) - 1)], WHITESPACE_BYTES
+        )
+        keep = np.ones(len(boundaries), dtype=bool)
+        for index in np.flatnonzero(maybe_blank):
+            keep[index] = bool(chunk[starts[index] : boundaries[index]].strip())
+        if len(boundaries) and pending_content:
+            keep[0] = True
+        yield boundaries[keep] + base + 1
+
+        if len(boundaries):
+            pending_content = bool(chunk[boundaries[-1] + 1 :].strip())
+        else:
+            pending_content = pending_content or bool(chunk.strip())
+        in_quotes = (in_quotes + len(quote_positions)) % 2
+        previous_byte = buf[-1]
+        base += len(buf)
+        if not saw_newline and b"\r" in chunk[:-1]:
+            # Old Mac style line endings; leave these to the csv module
+            raise AmbiguousCSVError("Carriage-return line endings")
+
+    if pending_content:
+        yield np.array([base], dtype=np.int64)
+
+
+def _is_blank_record(row):
+    """Whether csv.reader's row was a line pandas skips as blank.
+
+    Only empty and whitespace-only lines are; a line of empty fields such as
+    "," or '""' is a row of missing values.
+    """
+    return not row or (len(row) == 1 and row[0] != "" and not row[0].strip())
+
+
+def _count_csv_records_slow(file_path):
+    with open_text(file_path) as f:
+        return sum(1 for row in csv.reader(f) if not _is_blank_record(row))
+
+
+def _read_csv_header(file_path):
+    with open_text(file_path) as f:
+        for row in csv.reader(f):
+            if not _is_blank_record(row):
+                return _mangle_headers(row)
+    return None
+
+
+def extract_xlsx_metadata(file_path):
+    """Headers and row count from the first sheet's read-only dimensions.
+
+    The header row is converted by the same streaming reader that loads the
+    data, so the names match the DataFrame's columns.
+    """
+    from openpyxl import load_workbook
+
+    from .file_io import iter_sheet_rows
+
+    workbook = load_workbook(
+        file_path, read_only=True, data_only=True, keep_links=False
+    )
+    try:
+        sheet = workbook.worksheets[0]
+        max_row = sheet.max_row
+        sheet.reset_dimensions()
+        rows = iter_sheet_rows(sheet)
+        header_row = next(rows, [])
+        if max_row is None:
+            # No <dimension> record was written; count rows while streaming,
+            # ignoring trailing blank ones as read_excel does
+            max_row = 1
+            for row_number, row in enumerate(rows, start=2):
+                if row:
+                    max_row = row_number
+    finally:
+        workbook.close()
+    if not header_row:
+        return None, None
+    return _mangle_headers(header_row), max(max_row - 1, 0)
+
+
+def extract_xls_metadata(file_path):
+    """Headers and row count of the first sheet of a legacy .xls workbook"""
+    import xlrd
+
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        if sheet.nrows == 0:
+            return None, None
+        header_row = sheet.row_values(0)
+        row_count = sheet.nrows - 1
+    finally:
+        workbook.release_resources()
+    return _mangle_headers(_trim_trailing_empty(header_row)), row_count
+
+
+def extract_parquet_metadata(file_path):
+    """Headers and row count from the Parquet footer; no row data is read"""
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_metadata(file_path)
+    return _arrow_headers(metadata.schema.to_arrow_schema()), metadata.num_rows
+
+
+def extract_feather_metadata(file_path):
+    """Headers and row count of an Arrow IPC file from its footer and batch headers"""
+    import pyarrow as pa
+
+    with pa.memory_map(file_path) as source:
+        reader = pa.ipc.open_file(source)
+        return _arrow_headers(reader.schema), reader.count_rows()
+
+
+def _arrow_headers(schema):
+    from .file_io import arrow_to_frame
+
+    headers = list(arrow_to_frame(schema.empty_table()).columns)
+    return headers or None
+
+
+def _trim_trailing_empty(row):
+    row = list(row)
+    while row and row[-1] in (None, ""):
+        row.pop()
+    return row
+
+
+def _mangle_headers(row):
+    """Name columns the way pandas does: "Unnamed: i" for blanks, "a.1" for repeats"""
+    headers = []
+    seen = set()
+    for index, value in enumerate(row):
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if value is None or value == "":
+            value = f"Unnamed: {index}"
+        elif not isinstance(value, (str, int, float)):
+            value = str(value)
+        name, suffix = value, 0
+        while name in seen:
+            suffix += 1
+            name = f"{value}.{suffix}"
+        seen.add(name)
+        headers.append(name)
+    return headers
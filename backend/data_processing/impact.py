@@ -0,0 +1,113 @@
+import math
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .column_profile import profile_dtypes, saved_profile
+from .file_cache import parsed_file_cache
+from .file_metadata import extract_file_metadata
+
+# Rows drawn uniformly from the whole file, and the wall-clock budget for
+# reading and replacing them; whatever was read when time runs out is used
+IMPACT_SAMPLE_ROWS = 2_000
+IMPACT_TIME_BUDGET_SECONDS = 1.0
+IMPACT_EXAMPLE_ROWS = 5
+# Two-sided 95% normal quantile
+CONFIDENCE_Z = 1.96
+
+
+def wilson_interval(changed, sampled, population, z=CONFIDENCE_Z):
+    """Wilson score interval for a proportion, with finite population correction"""
+    if not sampled:
+        return 0.0, 1.0
+    rate = changed / sampled
+    denominator = 1 + z * z / sampled
+    center = (rate + z * z / (2 * sampled)) / denominator
+    half_width = (
+        z
+        * math.sqrt(rate * (1 - rate) / sampled + z * z / (4 * sampled * sampled))
+        / denominator
+    )
+    if population > 1:
+        half_width *= math.sqrt(max(population - sampled, 0) / (population - 1))
+    return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+
+def estimate_impact(
+    file_obj,
+    modification,
+    sample_rows=IMPACT_SAMPLE_ROWS,
+    time_budget=IMPACT_TIME_BUDGET_SECONDS,
+    seed=None,
+):
+    """Estimate the share of file_obj's rows a modification would change.
+
+    Row positions are drawn uniformly without replacement and read through
+    the parsed-file cache one block at a time, in random order, until all
+    are read or the time budget runs out. Only the target column is read.
+    Returns the estimated rate with a 95% confidence interval and a few
+    changed rows as examples, or None, no estimate, for a file that can only
+    be read whole (no cache entry and no CSV row index).
+    """
+    start = time.perf_counter()
+    total_rows = file_obj.row_count
+    if total_rows is None:
+        try:
+            _, total_rows = extract_file_metadata(
+                file_obj.file.path, file_obj.file_type
+            )
+        except Exception:
+            total_rows = 0
+    sampled = changed = 0
+    examples = []
+    target = min(sample_rows, total_rows)
+    if modification.compiled is not None and target:
+        if not parsed_file_cache.reads_positions(file_obj):
+            return None
+        rng = np.random.default_rng(seed)
+        positions = rng.choice(total_rows, size=target, replace=False)
+        column = modification.column_name
+        dtypes = None
+        profile = saved_profile(file_obj)
+        if profile:
+            dtypes = profile_dtypes(profile).get(column)
+            dtypes = {column: dtypes} if dtypes else None
+        for rows in parsed_file_cache.iter_positions(
+            file_obj, positions, columns=[column], dtypes=dtypes
+        ):
+            values = rows[column].astype(str)
+            result = modification.compiled.replace(
+                values, time_budget=settings.REGEX_TIME_BUDGET_SECONDS
+            )
+            sampled += len(values)
+            changed += result.changed_count
+            for position in result.changed_positions():
+                if len(examples) >= IMPACT_EXAMPLE_ROWS:
+                    break
+                examples.append(
+                    {
+                        "row": int(values.index[position]),
+                        "before": values.iloc[position],
+                        "after": result.values.iloc[position],
+                    }
+                )
+            if time.perf_counter() - start > time_budget:
+                break
+    rate = changed / sampled if sampled else 0.0
+    low, high = wilson_interval(changed, sampled, total_rows)
+    if modification.compiled is None or sampled == total_rows:
+        # Nothing to replace, or every row was read: the rate is exact
+        low = high = rate
+    examples.sort(key=lambda example: example["row"])
+    return {
+        "total_rows": total_rows,
+        "sampled_rows": sampled,
+        "estimated_modification_rate": rate,
+        "confidence_interval": [low, high],
+        "confidence_level": 0.95,
+        "estimated_modified_rows": round(rate * total_rows),
+        "examples": examples,
+        "time_budget_exceeded": modification.compiled is not None and sampled < target,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
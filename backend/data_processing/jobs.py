@@ -0,0 +1,261 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import ModificationJob
+from .processing import (
+    apply_modification_to_upload,
+    apply_pipeline_to_upload,
+    modification_from_dict,
+)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobSuperseded(Exception):
+    """The job was requeued and claimed by another run"""
+
+
+class Heartbeat:
+    """Refreshes a running job's updated_at from its own thread.
+
+    Beats do not wait for chunks, so a long first chunk (a dtype pre-pass,
+    an xlsx spill) does not make the job look stale. A beat that finds the
+    claim gone marks the heartbeat lost.
+    """
+
+    def __init__(self, claim):
+        self.claim = claim
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.wait(settings.MODIFICATION_JOB_HEARTBEAT_SECONDS):
+                if not self.claim.update(updated_at=timezone.now()):
+                    self.lost = True
+                    return
+        finally:
+            connection.close()
+
+
+def run_job(job_id):
+    """Claim a pending job and run it to completion; returns False if not claimed.
+
+    Each claim bumps the job's attempt, and every later write is filtered on
+    it, so a run whose job was requeued and claimed again cannot overwrite
+    the newer run's progress or result.
+    """
+    job = ModificationJob.objects.filter(
+        pk=job_id, status=ModificationJob.STATUS_PENDING
+    ).first()
+    if job is None:
+        return False
+    attempt = job.attempt + 1
+    claimed = ModificationJob.objects.filter(
+        pk=job_id, status=ModificationJob.STATUS_PENDING, attempt=job.attempt
+    ).update(
+        status=ModificationJob.STATUS_RUNNING,
+        attempt=attempt,
+        started_at=timezone.now(),
+        updated_at=timezone.now(),
+        rows_processed=0,
+    )
+    if not claimed:
+        return False
+    job = ModificationJob.objects.select_related("file").get(pk=job_id)
+    claim = ModificationJob.objects.filter(
+        pk=job_id, status=ModificationJob.STATUS_RUNNING, attempt=attempt
+    )
+
+    with Heartbeat(claim) as heartbeat:
+
+        def on_progress(rows_done):
+            if heartbeat.lost or not claim.update(
+                rows_processed=rows_done, updated_at=timezone.now()
+            ):
+                raise JobSuperseded()
+            if claim.filter(cancel_requested=True).exists():
+                raise JobCancelled()
+
+        try:
+            output_format = job.output_format or None
+            compression = job.output_compression or None
+            if isinstance(job.modification, list):
+                processed_file, stats = apply_pipeline_to_upload(
+                    job.file,
+                    [modification_from_dict(step) for step in job.modification],
+                    on_progress,
+                    output_format,
+                    compression,
+                )
+            else:
+                processed_file, stats = apply_modification_to_upload(
+                    job.file,
+                    modification_from_dict(job.modification),
+                    on_progress,
+                    output_format,
+                    compression,
+                )
+        except JobSuperseded:
+            pass
+        except JobCancelled:
+            claim.update(
+                status=ModificationJob.STATUS_CANCELLED, finished_at=timezone.now()
+            )
+        except Exception as e:
+            claim.update(
+                status=ModificationJob.STATUS_FAILED,
+                error=str(e),
+                finished_at=timezone.now(),
+            )
+        else:
+            finished = claim.update(
+                status=ModificationJob.STATUS_SUCCEEDED,
+                processed_file=processed_file,
+                stats=stats,
+                rows_processed=stats["total_rows"],
+                finished_at=timezone.now(),
+            )
+            if not finished:
+                # Another run owns the job now; this output is nobody's
+                processed_file.delete()
+    return True
+
+
+def requeue_interrupted_jobs():
+    """Put running jobs whose heartbeat has gone stale back in the queue.
+
+    A job is only left running if its worker died, e.g. on a restart; its
+    partial output was never committed, so it is simply run again.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.MODIFICATION_JOB_STALE_SECONDS)
+    return ModificationJob.objects.filter(
+        status=ModificationJob.STATUS_RUNNING, updated_at__lt=cutoff
+    ).update(status=ModificationJob.STATUS_PENDING, rows_processed=0)
+
+
+class ModificationJobRunner:
+    """Runs ModificationJobs on a local thread pool; the database is the queue.
+
+    settings.MODIFICATION_JOB_MODE picks how submitted jobs run: "thread"
+    (this process's pool), "eager" (inline, for tests) or "external" (left
+    for the run_modification_jobs worker command). In "thread" mode, start()
+    also resumes jobs left over from before a restart and keeps requeueing
+    stale ones every MODIFICATION_JOB_POLL_SECONDS.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._poller = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start resuming jobs from a timer thread, once per process"""
+        if settings.MODIFICATION_JOB_MODE != "thread":
+            return
+        with self._lock:
+            if self._poller is not None:
+                return
+            self._stop.clear()
+            self._poller = threading.Thread(
+                target=self._poll, name="modification-job-poller", daemon=True
+            )
+        self._poller.start()
+
+    def stop(self):
+        with self._lock:
+            poller, self._poller = self._poller, None
+        if poller is not None:
+            self._stop.set()
+            poller.join()
+
+    def _poll(self):
+        while True:
+            close_old_connections()
+            try:
+                self.resume()
+            except DatabaseError:
+                # e.g. the tables are not migrated yet; try again next time
+                pass
+            finally:
+                close_old_connections()
+            if self._stop.wait(settings.MODIFICATION_JOB_POLL_SECONDS):
+                return
+
+    def submit(self, job):
+        """Run job as the mode says; in "thread" mode, resume interrupted ones too"""
+        mode = settings.MODIFICATION_JOB_MODE
+        if mode == "eager":
+            run_job(job.pk)
+        elif mode == "thread":
+            transaction.on_commit(self.resume)
+
+    def resume(self):
+        """Requeue interrupted jobs and queue any pending ones not yet queued here"""
+        if settings.MODIFICATION_JOB_MODE != "thread":
+            return
+        requeue_interrupted_jobs()
+        pending = ModificationJob.objects.filter(
+            status=ModificationJob.STATUS_PENDING
+        ).order_by("created_at")
+        for job_id in pending.values_list("pk", flat=True):
+            self._submit(job_id)
+
+    def _submit(self, job_id):
+        with self._lock:
+            if job_id in self._queued:
+                return
+            self._queued.add(job_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.MODIFICATION_JOB_WORKERS,
+                    thread_name_prefix="modification-job",
+                )
+        self._executor.submit(self._run_in_thread, job_id)
+
+    def _run_in_thread(self, job_id):
+        close_old_connections()
+        try:
+            run_job(job_id)
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._queued.discard(job_id)
+
+
+def cancel_job(job):
+    """Cancel a pending job outright, or ask a running one to stop"""
+    if job.status == ModificationJob.STATUS_PENDING:
+        ModificationJob.objects.filter(
+            pk=job.pk, status=ModificationJob.STATUS_PENDING
+        ).update(
+            status=ModificationJob.STATUS_CANCELLED,
+            cancel_requested=True,
+            finished_at=timezone.now(),
+        )
+    ModificationJob.objects.filter(
+        pk=job.pk, status=ModificationJob.STATUS_RUNNING
+    ).update(cancel_requested=True)
+    job.refresh_from_db()
+    return job
+
+
+modification_job_runner = ModificationJobRunner()
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LLMCacheEntry, LLMInstructionLog
+
+
+def normalize_instruction(instruction: str) -> str:
+    return " ".join(instruction.lower().split())
+
+
+def make_cache_key(instruction: str, columns: List[Any], sample_data: str) -> str:
+    """Key an LLM answer by normalized instruction, column list and sample hash"""
+    sample_hash = hashlib.sha256(sample_data.encode("utf-8")).hexdigest()
+    payload = json.dumps(
+        [normalize_instruction(instruction), [str(c) for c in columns], sample_hash]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResultCache:
+    """Two-tier cache of structured LLM answers.
+
+    The first tier is an in-process LRU with a TTL; the second is the
+    LLMCacheEntry table, which survives restarts and is shared between
+    workers. A database hit is promoted into memory.
+    """
+
+    def __init__(self, max_entries=None, ttl_seconds=None):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self):
+        if self._max_entries is not None:
+            return self._max_entries
+        return settings.LLM_CACHE_MAX_ENTRIES
+
+    @property
+    def ttl_seconds(self):
+        if self._ttl_seconds is not None:
+            return self._ttl_seconds
+        return settings.LLM_CACHE_TTL_SECONDS
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, response = entry
+                if time.monotonic() - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return response
+                del self._entries[key]
+
+        cutoff = timezone.now() - timedelta(seconds=self.ttl_seconds)
+        db_entry = LLMCacheEntry.objects.filter(key=key, created_at__gte=cutoff).first()
+        if db_entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        LLMCacheEntry.objects.filter(pk=db_entry.pk).update(
+            hits=F("hits") + 1, last_used_at=timezone.now()
+        )
+        self._remember(key, db_entry.response)
+        with self._lock:
+            self.db_hits += 1
+        return db_entry.response
+
+    def set(self, key: str, response: Dict[str, Any], instruction: str = "") -> None:
+        self._remember(key, response)
+        LLMCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                "response": response,
+                "user_instruction": instruction,
+                "created_at": timezone.now(),
+            },
+        )
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._entries),
+            }
+
+    def _remember(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def seed_from_logs(self, logs=None, preview_rows: int = 5) -> int:
+        """Create cache entries from successful LLMInstructionLog rows.
+
+        Keys are rebuilt from each log's file, so logs whose file has gone
+        or can no longer be read are skipped. Returns the number seeded.
+        """
+        from .column_profile import describe_data, ensure_column_profile
+        from .column_ranker import prompt_columns
+        from .file_cache import load_dataframe
+
+        if logs is None:
+            logs = LLMInstructionLog.objects.filter(
+                success=True, confidence__isnull=False
+            )
+        logs = logs.select_related("file").order_by("created_at")
+
+        samples = {}
+        seeded = 0
+        for log in logs:
+            if log.file_id not in samples:
+                try:
+                    df = load_dataframe(log.file, nrows=preview_rows)
+                    samples[log.file_id] = (df, ensure_column_profile(log.file))
+                except Exception:
+                    samples[log.file_id] = None
+            if samples[log.file_id] is None:
+                continue
+            df, profile = samples[log.file_id]
+            columns = prompt_columns([log.user_instruction], df.columns, profile)
+            sample_data = describe_data(df, preview_rows, profile, columns)
+            key = make_cache_key(log.user_instruction, columns, sample_data)
+            self.set(
+                key,
+                {
+                    "column_name": log.column_name,
+                    "regex_pattern": log.regex_pattern,
+                    "replacement": log.replacement,
+                    "description": log.description,
+                    "confidence": log.confidence,
+                },
+                instruction=log.user_instruction,
+            )
+            seeded += 1
+        return seeded
+
+
+llm_result_cache = LLMResultCache()
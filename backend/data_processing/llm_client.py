@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+
+def google_genai_provider(api_key: Optional[str]):
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY required")
+    return ChatGoogleGenerativeAI(
+        google_api_key=api_key,
+        model="gemini-2.5-flash",
+        temperature=0.1,  # Low temperature for more consistent outputs
+    )
+
+
+class BoundedLLM:
+    """Structured-output runnable whose calls share a concurrency cap.
+
+    Blocking calls wait on a thread semaphore. Async calls wait on an
+    asyncio semaphore of the same size, one per event loop, so they never
+    block the loop.
+    """
+
+    def __init__(self, runnable, semaphore: threading.BoundedSemaphore, size: int):
+        self.runnable = runnable
+        self.semaphore = semaphore
+        self.size = size
+        self._async_semaphores = weakref.WeakKeyDictionary()
+
+    def invoke(self, *args, **kwargs):
+        with self.semaphore:
+            return self.runnable.invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.size)
+        async with semaphore:
+            return await self.runnable.ainvoke(*args, **kwargs)
+
+
+class LLMClientRegistry:
+    """Process-wide, thread-safe pool of LLM clients.
+
+    Each (provider, api key, output schema) combination is built once and
+    shared by every request, so HTTP connections stay alive between calls.
+    The provider is chosen by settings.LLM_PROVIDER; tests can register a
+    local stub under another name and switch to it with override_settings.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, Callable[[Optional[str]], Any]] = {
+            "google": google_genai_provider,
+        }
+        self._clients: Dict[tuple, BoundedLLM] = {}
+        self._lock = threading.Lock()
+        self._semaphore = None
+        self._semaphore_size = None
+
+    def register_provider(
+        self, name: str, factory: Callable[[Optional[str]], Any]
+    ) -> None:
+        """Register factory(api_key) returning a chat model for name"""
+        with self._lock:
+            self._providers[name] = factory
+            self._clients = {
+                key: client for key, client in self._clients.items() if key[0] != name
+            }
+
+    def get_structured_llm(self, schema, api_key: Optional[str] = None) -> BoundedLLM:
+        provider = settings.LLM_PROVIDER
+        key = (provider, api_key, schema)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                try:
+                    factory = self._providers[provider]
+                except KeyError:
+                    raise ValueError(f"Unknown LLM provider: {provider}")
+                client = BoundedLLM(
+                    factory(api_key).with_structured_output(schema),
+                    self._get_semaphore(),
+                    self._semaphore_size,
+                )
+                self._clients[key] = client
+        return client
+
+    def _get_semaphore(self):
+        size = settings.LLM_MAX_CONCURRENCY
+        if self._semaphore is None or self._semaphore_size != size:
+            self._semaphore = threading.BoundedSemaphore(size)
+            self._semaphore_size = size
+        return self._semaphore
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+
+llm_client_registry = LLMClientRegistry()
@@ -1,15 +1,24 @@
 import os
 import time
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
+from typing import Any
 
+import numpy as np
 import pandas as pd
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 
+from .column_profile import describe_data
+from .column_ranker import prompt_columns
+from .llm_cache import llm_result_cache, make_cache_key
+from .llm_client import llm_client_registry
+
 # Import Django models
 from .models import LLMInstructionLog, UploadedFile
+from .regex_engine import RegexResult, compile_regex
 
 
 class RegexModificationOutput(BaseModel):
@@ -24,6 +33,18 @@ class RegexModificationOutput(BaseModel):
     )
 
 
+class BatchRegexModificationItem(RegexModificationOutput):
+    instruction_index: int = Field(
+        description="0-based index of the instruction this modification answers"
+    )
+
+
+class BatchRegexModificationOutput(BaseModel):
+    modifications: list[BatchRegexModificationItem] = Field(
+        description="One modification per instruction, in any order"
+    )
+
+
 @dataclass
 class RegexModification:
     column_name: str
@@ -32,27 +53,18 @@ class RegexModification:
     description: str
     confidence: float
 
+    def __post_init__(self):
+        # Compiled once here so a bad pattern fails before any data is touched;
+        # a plain attribute rather than a field, so asdict() and == ignore it
+        self.compiled = compile_regex(self.regex_pattern, self.replacement)
 
-class LLMDataProcessor:
-    def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
-        if not self.api_key:
-            raise ValueError("GOOGLE_API_KEY required")
 
-        base_llm = ChatGoogleGenerativeAI(
-            google_api_key=self.api_key,
-            model="gemini-2.5-flash",
-            temperature=0.1,  # Low temperature for more consistent outputs
-        )
-        self.llm = base_llm.with_structured_output(RegexModificationOutput)
-
-        self.prompt_template = PromptTemplate(
-            input_variables=["instruction", "columns", "sample_data"],
-            template="""
+PROMPT_TEMPLATE = PromptTemplate(
+    input_variables=["instruction", "columns", "sample_data"],
+    template="""
 You are a data processing expert. Convert the following natural language instruction into a precise regex pattern for data modification.
 
 Available columns: {columns}
-Sample data (first few rows):
 {sample_data}
 
 User instruction: "{instruction}"
@@ -75,15 +87,62 @@ Examples of good regex patterns:
 - Email matching: \\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{{2,7}}\\b
 - Phone formatting: ^\\+1-(.*)$ (to match numbers starting with +1-)
 - Date format conversion: (\\d{{2}})/(\\d{{2}})/(\\d{{4}}) (MM/DD/YYYY pattern)
-            """,
+    """,
+)
+
+
+BATCH_PROMPT_TEMPLATE = PromptTemplate(
+    input_variables=["instructions", "columns", "sample_data"],
+    template="""
+You are a data processing expert. Convert each of the following natural language instructions into a precise regex pattern for data modification.
+
+Available columns: {columns}
+{sample_data}
+
+User instructions (numbered from 0):
+{instructions}
+
+For every instruction provide, independently of the others:
+0. The instruction_index of the instruction it answers
+1. The target column name (must exist in available columns)
+2. A precise Python regex pattern to match the data to be modified
+3. The replacement value or pattern
+4. A clear description of what the modification does
+5. Your confidence level (0.0 to 1.0) in this solution
+
+Guidelines:
+- Return exactly one modification per instruction
+- Use valid Python regex syntax (single backslashes)
+- Be specific with the column name
+- Make the regex pattern precise to avoid unintended matches
+- Ensure each pattern will work with Python's re.sub() function
+    """,
+)
+
+
+@dataclass
+class InstructionResult:
+    instruction: str
+    modification: RegexModification | None = None
+    error: str | None = None
+
+
+class LLMDataProcessor:
+    def __init__(self, api_key: str | None = None):
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        self.llm = llm_client_registry.get_structured_llm(
+            RegexModificationOutput, api_key=self.api_key
         )
+        self.prompt_template = PROMPT_TEMPLATE
 
     def process_instruction(
         self,
         instruction: str,
         df: pd.DataFrame,
-        file_id: Optional[int] = None,
+        file_id: int | None = None,
         preview_rows: int = 5,
+        use_cache: bool = True,
+        profile: dict[str, Any] | None = None,
     ) -> RegexModification:
         start_time = time.time()
 
@@ -95,126 +154,432 @@ Examples of good regex patterns:
         else:
             file_obj = None
 
-        columns = list(df.columns)
-        sample_data = df.head(preview_rows).to_string(index=False)
+        columns, sample_data, prompt = self._build_prompt(
+            instruction, df, preview_rows, profile
+        )
 
-        prompt = self.prompt_template.format(
-            instruction=instruction, columns=columns, sample_data=sample_data
+        processing_time_ms = int((time.time() - start_time) * 1000)
+
+        cache_key = None
+        cached_response = None
+        if use_cache:
+            cache_key = make_cache_key(instruction, columns, sample_data)
+            cached_response = llm_result_cache.get(cache_key)
+
+        try:
+            if cached_response is not None:
+                structured_response = RegexModificationOutput(**cached_response)
+            else:
+                structured_response = self.llm.invoke(prompt)
+                if self._outside_prompt(structured_response, columns, df):
+                    # The ranker left the right column out; ask with all of them
+                    _, _, prompt = self._build_prompt(
+                        instruction, df, preview_rows, profile, list(df.columns)
+                    )
+                    structured_response = self.llm.invoke(prompt)
+            return self._record_success(
+                instruction,
+                list(df.columns),
+                structured_response,
+                cache_key if cached_response is None else None,
+                file_obj,
+                processing_time_ms,
+            )
+
+        except Exception as e:
+            self._record_failure(instruction, e, file_obj, processing_time_ms)
+            raise ValueError(f"Processing failed: {e!s}")
+
+    async def aprocess_instruction(
+        self,
+        instruction: str,
+        df: pd.DataFrame,
+        file_id: int | None = None,
+        preview_rows: int = 5,
+        use_cache: bool = True,
+        profile: dict[str, Any] | None = None,
+    ) -> RegexModification:
+        """Async process_instruction: awaits the LLM instead of blocking a thread"""
+        start_time = time.time()
+
+        file_obj = None
+        if file_id:
+            file_obj = await UploadedFile.objects.filter(id=file_id).afirst()
+
+        columns, sample_data, prompt = self._build_prompt(
+            instruction, df, preview_rows, profile
         )
 
         processing_time_ms = int((time.time() - start_time) * 1000)
 
+        cache_key = None
+        cached_response = None
+        if use_cache:
+            cache_key = make_cache_key(instruction, columns, sample_data)
+            cached_response = await sync_to_async(llm_result_cache.get)(cache_key)
+
         try:
-            structured_response = self.llm.invoke(prompt)
-            modification = RegexModification(
-                column_name=structured_response.column_name,
-                regex_pattern=structured_response.regex_pattern,
-                replacement=structured_response.replacement,
-                description=structured_response.description,
-                confidence=structured_response.confidence,
+            if cached_response is not None:
+                structured_response = RegexModificationOutput(**cached_response)
+            else:
+                structured_response = await self.llm.ainvoke(prompt)
+                if self._outside_prompt(structured_response, columns, df):
+                    _, _, prompt = self._build_prompt(
+                        instruction, df, preview_rows, profile, list(df.columns)
+                    )
+                    structured_response = await self.llm.ainvoke(prompt)
+            return await sync_to_async(self._record_success)(
+                instruction,
+                list(df.columns),
+                structured_response,
+                cache_key if cached_response is None else None,
+                file_obj,
+                processing_time_ms,
+            )
+
+        except Exception as e:
+            await sync_to_async(self._record_failure)(
+                instruction, e, file_obj, processing_time_ms
             )
+            raise ValueError(f"Processing failed: {e!s}")
+
+    def process_instructions(
+        self,
+        instructions: list[str],
+        df: pd.DataFrame,
+        file_id: int | None = None,
+        preview_rows: int = 5,
+        use_cache: bool = True,
+        profile: dict[str, Any] | None = None,
+    ) -> list[InstructionResult]:
+        """Answer several instructions with at most one LLM call.
+
+        Cached instructions are answered from the cache; the rest go out
+        together, sharing one copy of the columns and sample data. On wide
+        tables that copy holds only the columns most relevant to them, and
+        answers naming a column it left out are asked again, together, with
+        every column. Every answer is validated, cached and logged on its
+        own, so one bad answer does not fail the others. Results follow the
+        input order.
+        """
+        start_time = time.time()
 
-            if modification.column_name not in columns:
-                raise ValueError(f"Column '{modification.column_name}' not found")
-
-            if file_obj:
-                LLMInstructionLog.objects.create(
-                    file=file_obj,
-                    user_instruction=instruction,
-                    llm_response=structured_response.model_dump_json(),
-                    column_name=modification.column_name,
-                    regex_pattern=modification.regex_pattern,
-                    replacement=modification.replacement,
-                    description=modification.description,
-                    confidence=modification.confidence,
-                    processing_time_ms=processing_time_ms,
-                    success=True,
+        file_obj = None
+        if file_id:
+            file_obj = UploadedFile.objects.filter(id=file_id).first()
+
+        all_columns = list(df.columns)
+        responses = {}
+        cache_keys = {}
+        for index, instruction in enumerate(instructions):
+            if use_cache:
+                # Keyed as process_instruction keys it, so either can reuse it
+                columns, sample_data, _ = self._build_prompt(
+                    instruction, df, preview_rows, profile
                 )
+                cache_keys[index] = make_cache_key(instruction, columns, sample_data)
+                cached_response = llm_result_cache.get(cache_keys[index])
+                if cached_response is not None:
+                    responses[index] = RegexModificationOutput(**cached_response)
+                    cache_keys[index] = None
+
+        pending = [i for i in range(len(instructions)) if i not in responses]
+        batch_error = None
+        if pending:
+            columns = prompt_columns(
+                [instructions[index] for index in pending], all_columns, profile
+            )
+            try:
+                responses.update(
+                    self._invoke_batch(
+                        instructions, pending, df, preview_rows, profile, columns
+                    )
+                )
+                retry = [
+                    index
+                    for index in pending
+                    if index in responses
+                    and self._outside_prompt(responses[index], columns, df)
+                ]
+                if retry:
+                    responses.update(
+                        self._invoke_batch(
+                            instructions, retry, df, preview_rows, profile, all_columns
+                        )
+                    )
+            except Exception as e:
+                batch_error = e
 
-            return modification
+        processing_time_ms = int((time.time() - start_time) * 1000)
 
-        except Exception as e:
-            if file_obj:
-                LLMInstructionLog.objects.create(
-                    file=file_obj,
-                    user_instruction=instruction,
-                    llm_response=str(e),
-                    parse_error=str(e),
-                    processing_time_ms=processing_time_ms,
-                    success=False,
+        results = []
+        for index, instruction in enumerate(instructions):
+            try:
+                if index not in responses:
+                    raise batch_error or ValueError("No answer for this instruction")
+                modification = self._record_success(
+                    instruction,
+                    all_columns,
+                    responses[index],
+                    cache_keys.get(index),
+                    file_obj,
+                    processing_time_ms,
+                )
+                results.append(InstructionResult(instruction, modification))
+            except Exception as e:
+                self._record_failure(instruction, e, file_obj, processing_time_ms)
+                results.append(
+                    InstructionResult(instruction, error=f"Processing failed: {e!s}")
                 )
-            raise ValueError(f"Processing failed: {str(e)}")
+        return results
 
-    def preview_modification(
-        self, modification: RegexModification, df: pd.DataFrame, preview_rows: int = 10
-    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-        preview_df = df.head(preview_rows).copy()
-        original_values = preview_df[modification.column_name].copy()
-
-        if modification.regex_pattern:
-            preview_df[modification.column_name] = (
-                preview_df[modification.column_name]
-                .astype(str)
-                .str.replace(
-                    modification.regex_pattern,
-                    modification.replacement,
-                    regex=True,
+    @property
+    def batch_llm(self):
+        return llm_client_registry.get_structured_llm(
+            BatchRegexModificationOutput, api_key=self.api_key
+        )
+
+    def _invoke_batch(
+        self,
+        instructions: list[str],
+        indices: list[int],
+        df: pd.DataFrame,
+        preview_rows: int,
+        profile: dict[str, Any] | None,
+        columns: list[Any],
+    ) -> dict[int, RegexModificationOutput]:
+        """Ask for instructions[indices] in one call; answers keyed by index"""
+        prompt = BATCH_PROMPT_TEMPLATE.format(
+            instructions="\n".join(
+                f"{position}. {instructions[index]}"
+                for position, index in enumerate(indices)
+            ),
+            columns=columns,
+            sample_data=describe_data(df, preview_rows, profile, columns),
+        )
+        batch = self.batch_llm.invoke(prompt)
+        answers = {}
+        for item in batch.modifications:
+            if 0 <= item.instruction_index < len(indices):
+                answers.setdefault(
+                    indices[item.instruction_index],
+                    RegexModificationOutput(
+                        **item.model_dump(exclude={"instruction_index"})
+                    ),
                 )
+        return answers
+
+    def _build_prompt(
+        self,
+        instruction: str,
+        df: pd.DataFrame,
+        preview_rows: int,
+        profile: dict[str, Any] | None = None,
+        columns: list[Any] | None = None,
+    ) -> tuple[list[Any], str, str]:
+        """The columns shown, data section and prompt for one instruction.
+
+        Wide tables are cut down to the columns most relevant to it.
+        """
+        if columns is None:
+            columns = prompt_columns([instruction], df.columns, profile)
+        sample_data = describe_data(df, preview_rows, profile, columns)
+
+        prompt = self.prompt_template.format(
+            instruction=instruction, columns=columns, sample_data=sample_data
+        )
+        return columns, sample_data, prompt
+
+    def _outside_prompt(
+        self,
+        structured_response: RegexModificationOutput,
+        columns: list[Any],
+        df: pd.DataFrame,
+    ) -> bool:
+        """Whether a pruned prompt got an answer naming a column it did not show"""
+        return (
+            len(columns) < len(df.columns)
+            and structured_response.column_name not in columns
+        )
+
+    def _record_success(
+        self,
+        instruction: str,
+        columns: list[Any],
+        structured_response: RegexModificationOutput,
+        cache_key: str | None,
+        file_obj: UploadedFile | None,
+        processing_time_ms: int,
+    ) -> RegexModification:
+        """Validate an LLM answer, then cache and log it"""
+        modification = RegexModification(
+            column_name=structured_response.column_name,
+            regex_pattern=structured_response.regex_pattern,
+            replacement=structured_response.replacement,
+            description=structured_response.description,
+            confidence=structured_response.confidence,
+        )
+
+        if modification.column_name not in columns:
+            raise ValueError(f"Column '{modification.column_name}' not found")
+
+        if cache_key is not None:
+            llm_result_cache.set(
+                cache_key, structured_response.model_dump(), instruction
             )
-            modified_count = sum(
-                original_values.astype(str)
-                != preview_df[modification.column_name].astype(str)
+
+        if file_obj:
+            LLMInstructionLog.objects.create(
+                file=file_obj,
+                user_instruction=instruction,
+                llm_response=structured_response.model_dump_json(),
+                column_name=modification.column_name,
+                regex_pattern=modification.regex_pattern,
+                replacement=modification.replacement,
+                description=modification.description,
+                confidence=modification.confidence,
+                processing_time_ms=processing_time_ms,
+                success=True,
+            )
+
+        return modification
+
+    def _record_failure(
+        self,
+        instruction: str,
+        error: Exception,
+        file_obj: UploadedFile | None,
+        processing_time_ms: int,
+    ) -> None:
+        if file_obj:
+            LLMInstructionLog.objects.create(
+                file=file_obj,
+                user_instruction=instruction,
+                llm_response=str(error),
+                parse_error=str(error),
+                processing_time_ms=processing_time_ms,
+                success=False,
             )
-        else:
-            modified_count = 0
 
+    def preview_modification(
+        self, modification: RegexModification, df: pd.DataFrame, preview_rows: int = 10
+    ) -> tuple[pd.DataFrame, dict[str, Any]]:
+        preview_df, modified_count, result = self._apply_to_frame(
+            modification, df.head(preview_rows).copy()
+        )
         preview_df = preview_df.fillna("")
-        stats = {
-            "total_rows": len(preview_df),
-            "modified_rows": modified_count,
-            "modification_rate": modified_count / len(preview_df)
-            if len(preview_df) > 0
-            else 0,
-            "pattern": modification.regex_pattern,
-            "replacement": modification.replacement,
-            "success": True,
-        }
+        stats = self._modification_stats(
+            modification, len(preview_df), modified_count, [result]
+        )
+        stats["changed_rows"] = (
+            result.changed_positions().tolist() if result is not None else []
+        )
 
         return preview_df, stats
 
     def apply_modification_to_file(
         self, modification: RegexModification, df: pd.DataFrame
-    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-        modified_df = df.copy()
-        original_values = modified_df[modification.column_name].copy()
-
-        if modification.regex_pattern:
-            modified_df[modification.column_name] = (
-                modified_df[modification.column_name]
-                .astype(str)
-                .str.replace(
-                    modification.regex_pattern,
-                    modification.replacement,
-                    regex=True,
+    ) -> tuple[pd.DataFrame, dict[str, Any]]:
+        modified_df, stats = self.apply_pipeline_to_file([modification], df)
+        return modified_df, stats["steps"][0]
+
+    def apply_modification_in_chunks(
+        self,
+        modification: RegexModification,
+        chunks: Iterable[pd.DataFrame],
+        write_chunk: Callable[[pd.DataFrame], None],
+    ) -> dict[str, Any]:
+        """Stream a modification over chunks, handing each result to write_chunk.
+
+        Only one chunk is held at a time; the returned stats are the running
+        totals and match apply_modification_to_file on the same data.
+        """
+        stats = self.apply_pipeline_in_chunks([modification], chunks, write_chunk)
+        return stats["steps"][0]
+
+    def apply_pipeline_to_file(
+        self, modifications: list[RegexModification], df: pd.DataFrame
+    ) -> tuple[pd.DataFrame, dict[str, Any]]:
+        written = []
+        stats = self.apply_pipeline_in_chunks(
+            modifications, [df.copy()], written.append
+        )
+        return written[0].fillna(""), stats
+
+    def apply_pipeline_in_chunks(
+        self,
+        modifications: list[RegexModification],
+        chunks: Iterable[pd.DataFrame],
+        write_chunk: Callable[[pd.DataFrame], None],
+    ) -> dict[str, Any]:
+        """Run modifications in order over each chunk, writing every chunk once.
+
+        Each step sees the output of the steps before it. Returns per-step
+        stats plus the number of rows changed by at least one step.
+        """
+        total_rows = 0
+        modified_rows = 0
+        step_counts = [0] * len(modifications)
+        step_results = [[] for _ in modifications]
+        for chunk in chunks:
+            changed = np.zeros(len(chunk), dtype=bool)
+            for step, modification in enumerate(modifications):
+                chunk, step_modified, result = self._apply_to_frame(modification, chunk)
+                step_counts[step] += step_modified
+                step_results[step].append(result)
+                if result is not None:
+                    changed |= result.changed
+            # Writers leave missing values empty; fillna("") here would turn
+            # typed columns into object ones that columnar formats reject
+            write_chunk(chunk)
+            total_rows += len(chunk)
+            modified_rows += int(np.count_nonzero(changed))
+
+        return {
+            "total_rows": total_rows,
+            "modified_rows": modified_rows,
+            "modification_rate": modified_rows / total_rows if total_rows > 0 else 0,
+            "steps": [
+                self._modification_stats(modification, total_rows, count, results)
+                for modification, count, results in zip(
+                    modifications, step_counts, step_results
                 )
-            )
-            modified_count = sum(
-                original_values.astype(str)
-                != modified_df[modification.column_name].astype(str)
-            )
-        else:
-            modified_count = 0
+            ],
+            "success": True,
+        }
+
+    def _apply_to_frame(
+        self, modification: RegexModification, df: pd.DataFrame
+    ) -> tuple[pd.DataFrame, int, RegexResult | None]:
+        """Apply the modification to df in place and count the changed rows"""
+        if modification.compiled is None:
+            return df, 0, None
+
+        result = modification.compiled.replace(
+            df[modification.column_name].astype(str),
+            workers=settings.REGEX_WORKERS,
+            time_budget=settings.REGEX_TIME_BUDGET_SECONDS,
+        )
+        df[modification.column_name] = result.values
+        return df, result.changed_count, result
 
-        modified_df = modified_df.fillna("")
-        stats = {
-            "total_rows": len(modified_df),
+    def _modification_stats(
+        self,
+        modification: RegexModification,
+        total_rows: int,
+        modified_count: int,
+        results: list[RegexResult | None],
+    ) -> dict[str, Any]:
+        engines = sorted({result.engine for result in results if result is not None})
+        return {
+            "total_rows": total_rows,
             "modified_rows": modified_count,
-            "modification_rate": modified_count / len(modified_df)
-            if len(modified_df) > 0
-            else 0,
+            "modification_rate": modified_count / total_rows if total_rows > 0 else 0,
             "pattern": modification.regex_pattern,
             "replacement": modification.replacement,
+            "engine": "+".join(engines) or None,
+            "regex_time_ms": round(
+                sum(result.elapsed_ms for result in results if result is not None), 3
+            ),
             "success": True,
         }
-
-        return modified_df, stats
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from data_processing.llm_client import llm_client_registry
+from data_processing.llm_service import LLMDataProcessor, RegexModificationOutput
+
+FAKE_PROVIDER = "fake-latency"
+
+
+class FakeLatencyChatModel:
+    """Chat model stand-in that answers after a fixed delay"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def with_structured_output(self, schema):
+        return self
+
+    def _answer(self):
+        return RegexModificationOutput(
+            column_name="email",
+            regex_pattern="[A-Z]",
+            replacement="x",
+            description="Benchmark answer",
+            confidence=1.0,
+        )
+
+    def invoke(self, prompt):
+        time.sleep(self.latency)
+        return self._answer()
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.latency)
+        return self._answer()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare instruction throughput of the sync and async LLM paths "
+        "against a fake LLM with artificial latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--latency", type=float, default=2.0, help="Fake LLM latency in seconds"
+        )
+        parser.add_argument(
+            "--sync-workers",
+            type=int,
+            default=8,
+            help="Threads serving the sync path, like WSGI worker threads",
+        )
+
+    def handle(self, *args, **options):
+        latency = options["latency"]
+        llm_client_registry.register_provider(
+            FAKE_PROVIDER, lambda api_key: FakeLatencyChatModel(latency)
+        )
+        df = pd.DataFrame({"name": ["John", "Jane"], "email": ["J@X.COM", "j@y.org"]})
+        instructions = [f"mask capitals #{i}" for i in range(options["requests"])]
+
+        with override_settings(
+            LLM_PROVIDER=FAKE_PROVIDER, LLM_MAX_CONCURRENCY=options["requests"]
+        ):
+            processor = LLMDataProcessor()
+
+            def run_sync(instruction):
+                return processor.process_instruction(instruction, df, use_cache=False)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["sync_workers"]) as pool:
+                list(pool.map(run_sync, instructions))
+            sync_elapsed = time.perf_counter() - start
+
+            async def run_async():
+                await asyncio.gather(
+                    *(
+                        processor.aprocess_instruction(instruction, df, use_cache=False)
+                        for instruction in instructions
+                    )
+                )
+
+            start = time.perf_counter()
+            asyncio.run(run_async())
+            async_elapsed = time.perf_counter() - start
+
+        total = len(instructions)
+        self.stdout.write(
+            f"{total} requests, {latency:.2f}s fake LLM latency\n"
+            f"sync  ({options['sync_workers']} threads): {sync_elapsed:.2f}s, "
+            f"{total / sync_elapsed:.1f} req/s\n"
+            f"async (one event loop): {async_elapsed:.2f}s, "
+            f"{total / async_elapsed:.1f} req/s"
+        )
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from data_processing.jobs import requeue_interrupted_jobs, run_job
+from data_processing.models import ModificationJob
+
+
+class Command(BaseCommand):
+    help = "Run queued background modification jobs from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            requeue_interrupted_jobs()
+            job_id = (
+                ModificationJob.objects.filter(status=ModificationJob.STATUS_PENDING)
+                .order_by("created_at")
+                .values_list("pk", flat=True)
+                .first()
+            )
+            if job_id is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+            if run_job(job_id):
+                job = ModificationJob.objects.get(pk=job_id)
+                self.stdout.write(f"Job {job_id}: {job.status}")
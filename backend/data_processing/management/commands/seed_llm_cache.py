@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from data_processing.llm_cache import llm_result_cache
+
+
+class Command(BaseCommand):
+    help = "Seed the LLM result cache from successful LLMInstructionLog rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--preview-rows",
+            type=int,
+            default=5,
+            help="Sample rows used when the instructions were processed",
+        )
+
+    def handle(self, *args, **options):
+        seeded = llm_result_cache.seed_from_logs(preview_rows=options["preview_rows"])
+        self.stdout.write(self.style.SUCCESS(f"Seeded {seeded} cache entries"))
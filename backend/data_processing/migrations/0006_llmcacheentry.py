@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "data_processing",
+            "0005_remove_llminstructionlog_data_proces_file_id_c5d0d1_idx_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LLMCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Hash of normalized instruction, columns and sample data",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                ("user_instruction", models.TextField()),
+                ("response", models.JSONField(help_text="Structured LLM output")),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_used_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-last_used_at"],
+            },
+        ),
+    ]
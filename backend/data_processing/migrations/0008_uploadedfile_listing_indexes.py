@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_processing", "0007_modificationjob"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="uploadedfile",
+            index=models.Index(
+                fields=["file_type", "uploaded_at"],
+                name="data_proces_file_ty_e19ef4_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="uploadedfile",
+            index=models.Index(
+                fields=["uploaded_at", "id"], name="data_proces_uploade_52c619_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_processing", "0008_uploadedfile_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadedfile",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, default="", help_text="SHA-256 of the file", max_length=64
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_processing", "0009_uploadedfile_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="modificationjob",
+            name="output_format",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Defaults to the input's",
+                max_length=10,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="uploadedfile",
+            name="file_type",
+            field=models.CharField(
+                choices=[
+                    ("csv", "CSV"),
+                    ("excel", "Excel"),
+                    ("parquet", "Parquet"),
+                    ("feather", "Arrow IPC / Feather"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_processing", "0010_file_formats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="modificationjob",
+            name="output_compression",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="gzip or zstd, CSV only",
+                max_length=10,
+            ),
+        ),
+    ]
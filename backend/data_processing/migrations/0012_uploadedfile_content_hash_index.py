@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_processing", "0011_modificationjob_output_compression"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="uploadedfile",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                help_text="SHA-256 of the file",
+                max_length=64,
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_processing", "0012_uploadedfile_content_hash_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadedfile",
+            name="column_profile",
+            field=models.JSONField(
+                blank=True,
+                help_text="Per-column type, null rate, distinct count and common values",
+                null=True,
+            ),
+        ),
+    ]
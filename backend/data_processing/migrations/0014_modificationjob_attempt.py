@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_processing", "0013_uploadedfile_column_profile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="modificationjob",
+            name="attempt",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Bumped on every claim; a run only writes its own"
+            ),
+        ),
+    ]
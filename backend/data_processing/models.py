@@ -14,6 +14,8 @@ class UploadedFile(models.Model):
     FILE_TYPE_CHOICES = [
         ("csv", "CSV"),
         ("excel", "Excel"),
+        ("parquet", "Parquet"),
+        ("feather", "Arrow IPC / Feather"),
     ]
 
     name = models.CharField(max_length=255)
@@ -24,22 +26,60 @@ class UploadedFile(models.Model):
     row_count = models.PositiveIntegerField(
         null=True, blank=True, help_text="Number of data rows (excluding header)"
     )
+    column_profile = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Per-column type, null rate, distinct count and common values",
+    )
     uploaded_by = models.ForeignKey(
         User, on_delete=models.CASCADE, null=True, blank=True
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        db_index=True,
+        help_text="SHA-256 of the file",
+    )
 
     class Meta:
         ordering = ["-uploaded_at"]
+        indexes = [
+            models.Index(fields=["file_type", "uploaded_at"]),
+            models.Index(fields=["uploaded_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.file_type})"
 
+    def find_duplicate(self):
+        """An earlier upload with the same bytes and type whose blob can be shared"""
+        candidates = UploadedFile.objects.filter(
+            content_hash=self.content_hash,
+            file_type=self.file_type,
+            headers__isnull=False,
+        ).exclude(pk=self.pk)
+        for candidate in candidates.order_by("pk"):
+            if candidate.file and os.path.isfile(candidate.file.path):
+                return candidate
+        return None
+
     def delete(self, *args, **kwargs):
-        """Delete the file from filesystem when model instance is deleted"""
-        if self.file and os.path.isfile(self.file.path):
+        """Delete the row, and the stored file once no other upload shares it"""
+        from .file_cache import parsed_file_cache
+
+        shared = (
+            UploadedFile.objects.filter(file=self.file.name)
+            .exclude(pk=self.pk)
+            .exists()
+        )
+        if not shared:
+            parsed_file_cache.invalidate(self)
+        result = super().delete(*args, **kwargs)
+        if self.file and not shared and os.path.isfile(self.file.path):
             os.remove(self.file.path)
-        return super().delete(*args, **kwargs)
+        return result
 
 
 class LLMInstructionLog(models.Model):
@@ -75,3 +115,80 @@ class LLMInstructionLog(models.Model):
     def __str__(self):
         status = "✓" if self.success else "✗"
         return f"{status} {self.file.name}: {self.user_instruction[:50]}..."
+
+
+class LLMCacheEntry(models.Model):
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="Hash of normalized instruction, columns and sample data",
+    )
+    user_instruction = models.TextField()
+    response = models.JSONField(help_text="Structured LLM output")
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-last_used_at"]
+
+    def __str__(self):
+        return f"{self.key[:12]}: {self.user_instruction[:50]}"
+
+
+class ModificationJob(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CANCELLED = "cancelled"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_CANCELLED, "Cancelled"),
+    ]
+    FINISHED_STATUSES = [STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED]
+
+    file = models.ForeignKey(
+        UploadedFile, on_delete=models.CASCADE, related_name="modification_jobs"
+    )
+    modification = models.JSONField(help_text="RegexModification fields")
+    output_format = models.CharField(
+        max_length=10, blank=True, default="", help_text="Defaults to the input's"
+    )
+    output_compression = models.CharField(
+        max_length=10, blank=True, default="", help_text="gzip or zstd, CSV only"
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    rows_processed = models.PositiveBigIntegerField(default=0)
+    attempt = models.PositiveIntegerField(
+        default=0, help_text="Bumped on every claim; a run only writes its own"
+    )
+    total_rows = models.PositiveBigIntegerField(null=True, blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    processed_file = models.ForeignKey(
+        UploadedFile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    stats = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(
+        auto_now=True, help_text="Heartbeat, refreshed as rows are processed"
+    )
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"Job {self.pk} ({self.status}) for {self.file.name}"
@@ -0,0 +1,172 @@
+import os
+import tempfile
+
+from django.core.files import File
+from django.utils import timezone
+
+from .compression import COMPRESSION_SUFFIXES, strip_compression_suffix
+from .file_cache import iter_dataframe_chunks
+from .file_io import (
+    CSVChunkWriter,
+    FeatherChunkWriter,
+    ParquetChunkWriter,
+    XLSXChunkWriter,
+)
+from .llm_service import LLMDataProcessor, RegexModification
+from .models import UploadedFile
+
+# Output file type -> (extension, chunk writer)
+OUTPUT_FORMATS = {
+    "csv": (".csv", CSVChunkWriter),
+    "excel": (".xlsx", XLSXChunkWriter),
+    "parquet": (".parquet", ParquetChunkWriter),
+    "feather": (".feather", FeatherChunkWriter),
+}
+
+
+def track_progress(chunks, on_progress):
+    """Report the running row total after each chunk has been consumed"""
+    rows_done = 0
+    for chunk in chunks:
+        yield chunk
+        rows_done += len(chunk)
+        on_progress(rows_done)
+
+
+def apply_modification_to_upload(
+    file_obj, modification, on_progress=None, output_format=None, compression=None
+):
+    """Apply a modification to a whole upload and store the result.
+
+    Returns the new UploadedFile and the modification stats. on_progress,
+    if given, is called with the number of rows processed so far and may
+    raise to abort; the partial output is discarded either way. The output
+    is written as output_format, by default the upload's own file type;
+    CSV output can be gzip or zstd compressed.
+    """
+    processed_file, stats = apply_pipeline_to_upload(
+        file_obj, [modification], on_progress, output_format, compression
+    )
+    return processed_file, stats["steps"][0]
+
+
+def apply_pipeline_to_upload(
+    file_obj, modifications, on_progress=None, output_format=None, compression=None
+):
+    """Apply modifications in order in one pass over an upload and store the result.
+
+    Like apply_modification_to_upload, but the stats hold one entry per
+    step under "steps".
+    """
+    llm_processor = LLMDataProcessor()
+    output_format = output_format or file_obj.file_type
+    extension, writer_class = OUTPUT_FORMATS[output_format]
+    writer_options = {}
+    if compression:
+        if output_format != "csv":
+            raise ValueError("Only CSV output can be compressed")
+        extension += COMPRESSION_SUFFIXES[compression]
+        writer_options["compression"] = compression
+    base_name = os.path.splitext(strip_compression_suffix(file_obj.name))[0]
+    processed_filename = (
+        f"{base_name}_processed_{timezone.now().strftime('%Y%m%d_%H%M%S')}{extension}"
+    )
+    with OutputFile(processed_filename) as output:
+        # Stream chunk by chunk so memory stays bounded by CHUNK_ROWS
+        chunks = iter_dataframe_chunks(file_obj)
+        if on_progress is not None:
+            chunks = track_progress(chunks, on_progress)
+        writer = writer_class(output.temp_path, **writer_options)
+        stats = llm_processor.apply_pipeline_in_chunks(modifications, chunks, writer)
+        writer.close()
+        headers, row_count = writer.columns, writer.rows
+        processed_file = output.save(
+            UploadedFile(
+                name=processed_filename,
+                file_type=output_format,
+                headers=headers,
+                row_count=row_count,
+                uploaded_by=file_obj.uploaded_by,
+            )
+        )
+    return processed_file, stats
+
+
+class OutputFile:
+    """A processed file written in place under its final storage location.
+
+    Writers fill temp_path, a hidden file in the destination directory, and
+    save() links it under a free name and records it on an UploadedFile, so
+    the output is never copied or held in memory. Storages without local
+    paths get the temp file streamed to them instead. Anything not saved is
+    removed on exit.
+    """
+
+    def __init__(self, filename):
+        self.field = UploadedFile._meta.get_field("file")
+        self.storage = self.field.storage
+        self.name = self.field.generate_filename(None, filename)
+        try:
+            directory = os.path.dirname(self.storage.path(self.name))
+            os.makedirs(directory, exist_ok=True)
+        except NotImplementedError:
+            directory = None
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+        os.close(fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if os.path.exists(self.temp_path):
+            os.unlink(self.temp_path)
+
+    def save(self, uploaded_file):
+        """Move the output into storage, then save uploaded_file pointing at it"""
+        file_size = os.path.getsize(self.temp_path)
+        try:
+            self.storage.path(self.name)
+        except NotImplementedError:
+            with open(self.temp_path, "rb") as f:
+                name = self.storage.save(self.name, File(f), self.field.max_length)
+        else:
+            # mkstemp creates files private to us; match what storage.save sets
+            os.chmod(self.temp_path, self.storage.file_permissions_mode or 0o644)
+            name = self._link_available()
+            os.unlink(self.temp_path)
+        uploaded_file.file.name = name
+        uploaded_file.file_size = file_size
+        try:
+            uploaded_file.save()
+        except Exception:
+            self.storage.delete(name)
+            raise
+        return uploaded_file
+
+    def _link_available(self):
+        """Hard-link the output under a free name and return the name.
+
+        link() fails rather than replace a file, so a name another writer
+        takes between get_available_name and the link is not overwritten;
+        another name is tried instead.
+        """
+        name = self.name
+        while True:
+            name = self.storage.get_available_name(
+                name, max_length=self.field.max_length
+            )
+            try:
+                os.link(self.temp_path, self.storage.path(name))
+            except FileExistsError:
+                continue
+            return name
+
+
+def modification_from_dict(modification_data):
+    return RegexModification(
+        column_name=modification_data["column_name"],
+        regex_pattern=modification_data["regex_pattern"],
+        replacement=modification_data["replacement"],
+        description=modification_data["description"],
+        confidence=modification_data.get("confidence", 1.0),
+    )
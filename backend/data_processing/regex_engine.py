@@ -0,0 +1,898 @@
+import itertools
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+PYTHON_ENGINE = "python"
+ARROW_ENGINE = "arrow"
+
+# Below this many values compiling for Arrow and converting costs more
+# than it can save, so small inputs (previews) always use Python's re.
+ARROW_MIN_ROWS = 10_000
+TRIAL_ROWS = 2_000
+# Smallest partition worth shipping to a worker process
+PARALLEL_MIN_PARTITION_ROWS = 10_000
+# Columns with at most this share of distinct values are replaced once per
+# distinct value; factorizing costs about a quarter of a Python-engine pass
+FACTORIZE_MIN_ROWS = 10_000
+FACTORIZE_MAX_DISTINCT_RATIO = 0.1
+# Cardinality is estimated from at least this many rows and at least 1/50th
+# of the input: a sample of all-distinct values then estimates n / 7 distinct
+# values, safely above the factorize threshold
+CARDINALITY_SAMPLE_ROWS = 10_000
+CARDINALITY_SAMPLE_FRACTION = 50
+# Guarded replaces of at least this many values send them through shared
+# memory; fewer are cheaper to pickle
+GUARD_SHARED_MIN_ROWS = 10_000
+# At most this many guard processes run at once, further callers wait for
+# one; they stop after sitting idle this long, and a new one that is not
+# ready in time is given up on
+GUARD_MAX_PROCESSES = 4
+GUARD_IDLE_SECONDS = 60
+GUARD_START_SECONDS = 30
+
+try:
+    # re's parser is private, and may change in any Python release; it is
+    # known to work on 3.11 to 3.13. Without it (or the names used below),
+    # patterns are neither checked for backtracking nor translated to RE2,
+    # and always run on re.
+    import re._constants as sre_constants
+    import re._parser as sre_parse
+
+    # \d and \w (and their negations) are Unicode-aware in Python but ASCII-only
+    # in RE2; \s is left out, RE2's lacks \v even on ASCII
+    _RE2_CATEGORIES = {
+        sre_constants.CATEGORY_DIGIT: "\\d",
+        sre_constants.CATEGORY_NOT_DIGIT: "\\D",
+        sre_constants.CATEGORY_WORD: "\\w",
+        sre_constants.CATEGORY_NOT_WORD: "\\W",
+    }
+    # Anchors with the same meaning in both, once the requirements noted are met
+    _RE2_ANCHORS = {
+        sre_constants.AT_BEGINNING: "^",
+        sre_constants.AT_BEGINNING_STRING: "\\A",
+        sre_constants.AT_END_STRING: "\\z",
+        # Python's $ also matches before a trailing newline: single-line values
+        sre_constants.AT_END: "$",
+        # ASCII-only in RE2, like the categories
+        sre_constants.AT_BOUNDARY: "\\b",
+        sre_constants.AT_NON_BOUNDARY: "\\B",
+    }
+    _REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+except (ImportError, AttributeError):
+    sre_constants = sre_parse = None
+
+# RE2 refuses counted repetitions above this
+_RE2_MAX_REPEAT = 1000
+_RE2_FLAGS = {re.IGNORECASE: "i", re.DOTALL: "s"}
+
+
+class UnsafeRegexError(re.error):
+    """A pattern whose nested quantifiers can backtrack exponentially"""
+
+
+class RegexTimeoutError(ValueError):
+    """A replace that ran past its time budget and was killed"""
+
+
+@dataclass
+class RegexResult:
+    values: pd.Series
+    engine: str
+    elapsed_ms: float
+    # One bool per input value, True where the replacement changed it
+    changed: np.ndarray
+
+    @property
+    def changed_count(self) -> int:
+        return int(np.count_nonzero(self.changed))
+
+    def changed_positions(self) -> np.ndarray:
+        """Positions (not index labels) of the changed values"""
+        return np.flatnonzero(self.changed)
+
+    def changed_bitmap(self) -> bytes:
+        """The change mask packed eight rows to a byte, first row in the high bit"""
+        return np.packbits(self.changed).tobytes()
+
+
+class CompiledRegex:
+    """A modification's pattern and replacement, compiled and validated once.
+
+    replace() runs on Python's re by default. When the pattern and
+    replacement translate to RE2 with identical semantics, large inputs are
+    tried on Arrow's replace_substring_regex as well: the engine that agrees
+    with re and is faster on a sample is then used for every later call.
+    Small inputs with a time budget go straight to Arrow, sparing them a
+    guard process.
+    """
+
+    def __init__(self, pattern: str, replacement: str):
+        # All three raise re.error for an invalid pattern or group reference,
+        # or, as UnsafeRegexError, for a pattern that can backtrack without end
+        self.regex = re.compile(pattern)
+        self.template = _parse_template(replacement, self.regex)
+        check_backtracking(pattern)
+        self.pattern = pattern
+        self.replacement = replacement
+
+        self.arrow_pattern = None
+        self.arrow_rewrite = None
+        self.requires_ascii = False
+        self.requires_single_line = False
+        try:
+            self._check_re2_compatible()
+        except _Incompatible:
+            self.arrow_pattern = self.arrow_rewrite = None
+
+        self._preferred_engine = None
+        # Set once RE2 disagreed with re on a trial sample
+        self._arrow_mismatch = False
+        self._lock = threading.Lock()
+
+    def replace(
+        self,
+        values: pd.Series,
+        workers: int = 1,
+        factorize: bool | None = None,
+        time_budget: float | None = None,
+    ) -> RegexResult:
+        """Replace every match in a Series of strings, timing the engine used.
+
+        Large inputs with few distinct values are factorized and replaced once
+        per distinct value; factorize=None decides from the estimated
+        cardinality. With workers > 1, large inputs are split into partitions
+        and run on a process pool; each worker picks its own engine the same way.
+        With a time_budget in seconds, Python's re runs in a process that is
+        killed, raising RegexTimeoutError, if the call takes longer; RE2 runs
+        in linear time and needs no guard, so small inputs with a time_budget
+        use it whenever it would match re.
+        """
+        if factorize is None:
+            factorize = self._should_factorize(values)
+        if factorize:
+            return self._replace_factorized(values, workers, time_budget)
+        partitions = min(workers, len(values) // PARALLEL_MIN_PARTITION_ROWS)
+        if partitions > 1:
+            worker_pool.configure(workers)
+            try:
+                return self._replace_parallel(values, partitions, time_budget)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); start afresh next time
+                worker_pool.reset()
+        start = time.perf_counter()
+        arrow_values = None
+        if len(values) >= ARROW_MIN_ROWS:
+            if self._preferred_engine != PYTHON_ENGINE:
+                arrow_values = self._arrow_input(values)
+            if arrow_values is not None and not self._prefer_arrow(
+                values, arrow_values, time_budget
+            ):
+                arrow_values = None
+        elif time_budget is not None and not self._arrow_mismatch:
+            # RE2 runs in linear time, so a small input is cheaper on it than
+            # on re in a guard process
+            arrow_values = self._arrow_input(values)
+        if arrow_values is not None:
+            replaced_arrow = pc.replace_substring_regex(
+                arrow_values, pattern=self.arrow_pattern, replacement=self.arrow_rewrite
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            replaced = self._to_series(replaced_arrow, values)
+            changed = pc.not_equal(arrow_values, replaced_arrow).to_numpy(
+                zero_copy_only=False
+            )
+            engine = ARROW_ENGINE
+        else:
+            replaced = self._replace_python(values, time_budget)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            changed = np.not_equal(values.to_numpy(), replaced.to_numpy())
+            engine = PYTHON_ENGINE
+        return RegexResult(
+            values=replaced,
+            engine=engine,
+            elapsed_ms=elapsed_ms,
+            changed=np.asarray(changed, dtype=bool),
+        )
+
+    def _should_factorize(self, values):
+        if len(values) < FACTORIZE_MIN_ROWS:
+            return False
+        sample_rows = max(
+            CARDINALITY_SAMPLE_ROWS, len(values) // CARDINALITY_SAMPLE_FRACTION
+        )
+        distinct = estimate_distinct(values, sample_rows)
+        return distinct <= FACTORIZE_MAX_DISTINCT_RATIO * len(values)
+
+    def _replace_factorized(self, values, workers, time_budget):
+        """Replace each distinct value once and map the results back by code"""
+        start = time.perf_counter()
+        codes, uniques = pd.factorize(values.to_numpy(), use_na_sentinel=False)
+        distinct = self.replace(
+            pd.Series(uniques, dtype=object),
+            workers,
+            factorize=False,
+            time_budget=time_budget,
+        )
+        replaced = pd.Series(
+            distinct.values.to_numpy().take(codes),
+            index=values.index,
+            name=values.name,
+            dtype=object,
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return RegexResult(
+            values=replaced,
+            engine="factorized/" + distinct.engine,
+            elapsed_ms=elapsed_ms,
+            changed=distinct.changed.take(codes),
+        )
+
+    def _replace_parallel(self, values, partitions, time_budget):
+        start = time.perf_counter()
+        arrow_values = pa.array(values.to_numpy(), type=pa.large_string())
+        bounds = np.linspace(0, len(values), partitions + 1).astype(int)
+        inputs = []
+        try:
+            for begin, end in itertools.pairwise(bounds):
+                inputs.append(
+                    _write_shared_batch(
+                        pa.record_batch(
+                            [arrow_values.slice(begin, end - begin)], names=["value"]
+                        )
+                    )
+                )
+            futures = [
+                worker_pool.submit(
+                    _replace_partition, self.pattern, self.replacement, name, size
+                )
+                for name, size in inputs
+            ]
+            done, not_done = wait(futures, timeout=time_budget)
+            if not_done:
+                # The stuck workers cannot be interrupted, only killed
+                worker_pool.terminate()
+                for future in done:
+                    if future.exception() is None:
+                        _unlink_shared(future.result()[0])
+                raise RegexTimeoutError(_timeout_message(time_budget, len(values)))
+            outputs = [future.result() for future in futures]
+        finally:
+            for name, _ in inputs:
+                _unlink_shared(name)
+
+        replaced, changed, engines = [], [], set()
+        for name, size, engine in outputs:
+            try:
+                table = _read_shared_table(name, size)
+            finally:
+                _unlink_shared(name)
+            replaced.append(table["value"])
+            changed.append(table["changed"])
+            engines.add(engine)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return RegexResult(
+            values=pd.Series(
+                np.concatenate(replaced), index=values.index, name=values.name
+            ),
+            engine="parallel/" + "+".join(sorted(engines)),
+            elapsed_ms=elapsed_ms,
+            changed=np.concatenate(changed),
+        )
+
+    def _replace_python(self, values, time_budget=None):
+        if time_budget is not None:
+            replaced = regex_guard.run(
+                self.pattern, self.replacement, values.to_numpy(), time_budget
+            )
+            return pd.Series(replaced, index=values.index, name=values.name)
+        return values.str.replace(self.regex, self.replacement, regex=True)
+
+    def _replace_arrow(self, values, arrow_values):
+        replaced = pc.replace_substring_regex(
+            arrow_values, pattern=self.arrow_pattern, replacement=self.arrow_rewrite
+        )
+        return self._to_series(replaced, values)
+
+    def _to_series(self, replaced, values):
+        return pd.Series(
+            replaced.to_numpy(zero_copy_only=False),
+            index=values.index,
+            name=values.name,
+            dtype=object,
+        )
+
+    def _arrow_input(self, values):
+        """values as an Arrow array, or None if RE2 would not match re on them"""
+        if self.arrow_rewrite is None:
+            return None
+        try:
+            arrow_values = pa.array(values.to_numpy(), type=pa.large_string())
+        except (pa.ArrowException, TypeError):
+            return None
+        if self.requires_ascii and not pc.all(pc.string_is_ascii(arrow_values)).as_py():
+            return None
+        if (
+            self.requires_single_line
+            and pc.any(pc.match_substring(arrow_values, "\n")).as_py()
+        ):
+            return None
+        return arrow_values
+
+    def _prefer_arrow(self, values, arrow_values, time_budget=None):
+        if self._preferred_engine is None:
+            with self._lock:
+                if self._preferred_engine is None:
+                    self._preferred_engine = self._run_trial(
+                        values, arrow_values, time_budget
+                    )
+        return self._preferred_engine == ARROW_ENGINE
+
+    def _run_trial(self, values, arrow_values, time_budget=None):
+        """Time both engines on a sample; Arrow wins only if it agrees and is faster.
+
+        Agreement on the sample is a last check, not the proof: that is the
+        allowlisted translation in _check_re2_compatible.
+        """
+        sample = values.iloc[:: max(len(values) // TRIAL_ROWS, 1)][:TRIAL_ROWS]
+        start = time.perf_counter()
+        expected = self._replace_python(sample, time_budget)
+        python_time = time.perf_counter() - start
+        start = time.perf_counter()
+        try:
+            sample_arrow = pa.array(sample.to_numpy(), type=pa.large_string())
+            actual = self._replace_arrow(sample, sample_arrow)
+        except pa.ArrowException:
+            self._arrow_mismatch = True
+            return PYTHON_ENGINE
+        arrow_time = time.perf_counter() - start
+        if not np.array_equal(expected.to_numpy(), actual.to_numpy()):
+            self._arrow_mismatch = True
+            return PYTHON_ENGINE
+        return ARROW_ENGINE if arrow_time < python_time else PYTHON_ENGINE
+
+    def _check_re2_compatible(self):
+        """Build arrow_pattern and arrow_rewrite, or raise _Incompatible.
+
+        The RE2 pattern is written out from re's parse tree rather than
+        reused as text, so syntax the two read differently ({,3}, [[:alpha:]])
+        cannot slip through. Only constructs on an allowlist of identical
+        semantics are translated; anything else keeps the pattern on re.
+        """
+        if sre_parse is None:
+            raise _Incompatible()
+        parsed = sre_parse.parse(self.pattern)
+        if parsed.getwidth()[0] == 0:
+            # re and RE2 disagree on where empty matches may occur
+            raise _Incompatible()
+        self.arrow_pattern = self._re2_flags(parsed.state.flags, ")") + self._re2(
+            parsed
+        )
+        self.arrow_rewrite = self._re2_rewrite()
+
+    def _re2_flags(self, flags, end, removed=0):
+        """RE2 flag group for re flags, e.g. "(?i)" or "(?i-s:"; "" if none"""
+        # Verbose only changes how the pattern text was parsed
+        unknown = (flags | removed) & ~(sum(_RE2_FLAGS) | re.UNICODE | re.VERBOSE)
+        if unknown:
+            raise _Incompatible()
+        if flags & re.IGNORECASE:
+            self.requires_ascii = True
+        added = "".join(c for flag, c in _RE2_FLAGS.items() if flags & flag)
+        dropped = "".join(c for flag, c in _RE2_FLAGS.items() if removed & flag)
+        if not added and not dropped:
+            return "" if end == ")" else "(?:"
+        return f"(?{added}{'-' + dropped if dropped else ''}{end}"
+
+    def _re2(self, items):
+        return "".join(self._re2_item(op, av) for op, av in items)
+
+    def _re2_item(self, op, av):
+        if op == sre_constants.LITERAL:
+            return _re2_char(av)
+        if op == sre_constants.NOT_LITERAL:
+            return f"[^{_re2_char(av)}]"
+        if op == sre_constants.ANY:
+            return "."
+        if op == sre_constants.IN:
+            return self._re2_set(av)
+        if op == sre_constants.CATEGORY and av in _RE2_CATEGORIES:
+            self.requires_ascii = True
+            return _RE2_CATEGORIES[av]
+        if op == sre_constants.AT and av in _RE2_ANCHORS:
+            if av == sre_constants.AT_END:
+                self.requires_single_line = True
+            elif av in (sre_constants.AT_BOUNDARY, sre_constants.AT_NON_BOUNDARY):
+                self.requires_ascii = True
+            return _RE2_ANCHORS[av]
+        if op == sre_constants.BRANCH:
+            return "(?:" + "|".join(self._re2(branch) for branch in av[1]) + ")"
+        if op == sre_constants.SUBPATTERN:
+            group, add_flags, del_flags, items = av
+            body = self._re2_flags(add_flags, ":", del_flags) + self._re2(items) + ")"
+            return body if group is None else f"({body})"
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            low, high, items = av
+            if high == sre_constants.MAXREPEAT:
+                count = f"{{{low},}}"
+            elif high > _RE2_MAX_REPEAT:
+                raise _Incompatible()
+            else:
+                count = f"{{{low},{high}}}"
+            lazy = "?" if op == sre_constants.MIN_REPEAT else ""
+            return f"(?:{self._re2(items)}){count}{lazy}"
+        raise _Incompatible()
+
+    def _re2_set(self, items):
+        parts = []
+        for op, av in items:
+            if op == sre_constants.NEGATE and not parts:
+                parts.append("^")
+            elif op == sre_constants.LITERAL:
+                parts.append(_re2_char(av))
+            elif op == sre_constants.RANGE:
+                parts.append(f"{_re2_char(av[0])}-{_re2_char(av[1])}")
+            elif op == sre_constants.CATEGORY and av in _RE2_CATEGORIES:
+                self.requires_ascii = True
+                parts.append(_RE2_CATEGORIES[av])
+            else:
+                raise _Incompatible()
+        return "[" + "".join(parts) + "]"
+
+    def _re2_rewrite(self):
+        """Translate the replacement into RE2 rewrite syntax (\\1-\\9 only)"""
+        parts = []
+        for index, item in enumerate(self.template):
+            if index % 2 == 0:
+                parts.append(item.replace("\\", "\\\\"))
+            elif item > 9:
+                raise _Incompatible()
+            else:
+                parts.append(f"\\{item}")
+        return "".join(parts)
+
+
+class _Incompatible(Exception):
+    pass
+
+
+def _re2_char(code):
+    """A code point as RE2 pattern text: letters and digits as is, else escaped"""
+    char = chr(code)
+    if char.isascii() and char.isalnum():
+        return char
+    return f"\\x{{{code:x}}}"
+
+
+class WorkerPool:
+    """Lazily started process pool shared by every parallel replace.
+
+    Workers are spawned rather than forked, since the web process may be
+    multi-threaded, and are kept for the life of the process. Asking for a
+    different size replaces the pool.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._size = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        return self._get_executor().submit(fn, *args)
+
+    def configure(self, size):
+        with self._lock:
+            if self._executor is not None and self._size != size:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self._size = size
+
+    def reset(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def terminate(self):
+        """Kill the workers, even mid-task, and start afresh next time"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        if hasattr(executor, "terminate_workers"):
+            # Python 3.14+
+            executor.terminate_workers()
+            return
+        # Private, but present from 3.8 to 3.13; without it the workers are
+        # left to finish their current task
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._size or 1,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+
+worker_pool = WorkerPool()
+
+
+class RegexGuard:
+    """Runs Python-engine replaces in spawned processes that can be killed.
+
+    re cannot be interrupted from another thread, so a replace still running
+    when its budget is up is stopped by killing its process. At most
+    GUARD_MAX_PROCESSES are kept between calls; each waits for work once its
+    imports are done, so the budget only covers the replace itself, and is
+    stopped after GUARD_IDLE_SECONDS without any.
+    """
+
+    def __init__(self):
+        self._idle = []
+        self._processes = 0
+        self._reaper = None
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def run(self, pattern, replacement, values, time_budget):
+        """values replaced as an object array; raises RegexTimeoutError.
+
+        Waits for a free process when GUARD_MAX_PROCESSES are busy. Only the
+        changed values come back, with their positions. Many strings travel
+        as Arrow batches in shared memory, about twice as fast as pickling
+        them through the pipe.
+        """
+        shared = None
+        if len(values) >= GUARD_SHARED_MIN_ROWS:
+            try:
+                shared = _write_shared_batch(
+                    pa.record_batch(
+                        [pa.array(values, type=pa.large_string())], names=["value"]
+                    )
+                )
+            except (pa.ArrowException, TypeError):
+                pass
+        try:
+            process, conn = self._send((pattern, replacement, shared or values))
+            try:
+                if not conn.poll(time_budget):
+                    raise RegexTimeoutError(_timeout_message(time_budget, len(values)))
+                ok, result = conn.recv()
+            except EOFError as e:
+                self._discard(process, conn)
+                raise RuntimeError("Regex guard process died during the replace") from e
+            except BaseException:
+                self._discard(process, conn)
+                raise
+        finally:
+            if shared:
+                _unlink_shared(shared[0])
+        self._release(process, conn)
+        if not ok:
+            raise result
+        if isinstance(result, tuple):
+            name, size = result
+            try:
+                result = _read_shared_table(name, size)
+            finally:
+                _unlink_shared(name)
+        replaced = values.copy()
+        replaced[result["position"]] = result["value"]
+        return replaced
+
+    def _send(self, work):
+        """Send work to a guard process; returns the process and its pipe"""
+        while True:
+            process, conn = self._acquire()
+            try:
+                conn.send(work)
+            except BrokenPipeError:
+                # It died while idle; try another
+                self._discard(process, conn)
+                continue
+            except BaseException:
+                self._discard(process, conn)
+                raise
+            return process, conn
+
+    def _acquire(self):
+        """An idle or new process with its pipe, waiting while none is free"""
+        with self._released:
+            while True:
+                while self._idle:
+                    process, conn, _ = self._idle.pop()
+                    if process.is_alive():
+                        return process, conn
+                    self._processes -= 1
+                    conn.close()
+                if self._processes < GUARD_MAX_PROCESSES:
+                    self._processes += 1
+                    break
+                self._released.wait()
+        context = multiprocessing.get_context("spawn")
+        conn, child_conn = context.Pipe()
+        process = context.Process(target=_guard_worker, args=(child_conn,), daemon=True)
+        try:
+            process.start()
+            child_conn.close()
+            if conn.poll(GUARD_START_SECONDS):
+                conn.recv()
+                return process, conn
+        except EOFError:
+            pass
+        except BaseException:
+            self._discard(process, conn)
+            raise
+        self._discard(process, conn)
+        raise RuntimeError("Regex guard process did not start")
+
+    def _release(self, process, conn):
+        with self._released:
+            self._idle.append((process, conn, time.monotonic()))
+            self._schedule_reap()
+            self._released.notify()
+
+    def _discard(self, process, conn):
+        if process.pid is not None:
+            process.kill()
+            process.join()
+        conn.close()
+        with self._released:
+            self._processes -= 1
+            self._released.notify()
+
+    def _schedule_reap(self):
+        if self._reaper is None and self._idle:
+            self._reaper = threading.Timer(GUARD_IDLE_SECONDS, self._reap)
+            self._reaper.daemon = True
+            self._reaper.start()
+
+    def _reap(self):
+        """Stop the processes idle for GUARD_IDLE_SECONDS"""
+        cutoff = time.monotonic() - GUARD_IDLE_SECONDS
+        with self._released:
+            self._reaper = None
+            stale = [worker for worker in self._idle if worker[2] <= cutoff]
+            self._idle = [worker for worker in self._idle if worker[2] > cutoff]
+            self._schedule_reap()
+        for process, conn, _ in stale:
+            self._discard(process, conn)
+
+
+regex_guard = RegexGuard()
+
+# Per worker process: compiled regexes by (pattern, replacement), so the
+# Arrow trial runs once per worker rather than once per partition
+_worker_regexes = {}
+
+
+def _replace_partition(pattern, replacement, name, size):
+    """Worker side of a parallel replace: shared-memory batch in, batch out"""
+    key = (pattern, replacement)
+    if key not in _worker_regexes:
+        _worker_regexes[key] = CompiledRegex(pattern, replacement)
+    table = _read_shared_table(name, size)
+    result = _worker_regexes[key].replace(pd.Series(table["value"], dtype=object))
+    batch = pa.record_batch(
+        [
+            pa.array(result.values.to_numpy(), type=pa.large_string()),
+            pa.array(result.changed),
+        ],
+        names=["value", "changed"],
+    )
+    out_name, out_size = _write_shared_batch(batch)
+    return out_name, out_size, result.engine
+
+
+def _guard_worker(conn):
+    """RegexGuard process: replace each batch of values sent until the pipe closes"""
+    conn.send("ready")
+    while True:
+        try:
+            pattern, replacement, values = conn.recv()
+        except EOFError:
+            return
+        try:
+            key = (pattern, replacement)
+            if key not in _worker_regexes:
+                _worker_regexes[key] = CompiledRegex(pattern, replacement)
+            if isinstance(values, tuple):
+                values = _read_shared_table(*values)["value"]
+            replaced = (
+                _worker_regexes[key]
+                ._replace_python(pd.Series(values, dtype=object))
+                .to_numpy()
+            )
+            positions = np.flatnonzero(np.not_equal(values, replaced))
+            changes = {"position": positions, "value": replaced[positions]}
+            if len(positions) >= GUARD_SHARED_MIN_ROWS:
+                changes = _write_shared_batch(
+                    pa.record_batch(
+                        [
+                            pa.array(positions),
+                            pa.array(changes["value"], type=pa.large_string()),
+                        ],
+                        names=["position", "value"],
+                    )
+                )
+            conn.send((True, changes))
+        except Exception as e:
+            conn.send((False, e))
+
+
+def _timeout_message(time_budget, rows):
+    return (
+        f"Regex replacement took longer than {time_budget:g}s on {rows} values "
+        "and was stopped; the pattern likely backtracks catastrophically"
+    )
+
+
+def _write_shared_batch(batch):
+    """Write batch as an Arrow IPC stream into a new shared memory block.
+
+    The size is measured first so the stream is written straight into the
+    block, with no intermediate buffer. Blocks are untracked: whoever reads
+    one last unlinks it, whichever process created it.
+    """
+    mock = pa.MockOutputStream()
+    with pa.ipc.new_stream(mock, batch.schema) as writer:
+        writer.write_batch(batch)
+    size = mock.size()
+    shm = SharedMemory(create=True, size=max(size, 1), track=False)
+    try:
+        buffer = pa.py_buffer(shm.buf)
+        sink = pa.FixedSizeBufferWriter(buffer)
+        writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        writer.close()
+        sink.close()
+        # Arrow objects pin the mapping; drop them before closing it
+        del writer, sink, buffer
+    finally:
+        shm.close()
+    return shm.name, size
+
+
+def _read_shared_table(name, size):
+    """Copy the columns of an Arrow IPC stream in shared memory out as numpy arrays"""
+    shm = SharedMemory(name=name, track=False)
+    try:
+        buffer = pa.py_buffer(shm.buf)[:size]
+        table = pa.ipc.open_stream(buffer).read_all()
+        # Numeric columns would otherwise be views into the block
+        columns = {
+            column: table[column].to_numpy(zero_copy_only=False).copy()
+            for column in table.column_names
+        }
+        del table, buffer
+    finally:
+        shm.close()
+    return columns
+
+
+def _unlink_shared(name):
+    try:
+        shm = SharedMemory(name=name, track=False)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def estimate_distinct(values: pd.Series, sample_rows: int) -> float:
+    """Estimate how many distinct values a Series holds from an even sample.
+
+    Uses the GEE estimator: values seen once in the sample are scaled up by
+    sqrt(len(values) / sample size), values seen more often count once.
+    """
+    step = max(len(values) // sample_rows, 1)
+    sample = values.iloc[::step]
+    if len(sample) == 0:
+        return 0.0
+    counts = sample.value_counts(dropna=False).to_numpy()
+    singletons = int(np.count_nonzero(counts == 1))
+    scale = np.sqrt(len(values) / len(sample))
+    return scale * singletons + (len(counts) - singletons)
+
+
+def check_backtracking(pattern: str) -> None:
+    """Raise UnsafeRegexError for nested quantifiers that can backtrack exponentially.
+
+    A repeat is flagged when its body can split one run of text between
+    iterations in many ways: it holds a variable-length repeat, directly or
+    in a group or alternative, and everything else in it can match nothing,
+    as in (a+)+, (\\w+\\s?)* or (x|\\d+)+. Atomic groups and possessive
+    repeats do not backtrack and are not flagged. Without re's parser nothing
+    is flagged; budgeted replaces still run under the guard.
+    """
+    if sre_parse is None:
+        return
+    parsed = sre_parse.parse(pattern)
+    if _has_nested_quantifier(parsed, parsed.state):
+        raise UnsafeRegexError(
+            "nested quantifiers can backtrack catastrophically; make the inner "
+            "repetition unambiguous or atomic",
+            pattern,
+        )
+
+
+def _parse_template(replacement, regex):
+    """replacement parsed against regex; raises re.error for a bad reference.
+
+    Without re's parser the replacement is instead expanded on an empty
+    match with the same groups, which raises the same errors, and None is
+    returned.
+    """
+    if sre_parse is not None:
+        return sre_parse.parse_template(replacement, regex)
+    names = {index: name for name, index in regex.groupindex.items()}
+    groups = "".join(
+        f"(?P<{names[index]}>)" if index in names else "()"
+        for index in range(1, regex.groups + 1)
+    )
+    try:
+        re.match(groups, "").expand(replacement)
+    except IndexError as e:
+        # Raised for an unknown group name, which the parser reports as re.error
+        raise re.error(str(e)) from e
+    return None
+
+
+def _has_nested_quantifier(items, state):
+    for op, av in items:
+        if op in _REPEATS:
+            if av[1] > 1 and _splittable(av[2], state):
+                return True
+            if _has_nested_quantifier(av[2], state):
+                return True
+        elif op == sre_constants.SUBPATTERN:
+            if _has_nested_quantifier(av[3], state):
+                return True
+        elif op == sre_constants.BRANCH:
+            if any(_has_nested_quantifier(branch, state) for branch in av[1]):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _has_nested_quantifier(av[1], state):
+                return True
+    return False
+
+
+def _splittable(items, state):
+    """Whether items can match a run of text split at many different points"""
+    items = list(items)
+    for index, (op, av) in enumerate(items):
+        if op in _REPEATS:
+            absorbs = av[1] > 1 and av[1] > av[0]
+        elif op == sre_constants.SUBPATTERN:
+            absorbs = _splittable(av[3], state)
+        elif op == sre_constants.BRANCH:
+            absorbs = any(_splittable(branch, state) for branch in av[1])
+        else:
+            absorbs = False
+        rest = sre_parse.SubPattern(state, items[:index] + items[index + 1 :])
+        if absorbs and rest.getwidth()[0] == 0:
+            return True
+    return False
+
+
+def compile_regex(pattern: str, replacement: str) -> CompiledRegex | None:
+    """Compile a modification's regex, or None when there is no pattern"""
+    if not pattern:
+        return None
+    return CompiledRegex(pattern, replacement)
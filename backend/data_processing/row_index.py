@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from .compression import detect_compression, open_binary
+from .file_metadata import scan_csv_records
+
+ROW_INDEX_STRIDE = 1_000
+
+
+def build_csv_row_index(file_path, stride=ROW_INDEX_STRIDE):
+    """Byte offsets at which data rows 0, stride, 2 * stride, ... begin.
+
+    Data row k starts right after record k, the header being record 0, so
+    the index is every stride-th record end from scan_csv_records. Raises
+    AmbiguousCSVError for files the scanner cannot split safely. Compressed
+    files cannot be seeked into and get an empty index.
+    """
+    if detect_compression(file_path) is not None:
+        return np.empty(0, dtype=np.int64)
+    checkpoints = []
+    records_seen = 0
+    with open(file_path, "rb") as f:
+        for ends in scan_csv_records(f):
+            checkpoints.append(ends[(-records_seen) % stride :: stride])
+            records_seen += len(ends)
+    if not checkpoints:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(checkpoints).astype(np.int64)
+
+
+def read_csv_rows(file_path, row_index, offset, limit, stride=ROW_INDEX_STRIDE):
+    """Read data rows [offset, offset + limit) by seeking to the nearest checkpoint.
+
+    At most stride - 1 rows are parsed and dropped before the page, however
+    deep it is.
+    """
+    columns = list(pd.read_csv(file_path, nrows=0).columns)
+    if not len(row_index):
+        return pd.DataFrame(columns=columns)
+    checkpoint = min(offset // stride, len(row_index) - 1)
+    skip = offset - checkpoint * stride
+    with open(file_path, "rb") as f:
+        f.seek(int(row_index[checkpoint]))
+        try:
+            df = pd.read_csv(f, header=None, names=columns, nrows=skip + limit)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame(columns=columns)
+    return df.iloc[skip:].reset_index(drop=True)
+
+
+def iter_csv_positions(
+    file_path, row_index, positions, usecols=None, dtype=None, stride=ROW_INDEX_STRIDE
+):
+    """Yield the data rows at positions, one row index stride at a time.
+
+    Strides are read in the order their first position appears, each by
+    seeking to its checkpoint and parsing only up to its last wanted row.
+    Each DataFrame is indexed by row position. A stride infers dtypes from
+    its own rows, so pass the whole file's as dtype where they matter.
+    """
+    columns = list(pd.read_csv(file_path, nrows=0).columns)
+    blocks = positions // stride
+    with open(file_path, "rb") as f:
+        for block in pd.unique(blocks):
+            if block >= len(row_index):
+                continue
+            wanted = np.sort(positions[blocks == block])
+            start = int(block) * stride
+            f.seek(int(row_index[block]))
+            try:
+                rows = pd.read_csv(
+                    f,
+                    header=None,
+                    names=columns,
+                    usecols=usecols,
+                    dtype=dtype,
+                    nrows=int(wanted[-1]) - start + 1,
+                )
+            except pd.errors.EmptyDataError:
+                continue
+            if usecols is not None:
+                rows = rows[usecols]
+            wanted = wanted[wanted < start + len(rows)]
+            yield rows.iloc[wanted - start].set_axis(wanted)
+
+
+def read_csv_rows_slow(file_path, offset, limit, chunksize):
+    """Page through a CSV from the top, for files that cannot be indexed"""
+    pages = []
+    start = 0
+    with open_binary(file_path) as f:
+        for chunk in pd.read_csv(f, chunksize=chunksize):
+            end = start + len(chunk)
+            if end > offset:
+                pages.append(
+                    chunk.iloc[max(offset - start, 0) : offset + limit - start]
+                )
+            if end >= offset + limit:
+                break
+            start = end
+    if not pages:
+        with open_binary(file_path) as f:
+            return pd.DataFrame(columns=pd.read_csv(f, nrows=0).columns)
+    return pd.concat(pages).reset_index(drop=True)
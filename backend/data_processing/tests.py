@@ -1,9 +1,86 @@
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import asdict
+from datetime import timedelta
+from unittest import mock
+
+import pandas as pd
+import pyarrow as pa
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+
+from .column_profile import (
+    aensure_column_profile,
+    ensure_column_profile,
+    format_profile,
+    profile_chunks,
+)
+from .column_ranker import ColumnRanker
+from .compression import detect_compression
+from .file_cache import ParsedFileCache, iter_dataframe_chunks, load_dataframe
+from .file_io import CSVChunkWriter, iter_csv_chunks, iter_xlsx_chunks, read_xlsx
+from .file_metadata import extract_file_metadata, scan_csv_records
+from .impact import estimate_impact
+from .jobs import (
+    Heartbeat,
+    ModificationJobRunner,
+    requeue_interrupted_jobs,
+    run_job,
+)
+from .llm_cache import llm_result_cache
+from .llm_client import llm_client_registry
+from .llm_service import (
+    BatchRegexModificationItem,
+    BatchRegexModificationOutput,
+    LLMDataProcessor,
+    RegexModification,
+    RegexModificationOutput,
+)
+from .models import LLMCacheEntry, LLMInstructionLog, ModificationJob, UploadedFile
+from .processing import apply_modification_to_upload
+from .regex_engine import (
+    ARROW_ENGINE,
+    ARROW_MIN_ROWS,
+    FACTORIZE_MIN_ROWS,
+    PARALLEL_MIN_PARTITION_ROWS,
+    PYTHON_ENGINE,
+    CompiledRegex,
+    RegexGuard,
+    RegexTimeoutError,
+    UnsafeRegexError,
+    estimate_distinct,
+)
+from .row_index import build_csv_row_index, read_csv_rows
+
+# Every test's uploads, outputs and parsed-file cache go to a scratch
+# directory, removed once the module has run
+_scratch_dir = tempfile.mkdtemp()
+_scratch_settings = override_settings(
+    MEDIA_ROOT=os.path.join(_scratch_dir, "media"),
+    PARSED_FILE_CACHE_DIR=os.path.join(_scratch_dir, "parsed_cache"),
+)
+
+
+def setUpModule():
+    _scratch_settings.enable()
 
-from .llm_service import RegexModification
-from .models import UploadedFile
+
+def tearDownModule():
+    _scratch_settings.disable()
+    shutil.rmtree(_scratch_dir, ignore_errors=True)
 
 
 class UploadedFileModelTest(TestCase):
@@ -34,6 +111,32 @@ class FileUploadAPITest(TestCase):
         self.assertEqual(uploaded_file.name, "test.csv")
         self.assertEqual(uploaded_file.file_type, "csv")
 
+    def test_duplicate_upload_shares_blob_and_metadata(self):
+        content = b"name,age\nJohn,25\nJane,30\n"
+        first = self.client.post(
+            self.upload_url,
+            {"file": SimpleUploadedFile("a.csv", content), "file_type": "csv"},
+        ).json()
+        with mock.patch("data_processing.views.parse_file_headers") as parse:
+            second = self.client.post(
+                self.upload_url,
+                {"file": SimpleUploadedFile("b.csv", content), "file_type": "csv"},
+            ).json()
+            parse.assert_not_called()
+        self.assertEqual(second["name"], "b.csv")
+        self.assertEqual(second["headers"], ["name", "age"])
+        self.assertEqual(second["row_count"], 2)
+        self.assertEqual(second["file_url"], first["file_url"])
+        original, duplicate = UploadedFile.objects.order_by("pk")
+        self.assertEqual(original.content_hash, duplicate.content_hash)
+        self.assertEqual(len(original.content_hash), 64)
+
+        path = original.file.path
+        self.client.delete(reverse("data_processing:file-detail", args=[original.pk]))
+        self.assertTrue(os.path.isfile(path))
+        duplicate.delete()
+        self.assertFalse(os.path.isfile(path))
+
     def test_upload_missing_file_type(self):
         csv_file = SimpleUploadedFile(
             "test.csv", b"test,data\n1,2", content_type="text/csv"
@@ -43,6 +146,93 @@ class FileUploadAPITest(TestCase):
         self.assertEqual(response.status_code, 400)
 
 
+class FileListAPITest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.list_url = reverse("data_processing:file-list")
+        user = User.objects.create_user("lister")
+        for i in range(5):
+            UploadedFile.objects.create(
+                name=f"file{i}.csv",
+                file=SimpleUploadedFile(f"file{i}.csv", b"a\n1\n"),
+                file_type="csv" if i % 2 else "excel",
+                file_size=4,
+                uploaded_by=user,
+            )
+
+    def test_keyset_pages_cover_every_file_once(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            with self.assertNumQueries(1):
+                data = self.client.get(self.list_url, params).json()
+            seen += [item["id"] for item in data["results"]]
+            for item in data["results"]:
+                self.assertEqual(item["uploaded_by"], "lister")
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        expected = list(
+            UploadedFile.objects.order_by("-uploaded_at", "-id").values_list(
+                "pk", flat=True
+            )
+        )
+        self.assertEqual(seen, expected)
+
+    def test_filter_and_field_projection(self):
+        data = self.client.get(
+            self.list_url, {"file_type": "csv", "fields": "id,name"}
+        ).json()
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual(set(data["results"][0]), {"id", "name"})
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.list_url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class FileMetadataTest(TestCase):
+    def _write(self, suffix, content):
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+            f.write(content)
+        return f.name
+
+    def test_csv_metadata_matches_pandas(self):
+        content = (
+            b'\nname,name,\r\n"Doe, John","line one\nline two",1\r\n'
+            b"\r\n   \r\n"
+            b'Jane,"say ""hi""",2\r\n,,'
+        )
+        path = self._write(".csv", content)
+        expected = pd.read_csv(path)
+        headers, row_count = extract_file_metadata(path, "csv")
+        self.assertEqual(headers, list(expected.columns))
+        self.assertEqual(row_count, len(expected))
+        for chunk_size in (1, 3, 16):
+            with open(path, "rb") as f:
+                ends = sum(len(e) for e in scan_csv_records(f, chunk_size=chunk_size))
+            self.assertEqual(ends, len(expected) + 1)
+
+    def test_csv_with_stray_quotes_falls_back(self):
+        path = self._write(".csv", b'item,size\npipe,12" wide\nbolt,"3"\n')
+        self.assertEqual(extract_file_metadata(path, "csv"), (["item", "size"], 2))
+
+        content = b'item,size\npipe,12" wide\n,\n\n   \n""\n"a\nb",2\n'
+        path = self._write(".csv", content)
+        _, row_count = extract_file_metadata(path, "csv")
+        self.assertEqual(row_count, len(pd.read_csv(path)))
+
+    def test_xlsx_metadata_from_dimensions(self):
+        path = self._write(".xlsx", b"")
+        pd.DataFrame({"a": [1, 2, 3], "b": ["x", None, "z"]}).to_excel(
+            path, index=False
+        )
+        self.assertEqual(extract_file_metadata(path, "excel"), (["a", "b"], 3))
+
+
 class FilePreviewAPITest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -69,6 +259,1212 @@ class FilePreviewAPITest(TestCase):
         self.assertEqual(data["preview_rows"], 2)
         self.assertEqual(len(data["data"]), 2)
 
+    def test_file_preview_offset_and_limit(self):
+        preview_url = reverse(
+            "data_processing:file-preview", args=[self.uploaded_file.pk]
+        )
+        response = self.client.get(preview_url, {"offset": 1, "limit": 5})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["offset"], 1)
+        self.assertEqual([row["name"] for row in data["data"]], ["Jane"])
+
+        response = self.client.get(preview_url, {"offset": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_conditional_requests_return_not_modified(self):
+        preview_url = reverse(
+            "data_processing:file-preview", args=[self.uploaded_file.pk]
+        )
+        detail_url = reverse(
+            "data_processing:file-detail", args=[self.uploaded_file.pk]
+        )
+        for url in (preview_url, detail_url):
+            response = self.client.get(url)
+            etag = response["ETag"]
+            self.assertTrue(etag.startswith(f'"{self.uploaded_file.pk}-'))
+            self.assertIn("Last-Modified", response)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_etag_does_not_read_file(self):
+        url = reverse("data_processing:file-detail", args=[self.uploaded_file.pk])
+        etag = self.client.get(url)["ETag"]
+        with mock.patch("django.db.models.fields.files.FieldFile.open") as open_:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        open_.assert_not_called()
+
+    def test_preview_payload_is_cached(self):
+        preview_url = reverse(
+            "data_processing:file-preview", args=[self.uploaded_file.pk]
+        )
+        first = self.client.get(preview_url, {"rows": 1}).json()
+        with mock.patch("data_processing.views.get_file_preview") as preview:
+            second = self.client.get(preview_url, {"rows": 1}).json()
+            preview.assert_not_called()
+        self.assertEqual(first["data"], second["data"])
+
+
+class ParsedFileCacheTest(TestCase):
+    def _create_csv(self, name, content):
+        return UploadedFile.objects.create(
+            name=name,
+            file=SimpleUploadedFile(name, content),
+            file_type="csv",
+            file_size=len(content),
+        )
+
+    def test_cache_is_built_once(self):
+        cache = ParsedFileCache()
+        file_obj = self._create_csv("cached.csv", b"name,age\nJohn,25\nJane,\n")
+        first = cache.load(file_obj)
+        with mock.patch("data_processing.file_cache.read_dataframe") as read:
+            second = cache.load(file_obj)
+            read.assert_not_called()
+        self.assertEqual(
+            first.astype(str).values.tolist(), second.astype(str).values.tolist()
+        )
+
+    def test_partial_read_uses_cache_when_present(self):
+        cache = ParsedFileCache()
+        file_obj = self._create_csv("partial.csv", b"a,b\n1,x\n2,\n3,z\n")
+        cache.load(file_obj)
+        head = cache.load(file_obj, nrows=2)
+        self.assertEqual(len(head), 2)
+        self.assertEqual(head["b"].astype(str).tolist(), ["x", "nan"])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ParsedFileCache()
+        old = self._create_csv("old.csv", b"a\n1\n")
+        new = self._create_csv("new.csv", b"a\n2\n")
+        cache.load(old)
+        cache._max_bytes = cache.path_for(old).stat().st_size
+        cache.load(new)
+        self.assertIsNone(cache.lookup(old))
+        self.assertIsNotNone(cache.lookup(new))
+
+    def test_row_index_pages_match_full_read(self):
+        cache = ParsedFileCache()
+        lines = ["n,text"] + [
+            f'{i},"row\n{i}"' if i % 3 else f"{i},r{i}\n" for i in range(50)
+        ]
+        file_obj = self._create_csv("paged.csv", "\n".join(lines).encode())
+        full = pd.read_csv(file_obj.file.path)
+        row_index = build_csv_row_index(file_obj.file.path, stride=7)
+        for offset in (0, 6, 7, 20, 48, 60):
+            page = read_csv_rows(file_obj.file.path, row_index, offset, 4, stride=7)
+            self.assertEqual(
+                page.values.tolist(), full.iloc[offset : offset + 4].values.tolist()
+            )
+
+        page = cache.read_rows(file_obj, 10, 3)
+        self.assertEqual(page["n"].tolist(), [10, 11, 12])
+        self.assertIsNone(cache.lookup(file_obj))
+        cache.load(file_obj)
+        page = cache.read_rows(file_obj, 10, 3)
+        self.assertEqual(page["n"].tolist(), [10, 11, 12])
+
+        prefix = cache.content_key(file_obj)
+        self.assertEqual(len(list(cache.cache_dir.glob(f"{prefix}_*"))), 2)
+        file_obj.delete()
+        self.assertEqual(list(cache.cache_dir.glob(f"{prefix}_*")), [])
+
+    def test_duplicates_share_entries(self):
+        cache = ParsedFileCache()
+        content = b"a,b\n1,x\n2,y\n"
+        original = self._create_csv("daily.csv", content)
+        original.content_hash = hashlib.sha256(content).hexdigest()
+        original.save(update_fields=["content_hash"])
+        duplicate = UploadedFile.objects.create(
+            name="daily.csv",
+            file=original.file.name,
+            file_type="csv",
+            file_size=original.file_size,
+            content_hash=original.content_hash,
+        )
+        cache.load(original)
+        self.assertEqual(cache.lookup(duplicate), cache.lookup(original))
+        original.delete()
+        self.assertIsNotNone(cache.lookup(duplicate))
+        duplicate.delete()
+        pattern = f"{original.content_hash}_*"
+        self.assertEqual(list(cache.cache_dir.glob(pattern)), [])
+
+
+class ChunkedApplyTest(TestCase):
+    csv_content = "id,code,note\n1,A-1,x\n2,B-2,\n3,,y\n,A-4,z\n5,A-5,w\n"
+
+    def setUp(self):
+        self.modification = RegexModification(
+            column_name="id",
+            regex_pattern=r"\.0$",
+            replacement="",
+            description="Drop trailing .0",
+            confidence=1.0,
+        )
+        self.processor = LLMDataProcessor(api_key="test-key")
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, "source.csv")
+        with open(self.source, "w") as f:
+            f.write(self.csv_content)
+
+    def test_chunks_use_whole_file_dtypes(self):
+        chunks = list(iter_csv_chunks(self.source, chunksize=2))
+        self.assertEqual(
+            pd.concat(chunks).astype(str).values.tolist(),
+            pd.read_csv(self.source).astype(str).values.tolist(),
+        )
+
+    def _write_xlsx(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["id", "flag", "when", "code", "code"])
+        for i in range(7):
+            sheet.append(
+                [
+                    None if i == 5 else i,
+                    None if i == 6 else i % 2 == 0,
+                    None if i < 3 else pd.Timestamp(2024, 1, i + 1).to_pydatetime(),
+                    "A-1" if i == 4 else str(i),
+                    "=1/0" if i == 2 else 1.5,
+                ]
+            )
+        sheet.append([])
+        path = os.path.join(self.temp_dir, "source.xlsx")
+        workbook.save(path)
+        return path
+
+    def test_xlsx_chunks_match_read_excel(self):
+        path = self._write_xlsx()
+        expected = pd.read_excel(path, engine="openpyxl")
+        for chunksize in (1, 2, 3, 100):
+            chunks = list(iter_xlsx_chunks(path, chunksize=chunksize))
+            self.assertEqual(len(chunks), -(-len(expected) // chunksize))
+            combined = pd.concat(chunks, ignore_index=True)
+            pd.testing.assert_frame_equal(combined, expected)
+        pd.testing.assert_frame_equal(
+            read_xlsx(path, nrows=2), pd.read_excel(path, engine="openpyxl", nrows=2)
+        )
+
+    def test_chunked_apply_matches_in_memory_apply(self):
+        expected_df, expected_stats = self.processor.apply_modification_to_file(
+            self.modification, pd.read_csv(self.source)
+        )
+        expected_path = os.path.join(self.temp_dir, "expected.csv")
+        expected_df.to_csv(expected_path, index=False)
+
+        output_path = os.path.join(self.temp_dir, "chunked.csv")
+        writer = CSVChunkWriter(output_path)
+        stats = self.processor.apply_modification_in_chunks(
+            self.modification, iter_csv_chunks(self.source, chunksize=2), writer
+        )
+        stats.pop("regex_time_ms")
+        expected_stats.pop("regex_time_ms")
+        self.assertEqual(stats, expected_stats)
+        self.assertEqual(stats["modified_rows"], 4)
+        self.assertEqual(writer.rows, 5)
+        with open(output_path) as chunked, open(expected_path) as expected:
+            self.assertEqual(chunked.read(), expected.read())
+
+    @mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key"})
+    def test_apply_view_streams_csv(self):
+        uploaded = UploadedFile.objects.create(
+            name="apply.csv",
+            file=SimpleUploadedFile("apply.csv", self.csv_content.encode()),
+            file_type="csv",
+            file_size=len(self.csv_content),
+        )
+        response = Client().post(
+            reverse("data_processing:apply-modification", args=[uploaded.pk]),
+            data=json.dumps({"modification": asdict(self.modification)}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["stats"]["modified_rows"], 4)
+        self.assertEqual(data["processed_file"]["row_count"], 5)
+        self.assertEqual(data["processed_file"]["headers"], ["id", "code", "note"])
+        processed = UploadedFile.objects.get(pk=data["processed_file"]["id"])
+        self.assertEqual(processed.file_size, os.path.getsize(processed.file.path))
+        output_dir = os.path.dirname(processed.file.path)
+        self.assertFalse([n for n in os.listdir(output_dir) if n.endswith(".part")])
+
+    @mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key"})
+    def test_apply_streams_xlsx(self):
+        path = self._write_xlsx()
+        expected_df, expected_stats = self.processor.apply_modification_to_file(
+            self.modification, pd.read_excel(path, engine="openpyxl")
+        )
+        expected_path = os.path.join(self.temp_dir, "expected.xlsx")
+        expected_df.to_excel(expected_path, index=False)
+        with open(path, "rb") as f:
+            uploaded = UploadedFile.objects.create(
+                name="apply.xlsx",
+                file=SimpleUploadedFile("apply.xlsx", f.read()),
+                file_type="excel",
+                file_size=os.path.getsize(path),
+            )
+        progress = []
+        processed, stats = apply_modification_to_upload(
+            uploaded, self.modification, progress.append
+        )
+        stats.pop("regex_time_ms")
+        expected_stats.pop("regex_time_ms")
+        self.assertEqual(stats, expected_stats)
+        self.assertEqual(progress, [7])
+        self.assertEqual(processed.row_count, 7)
+        self.assertTrue(processed.file.name.endswith(".xlsx"))
+        pd.testing.assert_frame_equal(
+            pd.read_excel(processed.file.path), pd.read_excel(expected_path)
+        )
+
+    @mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key"})
+    def test_aborted_apply_leaves_no_output(self):
+        uploaded = UploadedFile.objects.create(
+            name="apply.csv",
+            file=SimpleUploadedFile("apply.csv", self.csv_content.encode()),
+            file_type="csv",
+            file_size=len(self.csv_content),
+        )
+        output_dir = os.path.dirname(uploaded.file.path)
+        before = set(os.listdir(output_dir))
+
+        def abort(rows_done):
+            raise RuntimeError("stop")
+
+        with self.assertRaises(RuntimeError):
+            apply_modification_to_upload(uploaded, self.modification, abort)
+        self.assertEqual(set(os.listdir(output_dir)), before)
+        self.assertEqual(UploadedFile.objects.count(), 1)
+
+    @mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key"})
+    def test_output_never_overwrites_a_file_taking_its_name(self):
+        uploaded = UploadedFile.objects.create(
+            name="apply.csv",
+            file=SimpleUploadedFile("apply.csv", self.csv_content.encode()),
+            file_type="csv",
+            file_size=len(self.csv_content),
+        )
+        get_available_name = FileSystemStorage.get_available_name
+        taken = []
+
+        def racing(storage, name, max_length=None):
+            # Another writer takes the first free name before it is used
+            name = get_available_name(storage, name, max_length=max_length)
+            if not taken:
+                taken.append(storage.path(name))
+                with open(taken[0], "w") as f:
+                    f.write("other writer")
+            return name
+
+        with mock.patch.object(FileSystemStorage, "get_available_name", racing):
+            processed, _ = apply_modification_to_upload(uploaded, self.modification)
+        self.assertNotEqual(processed.file.path, taken[0])
+        with open(taken[0]) as f:
+            self.assertEqual(f.read(), "other writer")
+        self.assertEqual(len(pd.read_csv(processed.file.path)), 5)
+
+    def test_apply_view_rejects_invalid_regex(self):
+        uploaded = UploadedFile.objects.create(
+            name="apply.csv",
+            file=SimpleUploadedFile("apply.csv", self.csv_content.encode()),
+            file_type="csv",
+            file_size=len(self.csv_content),
+        )
+        modification = dict(asdict(self.modification), regex_pattern="(unclosed")
+        response = Client().post(
+            reverse("data_processing:apply-modification", args=[uploaded.pk]),
+            data=json.dumps({"modification": modification}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid regex", response.json()["error"])
+
+        modification["regex_pattern"] = r"(\w+\s?)+$"
+        response = Client().post(
+            reverse("data_processing:apply-modification", args=[uploaded.pk]),
+            data=json.dumps({"modification": modification}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("nested quantifiers", response.json()["error"])
+
+    @override_settings(REGEX_TIME_BUDGET_SECONDS=0.5)
+    @mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key"})
+    def test_apply_view_stops_runaway_regex(self):
+        content = "id,code\n1," + "a" * 40 + "!\n"
+        uploaded = UploadedFile.objects.create(
+            name="runaway.csv",
+            file=SimpleUploadedFile("runaway.csv", content.encode()),
+            file_type="csv",
+            file_size=len(content),
+        )
+        # Exponential on the last row, yet no quantifier is nested; the
+        # lookahead keeps it off RE2
+        modification = dict(
+            asdict(self.modification),
+            column_name="code",
+            regex_pattern="(?=a)(a|aa)+$",
+        )
+        response = Client().post(
+            reverse("data_processing:apply-modification", args=[uploaded.pk]),
+            data=json.dumps({"modification": modification}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("longer than 0.5s", response.json()["error"])
+        self.assertEqual(UploadedFile.objects.count(), 1)
+
+
+class CompressedCSVTest(TestCase):
+    csv_content = "id,code\n" + "".join(f"{i},A-{i}\n" for i in range(25))
+
+    def _upload(self, codec, extension):
+        sink = pa.BufferOutputStream()
+        with pa.CompressedOutputStream(sink, codec) as out:
+            out.write(self.csv_content.encode())
+        content = sink.getvalue().to_pybytes()
+        response = Client().post(
+            reverse("data_processing:file-upload"),
+            {
+                "file": SimpleUploadedFile(f"data.csv{extension}", content),
+                "file_type": "csv",
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def test_compressed_upload_is_read_without_decompressing_to_disk(self):
+        for codec, extension in (("gzip", ".gz"), ("zstd", ".zst")):
+            with self.subTest(codec=codec):
+                uploaded = self._upload(codec, extension)
+                self.assertEqual(uploaded["headers"], ["id", "code"])
+                self.assertEqual(uploaded["row_count"], 25)
+                file_obj = UploadedFile.objects.get(pk=uploaded["id"])
+                self.assertEqual(detect_compression(file_obj.file.path), codec)
+                url = reverse("data_processing:file-preview", args=[uploaded["id"]])
+                data = Client().get(url, {"offset": 20, "limit": 2}).json()["data"]
+                self.assertEqual(
+                    data, [{"id": 20, "code": "A-20"}, {"id": 21, "code": "A-21"}]
+                )
+
+    @mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key"})
+    def test_apply_writes_compressed_output(self):
+        uploaded = self._upload("zstd", ".zst")
+        url = reverse("data_processing:apply-modification", args=[uploaded["id"]])
+        modification = {
+            "column_name": "code",
+            "regex_pattern": "^A-",
+            "replacement": "",
+            "description": "Drop the prefix",
+        }
+        response = Client().post(
+            url,
+            data=json.dumps(
+                {"modification": modification, "output_compression": "gzip"}
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        processed_id = response.json()["processed_file"]["id"]
+        processed = UploadedFile.objects.get(pk=processed_id)
+        self.assertTrue(processed.file.name.endswith(".csv.gz"))
+        self.assertNotIn(".csv_processed", processed.file.name)
+        self.assertEqual(detect_compression(processed.file.path), "gzip")
+        result = pd.read_csv(processed.file.path)
+        self.assertEqual(result["code"].tolist(), list(range(25)))
+
+        response = Client().post(
+            url,
+            data=json.dumps(
+                {
+                    "modification": modification,
+                    "output_format": "parquet",
+                    "output_compression": "gzip",
+                }
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ColumnarFormatsTest(TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "id": [1, 2, None, 4],
+                "code": ["A-1", "B-2", None, "A-4"],
+                "note": ["x", "y", "z", "w"],
+            }
+        )
+        self.modification = {
+            "column_name": "code",
+            "regex_pattern": r"^A-",
+            "replacement": "",
+            "description": "Drop the A- prefix",
+        }
+
+    def _upload(self, file_type, extension):
+        buffer = io.BytesIO()
+        getattr(self.df, f"to_{file_type}")(buffer)
+        response = Client().post(
+            reverse("data_processing:file-upload"),
+            {
+                "file": SimpleUploadedFile(f"data{extension}", buffer.getvalue()),
+                "file_type": file_type,
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def test_metadata_and_projected_preview(self):
+        for file_type, extension in (("parquet", ".parquet"), ("feather", ".arrow")):
+            with self.subTest(file_type=file_type):
+                uploaded = self._upload(file_type, extension)
+                self.assertEqual(uploaded["headers"], ["id", "code", "note"])
+                self.assertEqual(uploaded["row_count"], 4)
+                url = reverse("data_processing:file-preview", args=[uploaded["id"]])
+                data = Client().get(url, {"columns": "note,id", "offset": 1}).json()
+                self.assertEqual(data["columns"], ["note", "id"])
+                self.assertEqual(
+                    data["data"],
+                    [
+                        {"note": "y", "id": 2.0},
+                        {"note": "z", "id": ""},
+                        {"note": "w", "id": 4.0},
+                    ],
+                )
+                response = Client().get(url, {"columns": "missing"})
+                self.assertEqual(response.status_code, 400)
+
+    @mock.patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key"})
+    def test_apply_with_output_format(self):
+        uploaded = self._upload("parquet", ".parquet")
+        url = reverse("data_processing:apply-modification", args=[uploaded["id"]])
+        for output_format in ("parquet", "feather", "csv"):
+            with self.subTest(output_format=output_format):
+                response = Client().post(
+                    url,
+                    data=json.dumps(
+                        {
+                            "modification": self.modification,
+                            "output_format": output_format,
+                        }
+                    ),
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["stats"]["modified_rows"], 2)
+                processed = UploadedFile.objects.get(
+                    pk=response.json()["processed_file"]["id"]
+                )
+                self.assertEqual(processed.file_type, output_format)
+                result = load_dataframe(processed)
+                self.assertEqual(
+                    result["code"].astype(str).tolist(), ["1", "B-2", "nan", "4"]
+                )
+                self.assertEqual(result["id"].tolist()[:2], [1.0, 2.0])
+
+        response = Client().post(
+            url,
+            data=json.dumps(
+                {"modification": self.modification, "output_format": "xml"}
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ImpactEstimateTest(TestCase):
+    def setUp(self):
+        lines = ["id,code"] + [
+            f"{i},{'X-' if i % 5 == 0 else 'y-'}{i}" for i in range(20_000)
+        ]
+        content = "\n".join(lines).encode()
+        self.file_obj = UploadedFile.objects.create(
+            name="impact.csv",
+            file=SimpleUploadedFile("impact.csv", content),
+            file_type="csv",
+            file_size=len(content),
+            row_count=20_000,
+        )
+        self.modification = RegexModification("code", "^X-", "x-", "lower", 1.0)
+
+    def test_sample_estimate_covers_true_rate(self):
+        cache = ParsedFileCache()
+        for warm in (False, True):
+            if warm:
+                cache.load(self.file_obj)
+            self.assertEqual(cache.lookup(self.file_obj) is not None, warm)
+            impact = estimate_impact(
+                self.file_obj, self.modification, sample_rows=1_000, seed=7
+            )
+            self.assertEqual(impact["sampled_rows"], 1_000)
+            low, high = impact["confidence_interval"]
+            self.assertLess(low, 0.2)
+            self.assertGreater(high, 0.2)
+            self.assertLess(high - low, 0.06)
+            self.assertEqual(len(impact["examples"]), 5)
+            for example in impact["examples"]:
+                self.assertEqual(example["before"], f"X-{example['row']}")
+                self.assertEqual(example["after"], f"x-{example['row']}")
+
+    def test_time_budget_and_full_sample(self):
+        impact = estimate_impact(
+            self.file_obj, self.modification, sample_rows=5_000, time_budget=0
+        )
+        self.assertTrue(impact["time_budget_exceeded"])
+        self.assertLess(impact["sampled_rows"], 5_000)
+
+        small = RegexModification("code", "^X-", "x-", "lower", 1.0)
+        self.file_obj.row_count = None
+        with open(self.file_obj.file.path, "w") as f:
+            f.write("id,code\n1,X-1\n2,y-2\n3,X-3\n")
+        impact = estimate_impact(self.file_obj, small)
+        self.assertEqual(impact["total_rows"], 3)
+        self.assertEqual(impact["confidence_interval"], [2 / 3, 2 / 3])
+        self.assertEqual(impact["estimated_modified_rows"], 2)
+
+    def test_file_readable_only_whole_gets_no_estimate(self):
+        # Integer headers cannot be cached as Parquet, so every read is whole
+        buffer = io.BytesIO()
+        pd.DataFrame({1: ["X-1", "y-2"], "code": ["X-1", "y-2"]}).to_excel(
+            buffer, index=False
+        )
+        file_obj = UploadedFile.objects.create(
+            name="impact.xlsx",
+            file=SimpleUploadedFile("impact.xlsx", buffer.getvalue()),
+            file_type="excel",
+            file_size=len(buffer.getvalue()),
+            row_count=2,
+        )
+        with mock.patch("data_processing.file_cache.read_dataframe") as read:
+            self.assertIsNone(estimate_impact(file_obj, self.modification))
+        read.assert_not_called()
+
+    def test_csv_sample_reads_whole_file_dtype(self):
+        # score only turns float at the last row, far past the first stride
+        content = ("id,score\n" + "".join(f"{i},5\n" for i in range(3_000))).encode()
+        content += b"3000,\n"
+        file_obj = UploadedFile.objects.create(
+            name="floats.csv",
+            file=SimpleUploadedFile("floats.csv", content),
+            file_type="csv",
+            file_size=len(content),
+            row_count=3_001,
+        )
+        ensure_column_profile(file_obj)
+        modification = RegexModification("score", r"^5\.0$", "five", "", 1.0)
+        impact = estimate_impact(file_obj, modification, sample_rows=100, seed=1)
+        self.assertEqual(impact["estimated_modification_rate"], 1.0)
+
+
+class LLMResultCacheTest(TestCase):
+    def setUp(self):
+        llm_result_cache.clear_memory()
+        self.df = pd.DataFrame({"email": ["A@X.COM", "b@y.org"], "age": [1, 2]})
+        self.processor = LLMDataProcessor(api_key="test-key")
+        self.processor.llm = mock.Mock()
+        self.processor.llm.invoke.return_value = RegexModificationOutput(
+            column_name="email",
+            regex_pattern="X",
+            replacement="x",
+            description="Lowercase the domain",
+            confidence=0.9,
+        )
+
+    def test_repeated_instruction_skips_llm(self):
+        first = self.processor.process_instruction("Lowercase  emails", self.df)
+        second = self.processor.process_instruction("lowercase emails", self.df)
+        self.assertEqual(first, second)
+        self.assertEqual(self.processor.llm.invoke.call_count, 1)
+
+    def test_database_tier_survives_memory_loss(self):
+        self.processor.process_instruction("lowercase emails", self.df)
+        llm_result_cache.clear_memory()
+        db_hits = llm_result_cache.db_hits
+        self.processor.process_instruction("lowercase emails", self.df)
+        self.assertEqual(self.processor.llm.invoke.call_count, 1)
+        self.assertEqual(llm_result_cache.db_hits, db_hits + 1)
+
+    def test_bypass_and_changed_sample_call_llm(self):
+        self.processor.process_instruction("lowercase emails", self.df)
+        self.processor.process_instruction("lowercase emails", self.df, use_cache=False)
+        self.processor.process_instruction("lowercase emails", self.df.iloc[::-1])
+        self.assertEqual(self.processor.llm.invoke.call_count, 3)
+
+    def test_seed_from_logs(self):
+        content = b"email,age\nA@X.COM,1\nb@y.org,2\n"
+        file_obj = UploadedFile.objects.create(
+            name="seed.csv",
+            file=SimpleUploadedFile("seed.csv", content),
+            file_type="csv",
+            file_size=len(content),
+        )
+        LLMInstructionLog.objects.create(
+            file=file_obj,
+            user_instruction="lowercase emails",
+            llm_response="{}",
+            column_name="email",
+            regex_pattern="X",
+            replacement="x",
+            description="Lowercase the domain",
+            confidence=0.9,
+            success=True,
+        )
+        self.assertEqual(llm_result_cache.seed_from_logs(), 1)
+        self.assertEqual(LLMCacheEntry.objects.count(), 1)
+        llm_result_cache.clear_memory()
+        df = pd.read_csv(file_obj.file.path)
+        self.processor.process_instruction(
+            "Lowercase emails", df, profile=ensure_column_profile(file_obj)
+        )
+        self.processor.llm.invoke.assert_not_called()
+
+
+class ColumnProfileTest(TestCase):
+    def test_profile_matches_data(self):
+        df = pd.DataFrame(
+            {
+                "phone": [f"555-010-{i % 40:04d}" for i in range(3_000)],
+                "id": range(3_000),
+                "score": [None if i % 4 == 0 else i / 2 for i in range(3_000)],
+                "status": ["open", "closed", "open"] * 1_000,
+            }
+        )
+        chunks = [df.iloc[start : start + 700] for start in range(0, len(df), 700)]
+        profile = profile_chunks(chunks)
+        self.assertEqual(profile["rows"], 3_000)
+        columns = {column["name"]: column for column in profile["columns"]}
+        self.assertEqual(columns["phone"]["type"], "string")
+        self.assertEqual(columns["phone"]["distinct"], 40)
+        self.assertEqual(columns["phone"]["shapes"], [["999-999-9999", 1.0]])
+        self.assertEqual(columns["id"]["type"], "integer")
+        self.assertEqual(columns["id"]["top_values"], [])
+        self.assertLess(abs(columns["id"]["distinct"] - 3_000), 300)
+        self.assertEqual(columns["score"]["type"], "float")
+        self.assertEqual(columns["score"]["null_rate"], 0.25)
+        top = dict(columns["status"]["top_values"])
+        self.assertAlmostEqual(top["open"], 2 / 3, delta=0.05)
+        self.assertIn("- phone (string, 0% null, 40 distinct)", format_profile(profile))
+
+    def test_profile_saved_on_first_use_and_used_in_prompt(self):
+        content = b"email,code\nA@X.COM,AB-12\nb@y.org,CD-34\n"
+        response = self.client.post(
+            reverse("data_processing:file-upload"),
+            {"file": SimpleUploadedFile("p.csv", content), "file_type": "csv"},
+        )
+        file_obj = UploadedFile.objects.get(pk=response.json()["id"])
+        self.assertIsNone(file_obj.column_profile)
+        profile = ensure_column_profile(file_obj)
+        file_obj.refresh_from_db()
+        self.assertEqual(file_obj.column_profile, profile)
+        columns = [column["name"] for column in profile["columns"]]
+        self.assertEqual(columns, ["email", "code"])
+
+        processor = LLMDataProcessor(api_key="test-key")
+        _, sample_data, prompt = processor._build_prompt(
+            "fix codes", load_dataframe(file_obj), 5, profile
+        )
+        self.assertIn("Column profile", prompt)
+        self.assertIn("'AA-99' 100%", sample_data)
+
+    def test_loaded_frame_is_profiled_without_reading_the_file(self):
+        content = b"email,code\nA@X.COM,AB-12\nb@y.org,\n"
+        file_objs = [
+            UploadedFile.objects.create(
+                name="p.csv",
+                file=SimpleUploadedFile("p.csv", content),
+                file_type="csv",
+                file_size=len(content),
+            )
+            for _ in range(3)
+        ]
+        from_file = ensure_column_profile(file_objs[0])
+        df = load_dataframe(file_objs[1])
+        with mock.patch("data_processing.column_profile.profile_upload") as read:
+            self.assertEqual(ensure_column_profile(file_objs[1], df), from_file)
+            self.assertEqual(
+                async_to_sync(aensure_column_profile)(file_objs[2], df), from_file
+            )
+        read.assert_not_called()
+        file_objs[2].refresh_from_db()
+        self.assertEqual(file_objs[2].column_profile, from_file)
+
+    def test_profile_failure_is_saved(self):
+        content = b"a,b\n1,2\n"
+        file_obj = UploadedFile.objects.create(
+            name="bad.csv",
+            file=SimpleUploadedFile("bad.csv", content),
+            file_type="csv",
+            file_size=len(content),
+        )
+        with (
+            mock.patch(
+                "data_processing.column_profile.profile_upload",
+                side_effect=ValueError("unreadable"),
+            ) as profile_upload,
+            self.assertLogs("data_processing.column_profile", "ERROR"),
+        ):
+            self.assertIsNone(ensure_column_profile(file_obj))
+            file_obj.refresh_from_db()
+            self.assertIsNone(ensure_column_profile(file_obj))
+        self.assertEqual(profile_upload.call_count, 1)
+        self.assertEqual(file_obj.column_profile, {"error": "unreadable"})
+
+
+class ColumnRankerTest(TestCase):
+    def setUp(self):
+        columns = [f"metric_{i}" for i in range(800)]
+        columns[100:100] = ["customer_email", "ZipCode", "order_status"]
+        self.df = pd.DataFrame([[f"v{i}" for i in range(len(columns))]] * 2)
+        self.df.columns = columns
+        self.df["order_status"] = ["closed", "closed"]
+        self.profile = profile_chunks([self.df[["order_status", "metric_5"]]])
+
+    def test_relevant_columns_ranked_first(self):
+        ranker = ColumnRanker(self.df.columns, self.profile)
+        for instruction, column in [
+            ("Lowercase all emails", "customer_email"),
+            ("pad zip codes to five digits", "ZipCode"),
+            ("replace 'closed' with 'done'", "order_status"),
+        ]:
+            self.assertIn(column, ranker.top([instruction], 3), instruction)
+
+    @override_settings(LLM_PROMPT_MAX_COLUMNS=5)
+    def test_pruned_prompt_retries_with_full_schema(self):
+        processor = LLMDataProcessor(api_key="test-key")
+        processor.llm = mock.Mock()
+        processor.llm.invoke.side_effect = [
+            RegexModificationOutput(
+                column_name=name,
+                regex_pattern="x",
+                replacement="y",
+                description="d",
+                confidence=0.5,
+            )
+            for name in ("metric_700", "metric_700", "metric_700")
+        ]
+        modification = processor.process_instruction(
+            "lowercase email", self.df, use_cache=False
+        )
+        self.assertEqual(modification.column_name, "metric_700")
+        pruned, full = [call.args[0] for call in processor.llm.invoke.call_args_list]
+        self.assertIn("customer_email", pruned)
+        self.assertNotIn("metric_700", pruned)
+        self.assertIn("metric_700", full)
+        self.assertLess(len(pruned), len(full) / 10)
+
+        processor.process_instruction("Fix metric 700", self.df, use_cache=False)
+        self.assertEqual(processor.llm.invoke.call_count, 3)
+
+
+class StubChatModel:
+    """Local stand-in for a chat model, registered as the "stub" provider"""
+
+    batch_calls = 0
+
+    def __init__(self, schema=None):
+        self.schema = schema
+
+    def with_structured_output(self, schema):
+        return StubChatModel(schema)
+
+    def invoke(self, prompt):
+        if self.schema is BatchRegexModificationOutput:
+            return self._answer_batch(prompt)
+        return RegexModificationOutput(
+            column_name="email",
+            regex_pattern="[A-Z]",
+            replacement="x",
+            description="Replace capitals",
+            confidence=0.5,
+        )
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+    def _answer_batch(self, prompt):
+        # Answers "<column>: <pattern>" instructions; unknown columns are kept
+        # so per-instruction validation can be exercised
+        StubChatModel.batch_calls += 1
+        section = prompt.split("User instructions (numbered from 0):\n")[1]
+        items = []
+        for line in section.split("\n\n")[0].splitlines():
+            index, instruction = line.split(". ", 1)
+            column, pattern = instruction.split(": ", 1)
+            items.append(
+                BatchRegexModificationItem(
+                    instruction_index=int(index),
+                    column_name=column,
+                    regex_pattern=pattern,
+                    replacement="x",
+                    description=instruction,
+                    confidence=0.5,
+                )
+            )
+        return BatchRegexModificationOutput(modifications=items)
+
+
+llm_client_registry.register_provider("stub", lambda api_key: StubChatModel())
+
+
+@override_settings(LLM_PROVIDER="stub")
+class LLMClientRegistryTest(TestCase):
+    def test_processors_share_one_client(self):
+        first = LLMDataProcessor()
+        second = LLMDataProcessor()
+        self.assertIs(first.llm, second.llm)
+        self.assertIsInstance(first.llm.runnable, StubChatModel)
+
+    def test_modify_view_uses_stub_provider(self):
+        content = b"name,email\nJohn,JOHN@X.COM\n"
+        file_obj = UploadedFile.objects.create(
+            name="stub.csv",
+            file=SimpleUploadedFile("stub.csv", content),
+            file_type="csv",
+            file_size=len(content),
+        )
+        response = Client().post(
+            reverse("data_processing:column-modify", args=[file_obj.pk]),
+            data={"instruction": "mask capitals", "bypass_cache": True},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["preview"]["stats"]["modified_rows"], 1)
+
+    def test_unknown_provider_is_rejected(self):
+        with (
+            override_settings(LLM_PROVIDER="missing"),
+            self.assertRaisesMessage(ValueError, "Unknown LLM provider"),
+        ):
+            LLMDataProcessor()
+
+
+@override_settings(LLM_PROVIDER="stub")
+class AsyncColumnModificationViewTest(TestCase):
+    def setUp(self):
+        content = b"name,email\nJohn,JOHN@X.COM\nJane,jane@y.org\n"
+        self.file_obj = UploadedFile.objects.create(
+            name="async.csv",
+            file=SimpleUploadedFile("async.csv", content),
+            file_type="csv",
+            file_size=len(content),
+        )
+
+    async def test_async_modify_view(self):
+        response = await self.async_client.post(
+            reverse("data_processing:column-modify-async", args=[self.file_obj.pk]),
+            data={"instruction": "mask capitals", "bypass_cache": True},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["modification"]["column_name"], "email")
+        self.assertEqual(data["preview"]["stats"]["modified_rows"], 1)
+        self.assertEqual(data["file_info"]["id"], self.file_obj.pk)
+
+    async def test_async_modify_view_missing_file(self):
+        response = await self.async_client.post(
+            reverse("data_processing:column-modify-async", args=[0]),
+            data={"instruction": "mask capitals"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(LLM_PROVIDER="stub")
+class BatchColumnModificationViewTest(TestCase):
+    def setUp(self):
+        llm_result_cache.clear_memory()
+        content = b"name,email\nJohn,JOHN@X.COM\nJane,jane@y.org\n"
+        self.file_obj = UploadedFile.objects.create(
+            name="batch.csv",
+            file=SimpleUploadedFile("batch.csv", content),
+            file_type="csv",
+            file_size=len(content),
+        )
+        self.url = reverse(
+            "data_processing:column-modify-batch", args=[self.file_obj.pk]
+        )
+
+    def _post(self, instructions):
+        return Client().post(
+            self.url,
+            data=json.dumps({"instructions": instructions}),
+            content_type="application/json",
+        )
+
+    def test_one_llm_call_for_all_instructions(self):
+        calls = StubChatModel.batch_calls
+        response = self._post(["email: [A-Z]", "name: ^J", "phone: 1"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StubChatModel.batch_calls, calls + 1)
+        results = response.json()["results"]
+        self.assertEqual(results[0]["preview"]["stats"]["modified_rows"], 1)
+        self.assertEqual(results[1]["modification"]["column_name"], "name")
+        self.assertEqual(results[1]["preview"]["stats"]["modified_rows"], 2)
+        self.assertIn("Column 'phone' not found", results[2]["error"])
+        impact = results[0]["impact"]
+        self.assertEqual(impact["sampled_rows"], 2)
+        self.assertEqual(impact["confidence_interval"], [0.5, 0.5])
+        logs = LLMInstructionLog.objects.filter(file=self.file_obj)
+        self.assertEqual(logs.filter(success=True).count(), 2)
+        self.assertEqual(logs.filter(success=False).count(), 1)
+
+    def test_cached_instructions_are_not_resent(self):
+        self._post(["email: [A-Z]"])
+        calls = StubChatModel.batch_calls
+        response = self._post(["email: [A-Z]"])
+        self.assertEqual(StubChatModel.batch_calls, calls)
+        modification = response.json()["results"][0]["modification"]
+        self.assertEqual(modification["regex_pattern"], "[A-Z]")
+
+    def test_rejects_empty_batch(self):
+        self.assertEqual(self._post([]).status_code, 400)
+
+
+@override_settings(LLM_PROVIDER="stub", MODIFICATION_JOB_MODE="eager")
+class ModificationJobTest(TestCase):
+    modification = {
+        "column_name": "email",
+        "regex_pattern": "[A-Z]",
+        "replacement": "x",
+        "description": "Replace capitals",
+    }
+
+    def setUp(self):
+        content = b"name,email\nJohn,JOHN@X.COM\nJane,jane@y.org\n"
+        self.file_obj = UploadedFile.objects.create(
+            name="job.csv",
+            file=SimpleUploadedFile("job.csv", content),
+            file_type="csv",
+            file_size=len(content),
+            row_count=2,
+        )
+
+    def _create_job(self, **kwargs):
+        return ModificationJob.objects.create(
+            file=self.file_obj, modification=self.modification, total_rows=2, **kwargs
+        )
+
+    def test_background_apply_returns_job(self):
+        client = Client()
+        response = client.post(
+            reverse("data_processing:apply-modification", args=[self.file_obj.pk]),
+            data=json.dumps({"modification": self.modification, "background": True}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job"]["id"]
+        data = client.get(reverse("data_processing:job-detail", args=[job_id])).json()
+        self.assertEqual(data["status"], "succeeded")
+        self.assertEqual(data["rows_processed"], 2)
+        self.assertEqual(data["progress"], 1.0)
+        self.assertEqual(data["stats"]["modified_rows"], 1)
+        self.assertEqual(data["processed_file"]["row_count"], 2)
+
+    def test_cancel_pending_job(self):
+        job = self._create_job()
+        response = Client().post(reverse("data_processing:job-cancel", args=[job.pk]))
+        self.assertEqual(response.json()["status"], "cancelled")
+        self.assertFalse(run_job(job.pk))
+
+    def test_running_job_stops_at_next_chunk(self):
+        job = self._create_job(cancel_requested=True)
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModificationJob.STATUS_CANCELLED)
+        self.assertIsNone(job.processed_file)
+        self.assertEqual(UploadedFile.objects.count(), 1)
+
+    @override_settings(MODIFICATION_JOB_STALE_SECONDS=60)
+    def test_interrupted_job_is_requeued(self):
+        job = self._create_job(status=ModificationJob.STATUS_RUNNING)
+        ModificationJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(minutes=5)
+        )
+        Client().get(reverse("data_processing:job-detail", args=[job.pk]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModificationJob.STATUS_RUNNING)
+        self.assertEqual(requeue_interrupted_jobs(), 1)
+        call_command("run_modification_jobs", once=True, stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModificationJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.attempt, 1)
+
+    def test_superseded_run_writes_nothing(self):
+        job = self._create_job()
+        requeue = ModificationJob.objects.filter(pk=job.pk)
+
+        def requeued_mid_run(file_obj, modification, on_progress, *args):
+            requeue.update(status=ModificationJob.STATUS_PENDING)
+            return apply_modification_to_upload(file_obj, modification, on_progress)
+
+        def requeued_after_output(*args):
+            result = apply_modification_to_upload(*args)
+            requeue.update(status=ModificationJob.STATUS_PENDING)
+            return result
+
+        for side_effect in (requeued_mid_run, requeued_after_output):
+            with mock.patch(
+                "data_processing.jobs.apply_modification_to_upload",
+                side_effect=side_effect,
+            ):
+                self.assertTrue(run_job(job.pk))
+            job.refresh_from_db()
+            self.assertEqual(job.status, ModificationJob.STATUS_PENDING)
+            self.assertIsNone(job.processed_file)
+            self.assertEqual(UploadedFile.objects.count(), 1)
+        self.assertEqual(job.attempt, 2)
+
+    @override_settings(MODIFICATION_JOB_HEARTBEAT_SECONDS=0.01)
+    def test_heartbeat_beats_between_chunks(self):
+        claim = mock.Mock()
+        claim.update.side_effect = [1, 1, 0]
+        with Heartbeat(claim) as heartbeat:
+            for _ in range(500):
+                if heartbeat.lost:
+                    break
+                time.sleep(0.01)
+        self.assertTrue(heartbeat.lost)
+        self.assertEqual(claim.update.call_count, 3)
+
+
+@override_settings(
+    LLM_PROVIDER="stub",
+    MODIFICATION_JOB_MODE="thread",
+    MODIFICATION_JOB_POLL_SECONDS=0.05,
+)
+class ModificationJobRunnerTest(TransactionTestCase):
+    def test_start_resumes_pending_and_stale_jobs(self):
+        content = b"name,email\nJohn,JOHN@X.COM\nJane,jane@y.org\n"
+        file_obj = UploadedFile.objects.create(
+            name="job.csv",
+            file=SimpleUploadedFile("job.csv", content),
+            file_type="csv",
+            file_size=len(content),
+            row_count=2,
+        )
+        modification = ModificationJobTest.modification
+        pending = ModificationJob.objects.create(
+            file=file_obj, modification=modification, total_rows=2
+        )
+        stale = ModificationJob.objects.create(
+            file=file_obj,
+            modification=modification,
+            total_rows=2,
+            status=ModificationJob.STATUS_RUNNING,
+        )
+        ModificationJob.objects.filter(pk=stale.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        runner = ModificationJobRunner()
+        runner.start()
+        try:
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline:
+                statuses = set(ModificationJob.objects.values_list("status", flat=True))
+                if statuses == {ModificationJob.STATUS_SUCCEEDED}:
+                    break
+                time.sleep(0.05)
+        finally:
+            runner.stop()
+        for job in (pending, stale):
+            job.refresh_from_db()
+            self.assertEqual(job.status, ModificationJob.STATUS_SUCCEEDED)
+            self.assertEqual(job.rows_processed, 2)
+
+
+@override_settings(LLM_PROVIDER="stub", MODIFICATION_JOB_MODE="eager")
+class PipelineApplyTest(TestCase):
+    steps = [
+        {
+            "column_name": "email",
+            "regex_pattern": "@.*$",
+            "replacement": "@example.com",
+            "description": "Mask domains",
+        },
+        {
+            "column_name": "email",
+            "regex_pattern": "^j",
+            "replacement": "J",
+            "description": "Capitalise j",
+        },
+        {
+            "column_name": "name",
+            "regex_pattern": "^Bob$",
+            "replacement": "Robert",
+            "description": "Expand Bob",
+        },
+    ]
+
+    def setUp(self):
+        content = b"name,email\nJohn,john@x.com\nBob,bob@example.com\nAnn,ann@y.org\n"
+        self.file_obj = UploadedFile.objects.create(
+            name="pipeline.csv",
+            file=SimpleUploadedFile("pipeline.csv", content),
+            file_type="csv",
+            file_size=len(content),
+            headers=["name", "email"],
+            row_count=3,
+        )
+        self.url = reverse("data_processing:apply-pipeline", args=[self.file_obj.pk])
+
+    def test_steps_run_in_one_pass(self):
+        with mock.patch(
+            "data_processing.processing.iter_dataframe_chunks",
+            wraps=iter_dataframe_chunks,
+        ) as chunks:
+            response = Client().post(
+                self.url,
+                data=json.dumps({"modifications": self.steps}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        chunks.assert_called_once()
+        data = response.json()
+        self.assertEqual(UploadedFile.objects.count(), 2)
+        self.assertEqual(
+            [step["modified_rows"] for step in data["stats"]["steps"]], [2, 1, 1]
+        )
+        self.assertEqual(data["stats"]["modified_rows"], 3)
+        processed = UploadedFile.objects.get(pk=data["processed_file"]["id"])
+        self.assertEqual(
+            pd.read_csv(processed.file.path).values.tolist(),
+            [
+                ["John", "John@example.com"],
+                ["Robert", "bob@example.com"],
+                ["Ann", "ann@example.com"],
+            ],
+        )
+
+    def test_invalid_step_is_reported(self):
+        steps = [self.steps[0], dict(self.steps[1], column_name="missing")]
+        response = Client().post(
+            self.url,
+            data=json.dumps({"modifications": steps}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["step"], 1)
+        self.assertEqual(UploadedFile.objects.count(), 1)
+
+    def test_background_pipeline(self):
+        response = Client().post(
+            self.url,
+            data=json.dumps({"modifications": self.steps, "background": True}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 202)
+        job = ModificationJob.objects.get(pk=response.json()["job"]["id"])
+        self.assertEqual(job.status, ModificationJob.STATUS_SUCCEEDED)
+        self.assertEqual(len(job.stats["steps"]), 3)
+        self.assertEqual(job.rows_processed, 3)
+
 
 class RegexModificationTests(TestCase):
     def test_regex_modification_creation(self):
@@ -85,6 +1481,178 @@ class RegexModificationTests(TestCase):
         self.assertEqual(modification.description, "Test modification")
         self.assertEqual(modification.confidence, 0.85)
 
+    def test_invalid_pattern_fails_at_creation(self):
+        with self.assertRaises(re.error):
+            RegexModification("c", "([a-z]", "", "broken", 1.0)
+        with self.assertRaises(re.error):
+            RegexModification("c", "([a-z])", r"\2", "missing group", 1.0)
+
+    def test_nested_quantifiers_fail_at_creation(self):
+        for pattern in [r"(a+)+$", r"^(\d{1,3},?)*$", r"(x|\w+)+y", r"(a*)*"]:
+            with self.assertRaises(UnsafeRegexError, msg=pattern):
+                RegexModification("c", pattern, "", "runaway", 1.0)
+        for pattern in [r"(?>a+)+", r"(-?\d)+", r"(\s*,\s*)+", r"(\d{3}-)+"]:
+            CompiledRegex(pattern, "")
+        self.assertTrue(issubclass(UnsafeRegexError, re.error))
+
+    def test_time_budget_kills_runaway_replace(self):
+        # The lookahead keeps it off RE2, which would run it in linear time
+        compiled = CompiledRegex("(?=a)(a|aa)+$", "")
+        with self.assertRaises(RegexTimeoutError):
+            compiled.replace(pd.Series(["ok", "a" * 40 + "!"]), time_budget=0.5)
+        values = pd.Series(["aa", "b", "aaa"] * 5_000, index=range(3, 15_003))
+        compiled._preferred_engine = PYTHON_ENGINE
+        guarded = compiled.replace(values, factorize=False, time_budget=5)
+        plain = compiled.replace(values, factorize=False)
+        self.assertEqual(guarded.engine, PYTHON_ENGINE)
+        self.assertTrue(guarded.values.equals(plain.values))
+        self.assertEqual(guarded.changed.tolist(), plain.changed.tolist())
+
+    def test_small_budgeted_replace_runs_on_re2_or_guarded(self):
+        guard = RegexGuard()
+        values = pd.Series(["a" * 400] * 10)
+        with mock.patch("data_processing.regex_engine.regex_guard", guard):
+            linear = CompiledRegex(r"a.*a.*a.*a.*b", "x")
+            result = linear.replace(values, time_budget=1.0)
+            self.assertEqual(result.engine, ARROW_ENGINE)
+            self.assertEqual(result.changed_count, 0)
+            self.assertEqual(guard._processes, 0)
+
+            # Polynomial on re, and kept off RE2 by the lookbehind
+            polynomial = CompiledRegex(r"a.*a.*a.*a.*b(?<!c)", "x")
+            start = time.monotonic()
+            with self.assertRaises(RegexTimeoutError):
+                polynomial.replace(values, time_budget=1.0)
+            self.assertLess(time.monotonic() - start, 10)
+
+    def test_guard_pool_is_capped_and_reaped(self):
+        guard = RegexGuard()
+        compiled = CompiledRegex(r"(\d{3})-(\d{4})(?!\d)", r"\1\2")
+        values = pd.Series(["555-1234 x"] * 2_000)
+        results = []
+
+        def replace():
+            results.append(compiled.replace(values, factorize=False, time_budget=30))
+
+        with (
+            mock.patch("data_processing.regex_engine.regex_guard", guard),
+            mock.patch("data_processing.regex_engine.GUARD_MAX_PROCESSES", 1),
+            mock.patch("data_processing.regex_engine.GUARD_IDLE_SECONDS", 0.5),
+        ):
+            # The second caller waits for the only process
+            threads = [threading.Thread(target=replace) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(
+                [result.values.iloc[0] for result in results], ["5551234 x"] * 2
+            )
+            self.assertEqual(guard._processes, 1)
+            process = guard._idle[0][0]
+            deadline = time.monotonic() + 10
+            while guard._processes and time.monotonic() < deadline:
+                time.sleep(0.05)
+        self.assertEqual(guard._processes, 0)
+        self.assertFalse(process.is_alive())
+
+    def test_re2_incompatible_patterns_stay_on_python(self):
+        for pattern in [r"(?<=a)b", r"(a)\1", r"x*", r"\d(?=px)", r"(?m)^a"]:
+            self.assertIsNone(CompiledRegex(pattern, "").arrow_rewrite, pattern)
+        compiled = CompiledRegex(r"(\d+)-(\d+)", r"\2\\\1")
+        self.assertEqual(compiled.arrow_rewrite, r"\2\\\1")
+        self.assertTrue(compiled.requires_ascii)
+
+    def test_without_re_parser_patterns_run_on_python(self):
+        values = pd.Series(["555-1234", "n/a"] * ARROW_MIN_ROWS)
+        with mock.patch("data_processing.regex_engine.sre_parse", None):
+            compiled = CompiledRegex(r"(?P<area>\d{3})-(\d{4})", r"\g<area>\2")
+            self.assertIsNone(compiled.arrow_rewrite)
+            result = compiled.replace(values, factorize=False)
+            self.assertEqual(result.engine, PYTHON_ENGINE)
+            self.assertEqual(result.values.tolist()[:2], ["5551234", "n/a"])
+            self.assertEqual(result.changed_count, ARROW_MIN_ROWS)
+            # Bad references still fail at creation, unsafe patterns do not
+            for replacement in [r"\3", r"\g<zip>", "\\"]:
+                with self.assertRaises(re.error, msg=replacement):
+                    CompiledRegex(r"(?P<area>\d{3})-(\d{4})", replacement)
+            CompiledRegex(r"(a+)+$", "")
+
+    def test_arrow_engine_matches_python(self):
+        values = pd.Series(
+            ["+1-555-0100", "n/a", "+1-555-0199 ", "+44-20-7946"] * ARROW_MIN_ROWS
+        )
+        compiled = CompiledRegex(r"^\+1-(\d+)-(\d+)", r"(\1) \2")
+        compiled._preferred_engine = ARROW_ENGINE
+        result = compiled.replace(values, factorize=False)
+        self.assertEqual(result.engine, ARROW_ENGINE)
+        expected = compiled._replace_python(values)
+        self.assertEqual(result.values.tolist(), expected.tolist())
+        self.assertEqual(result.values[0], "(555) 0100")
+        self.assertEqual(result.changed_count, 2 * ARROW_MIN_ROWS)
+        self.assertEqual(result.changed_positions()[:2].tolist(), [0, 2])
+        self.assertEqual(result.changed_bitmap()[:1], bytes([0b10101010]))
+
+        small = compiled.replace(values.head(10))
+        self.assertEqual(small.engine, PYTHON_ENGINE)
+
+    def test_arrow_engine_reads_pattern_as_re_does(self):
+        # No matches in the first rows, where a prefix trial would look
+        values = pd.Series(["zzz"] * 5_000 + ["aab", "abc", "b"] * 5_000)
+        for pattern in [r"a{,3}b", r"[[:alpha:]]"]:
+            compiled = CompiledRegex(pattern, "X")
+            compiled._preferred_engine = ARROW_ENGINE
+            result = compiled.replace(values, factorize=False)
+            self.assertEqual(result.engine, ARROW_ENGINE, pattern)
+            expected = compiled._replace_python(values)
+            self.assertEqual(result.values.tolist(), expected.tolist(), pattern)
+        self.assertEqual(CompiledRegex(r"a{,3}b", "").arrow_pattern, "(?:a){0,3}b")
+        self.assertIsNone(CompiledRegex(r"\s", "").arrow_pattern)
+
+    def test_parallel_replace_matches_serial(self):
+        values = pd.Series(
+            ["Ab-1", "cd", "+1-555", "Ünï"] * (PARALLEL_MIN_PARTITION_ROWS // 2),
+            index=range(5, 5 + 2 * PARALLEL_MIN_PARTITION_ROWS),
+        )
+        serial = CompiledRegex(r"[A-Z]", "x").replace(values, factorize=False)
+        parallel = CompiledRegex(r"[A-Z]", "x").replace(
+            values, workers=2, factorize=False
+        )
+        self.assertTrue(parallel.engine.startswith("parallel/"))
+        self.assertTrue(parallel.values.equals(serial.values))
+        self.assertEqual(parallel.changed.tolist(), serial.changed.tolist())
+
+    def test_factorized_replace_matches_per_cell(self):
+        codes = ["us", "US", "gb", "nan", "Ünï", ""]
+        values = pd.Series(
+            [codes[i % 7 % 6] for i in range(2 * FACTORIZE_MIN_ROWS)],
+            index=range(3, 3 + 2 * FACTORIZE_MIN_ROWS),
+            name="country",
+        )
+        compiled = CompiledRegex(r"^([a-z]+)$", r"<\1>")
+        factorized = compiled.replace(values)
+        per_cell = compiled.replace(values, factorize=False)
+        self.assertTrue(factorized.engine.startswith("factorized/"))
+        self.assertTrue(factorized.values.equals(per_cell.values))
+        self.assertEqual(factorized.values.dtype, per_cell.values.dtype)
+        self.assertEqual(factorized.changed.tolist(), per_cell.changed.tolist())
+
+        unique = pd.Series([f"id-{i}" for i in range(2 * FACTORIZE_MIN_ROWS)])
+        self.assertFalse(compiled.replace(unique).engine.startswith("factorized/"))
+        self.assertAlmostEqual(estimate_distinct(values, 1_000), 6)
+
+    def test_stats_report_engine_and_time(self):
+        modification = RegexModification("code", "[A-Z]", "x", "lowercase", 1.0)
+        df = pd.DataFrame({"code": ["Ab", "cd", "EF"]})
+        processor = LLMDataProcessor(api_key="test-key")
+        preview_df, stats = processor.preview_modification(modification, df)
+        self.assertEqual(preview_df["code"].tolist(), ["xb", "cd", "xx"])
+        self.assertEqual(stats["modified_rows"], 2)
+        self.assertEqual(stats["changed_rows"], [0, 2])
+        # A budgeted preview of a pattern RE2 can run needs no guard process
+        self.assertEqual(stats["engine"], ARROW_ENGINE)
+        self.assertGreaterEqual(stats["regex_time_ms"], 0)
+
 
 class LLMViewIntegrationTests(TestCase):
     def setUp(self):
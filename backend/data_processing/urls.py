@@ -2,11 +2,16 @@ from django.urls import path
 
 from .views import (
     ApplyModificationView,
+    ApplyPipelineView,
+    AsyncColumnModificationView,
+    BatchColumnModificationView,
     ColumnModificationView,
     FileDetailView,
     FileListView,
     FilePreviewView,
     FileUploadView,
+    JobCancelView,
+    JobDetailView,
 )
 
 app_name = "data_processing"
@@ -19,9 +24,26 @@ urlpatterns = [
     path(
         "files/<int:pk>/modify/", ColumnModificationView.as_view(), name="column-modify"
     ),
+    path(
+        "files/<int:pk>/modify/async/",
+        AsyncColumnModificationView.as_view(),
+        name="column-modify-async",
+    ),
+    path(
+        "files/<int:pk>/modify/batch/",
+        BatchColumnModificationView.as_view(),
+        name="column-modify-batch",
+    ),
     path(
         "files/<int:pk>/apply/",
         ApplyModificationView.as_view(),
         name="apply-modification",
     ),
+    path(
+        "files/<int:pk>/pipeline/",
+        ApplyPipelineView.as_view(),
+        name="apply-pipeline",
+    ),
+    path("jobs/<int:pk>/", JobDetailView.as_view(), name="job-detail"),
+    path("jobs/<int:pk>/cancel/", JobCancelView.as_view(), name="job-cancel"),
 ]
@@ -1,59 +1,75 @@
+import base64
+import binascii
+import hashlib
 import json
-import os
+import re
+from dataclasses import asdict
+from datetime import datetime
+from urllib.parse import urljoin
 
-import pandas as pd
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
 from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 
+from .column_profile import aensure_column_profile, ensure_column_profile
+from .compression import COMPRESSION_SUFFIXES
+from .file_cache import load_dataframe, load_rows
+from .file_metadata import extract_file_metadata
+from .impact import estimate_impact
+from .jobs import cancel_job, modification_job_runner
 from .llm_service import LLMDataProcessor
-from .models import UploadedFile
+from .models import ModificationJob, UploadedFile
+from .processing import (
+    OUTPUT_FORMATS,
+    apply_modification_to_upload,
+    apply_pipeline_to_upload,
+    modification_from_dict,
+)
+from .regex_engine import RegexTimeoutError
 
 
 def parse_file_headers(file_obj, file_type):
     """Parse file to get headers and row count"""
-    file_path = file_obj.file.path
     try:
-        if file_type == "csv":
-            df = pd.read_csv(file_path)
-            headers = df.columns.tolist()
-            row_count = len(df)
-        elif file_type == "excel":
-            if file_path.endswith(".xlsx"):
-                df = pd.read_excel(file_path, engine="openpyxl")
-            else:
-                df = pd.read_excel(file_path, engine="xlrd")
-            headers = df.columns.tolist()
-            row_count = len(df)
-        else:
-            return None, None
-        return headers, row_count
+        return extract_file_metadata(file_obj.file.path, file_type)
     except Exception:
         return None, None
 
 
-def get_file_preview(file_obj, file_type, rows=10):
-    """Get preview of file data"""
-    file_path = file_obj.file.path
+def get_file_preview(file_obj, file_type, rows=10, offset=0, columns=None):
+    """Get preview of file data, optionally of some columns only"""
     try:
-        if file_type == "csv":
-            df = pd.read_csv(file_path, nrows=rows)
-        elif file_type == "excel":
-            if file_path.endswith(".xlsx"):
-                df = pd.read_excel(file_path, nrows=rows, engine="openpyxl")
-            else:
-                df = pd.read_excel(file_path, nrows=rows, engine="xlrd")
+        if offset:
+            df = load_rows(file_obj, offset, rows, columns=columns)
         else:
-            return None
+            df = load_dataframe(file_obj, nrows=rows, columns=columns)
         df = df.fillna("")
         return df.to_dict("records")
     except Exception:
         return None
 
 
-def file_to_dict(file_obj, request):
+def parse_columns(value, headers):
+    """Resolve a comma-separated column list against headers; raises ValueError"""
+    by_name = {str(header): header for header in headers or []}
+    names = list(dict.fromkeys(n.strip() for n in value.split(",") if n.strip()))
+    missing = [name for name in names if name not in by_name]
+    if missing:
+        raise ValueError(f"Columns not found: {', '.join(missing)}")
+    return [by_name[name] for name in names]
+
+
+def file_to_dict(file_obj, request, base_url=None):
     """Convert UploadedFile to dict for JSON response"""
+    if base_url is None:
+        base_url = request.build_absolute_uri("/")
     return {
         "id": file_obj.id,
         "name": file_obj.name,
@@ -63,7 +79,40 @@ def file_to_dict(file_obj, request):
         "row_count": file_obj.row_count,
         "uploaded_by": file_obj.uploaded_by.username if file_obj.uploaded_by else None,
         "uploaded_at": file_obj.uploaded_at.isoformat(),
-        "file_url": request.build_absolute_uri(file_obj.file.url),
+        "file_url": urljoin(base_url, file_obj.file.url),
+    }
+
+
+def job_to_dict(job, request):
+    """Convert ModificationJob to dict for JSON response"""
+    progress = None
+    eta_seconds = None
+    if job.total_rows:
+        progress = min(job.rows_processed / job.total_rows, 1.0)
+        if job.status == ModificationJob.STATUS_RUNNING and job.rows_processed:
+            elapsed = (job.updated_at - job.started_at).total_seconds()
+            rate = job.rows_processed / elapsed if elapsed > 0 else 0
+            if rate:
+                eta_seconds = max(job.total_rows - job.rows_processed, 0) / rate
+    return {
+        "id": job.id,
+        "file_id": job.file_id,
+        "status": job.status,
+        "rows_processed": job.rows_processed,
+        "total_rows": job.total_rows,
+        "progress": progress,
+        "eta_seconds": eta_seconds,
+        "cancel_requested": job.cancel_requested,
+        "output_format": job.output_format,
+        "output_compression": job.output_compression,
+        "stats": job.stats,
+        "error": job.error,
+        "processed_file": file_to_dict(job.processed_file, request)
+        if job.processed_file
+        else None,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
     }
 
 
@@ -78,16 +127,32 @@ class FileUploadView(View):
         file_type = request.POST.get("file_type", "")
         if not file_type:
             return JsonResponse({"error": "file_type is required"}, status=400)
-        if file_type not in ["csv", "excel"]:
-            return JsonResponse({"error": "file_type must be csv or excel"}, status=400)
-        # Create file record
-        uploaded_file = UploadedFile.objects.create(
+        file_types = dict(UploadedFile.FILE_TYPE_CHOICES)
+        if file_type not in file_types:
+            return JsonResponse(
+                {"error": f"file_type must be one of {', '.join(file_types)}"},
+                status=400,
+            )
+        uploaded_file = UploadedFile(
             name=file.name,
-            file=file,
             file_type=file_type,
             file_size=file.size,
             uploaded_by=request.user if request.user.is_authenticated else None,
+            content_hash=getattr(request, "upload_content_hashes", {}).get("file", ""),
         )
+        # Identical content shares the stored file and its parsed metadata
+        duplicate = None
+        if uploaded_file.content_hash:
+            duplicate = uploaded_file.find_duplicate()
+        if duplicate is not None:
+            uploaded_file.file = duplicate.file.name
+            uploaded_file.headers = duplicate.headers
+            uploaded_file.row_count = duplicate.row_count
+            uploaded_file.column_profile = duplicate.column_profile
+            uploaded_file.save()
+            return JsonResponse(file_to_dict(uploaded_file, request), status=201)
+        uploaded_file.file = file
+        uploaded_file.save()
         # Parse headers and row count
         headers, row_count = parse_file_headers(uploaded_file, file_type)
         if headers is not None:
@@ -97,33 +162,119 @@ class FileUploadView(View):
         return JsonResponse(file_to_dict(uploaded_file, request), status=201)
 
 
+def encode_cursor(file_obj):
+    """Opaque keyset cursor pointing just past file_obj in listing order"""
+    value = f"{file_obj.uploaded_at.isoformat()}|{file_obj.pk}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        value = base64.urlsafe_b64decode(cursor.encode()).decode()
+        uploaded_at, pk = value.split("|")
+        return datetime.fromisoformat(uploaded_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed cursor: {e}") from e
+
+
 class FileListView(View):
-    """List uploaded files"""
+    """List uploaded files, newest first, one keyset page at a time"""
+
+    default_limit = 50
+    max_limit = 200
 
     def get(self, request):
-        files = UploadedFile.objects.all()
+        try:
+            limit = int(request.GET.get("limit", self.default_limit))
+            limit = min(max(1, limit), self.max_limit)
+            cursor = request.GET.get("cursor")
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return JsonResponse({"error": "Invalid limit or cursor"}, status=400)
+        fields = request.GET.get("fields")
+        fields = [f for f in fields.split(",") if f] if fields else None
+
+        files = (
+            UploadedFile.objects.select_related("uploaded_by")
+            .defer("column_profile")
+            .order_by("-uploaded_at", "-id")
+        )
+        if fields is not None and "headers" not in fields:
+            files = files.defer("headers")
         file_type = request.GET.get("file_type")
         if file_type:
             files = files.filter(file_type=file_type)
-        files_list = [file_to_dict(f, request) for f in files]
-        return JsonResponse(files_list, safe=False)
+        if after is not None:
+            uploaded_at, pk = after
+            files = files.filter(
+                Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=pk)
+            )
+        page = list(files[: limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        base_url = request.build_absolute_uri("/")
+        results = []
+        for file_obj in page:
+            data = file_to_dict(file_obj, request, base_url)
+            if fields is not None:
+                data = {key: data[key] for key in fields if key in data}
+            results.append(data)
+        return JsonResponse(
+            {
+                "results": results,
+                "next_cursor": encode_cursor(page[-1]) if has_more else None,
+            }
+        )
+
+
+def get_requested_file(request, pk):
+    """Fetch the UploadedFile for pk once per request, for the view and its hooks"""
+    if not hasattr(request, "_uploaded_file"):
+        request._uploaded_file = (
+            UploadedFile.objects.select_related("uploaded_by").filter(pk=pk).first()
+        )
+    return request._uploaded_file
+
+
+def file_etag(request, pk):
+    """Strong ETag from the file's identity; stored files are never rewritten,
+    so the request never has to read the file for it"""
+    file_obj = get_requested_file(request, pk)
+    if file_obj is None:
+        return None
+    uploaded_at = file_obj.uploaded_at.timestamp()
+    return f'"{file_obj.pk}-{file_obj.file_size}-{uploaded_at:.6f}"'
+
+
+def file_last_modified(request, pk):
+    file_obj = get_requested_file(request, pk)
+    return file_obj.uploaded_at if file_obj is not None else None
+
+
+def cacheable(response):
+    """Let browsers and proxies keep an immutable file response for a while"""
+    patch_cache_control(response, public=True, max_age=settings.FILE_CACHE_MAX_AGE)
+    return response
 
 
 class FileDetailView(View):
     """Get or delete file details"""
 
+    @method_decorator(
+        condition(etag_func=file_etag, last_modified_func=file_last_modified)
+    )
     def get(self, request, pk):
-        try:
-            file_obj = UploadedFile.objects.get(pk=pk)
-            return JsonResponse(file_to_dict(file_obj, request))
-        except UploadedFile.DoesNotExist:
+        file_obj = get_requested_file(request, pk)
+        if file_obj is None:
             return JsonResponse({"error": "File not found"}, status=404)
+        return cacheable(JsonResponse(file_to_dict(file_obj, request)))
 
     def delete(self, request, pk):
         try:
             file_obj = UploadedFile.objects.get(pk=pk)
-            if file_obj.file and os.path.isfile(file_obj.file.path):
-                os.remove(file_obj.file.path)
+            # UploadedFile.delete keeps the stored file while others share it
             file_obj.delete()
             return JsonResponse({}, status=204)
         except UploadedFile.DoesNotExist:
@@ -133,26 +284,90 @@ class FileDetailView(View):
 class FilePreviewView(View):
     """Preview file data"""
 
+    @method_decorator(
+        condition(etag_func=file_etag, last_modified_func=file_last_modified)
+    )
     def get(self, request, pk):
+        file_obj = get_requested_file(request, pk)
+        if file_obj is None:
+            return JsonResponse({"error": "File not found"}, status=404)
         try:
-            file_obj = UploadedFile.objects.get(pk=pk)
-            rows = int(request.GET.get("rows", 10))
+            rows = int(request.GET.get("limit", request.GET.get("rows", 10)))
             rows = min(max(1, rows), 100)
-            preview_data = get_file_preview(file_obj, file_obj.file_type, rows)
+            offset = max(0, int(request.GET.get("offset", 0)))
+        except ValueError:
+            return JsonResponse(
+                {"error": "Invalid rows, limit or offset parameter"}, status=400
+            )
+        columns = None
+        if request.GET.get("columns"):
+            try:
+                columns = parse_columns(request.GET["columns"], file_obj.headers)
+            except ValueError as e:
+                return JsonResponse({"error": str(e)}, status=400)
+        # Files never change, so the content hash pins the cached payload
+        cache_key = (
+            f"file-preview:{file_obj.pk}:{file_obj.content_hash}:{rows}:{offset}"
+        )
+        if columns is not None:
+            projection = json.dumps([str(column) for column in columns])
+            cache_key += ":" + hashlib.sha256(projection.encode()).hexdigest()
+        preview_data = cache.get(cache_key)
+        if preview_data is None:
+            preview_data = get_file_preview(
+                file_obj, file_obj.file_type, rows, offset=offset, columns=columns
+            )
             if preview_data is None:
                 return JsonResponse({"error": "Could not preview file"}, status=400)
-            return JsonResponse(
+            cache.set(cache_key, preview_data, settings.PREVIEW_CACHE_TIMEOUT)
+        return cacheable(
+            JsonResponse(
                 {
                     "file_info": file_to_dict(file_obj, request),
                     "preview_rows": len(preview_data),
+                    "offset": offset,
+                    "limit": rows,
                     "data": preview_data,
-                    "columns": file_obj.headers,
+                    "columns": columns if columns is not None else file_obj.headers,
                 }
             )
-        except UploadedFile.DoesNotExist:
-            return JsonResponse({"error": "File not found"}, status=404)
-        except ValueError:
-            return JsonResponse({"error": "Invalid rows parameter"}, status=400)
+        )
+
+
+def parse_instruction_request(request):
+    """Read the instruction and bypass_cache flag from a JSON or form body"""
+    try:
+        data = json.loads(request.body)
+        instruction = data.get("instruction", "").strip()
+        bypass_cache = bool(data.get("bypass_cache", False))
+    except json.JSONDecodeError:
+        instruction = request.POST.get("instruction", "").strip()
+        bypass_cache = request.POST.get("bypass_cache", "") == "true"
+    return instruction, bypass_cache
+
+
+def modification_preview_payload(llm_processor, modification, df, file_obj):
+    """Preview a modification, estimate its whole-file effect and build the payload"""
+    preview_df, preview_stats = llm_processor.preview_modification(
+        modification, df, preview_rows=10
+    )
+    preview_df = preview_df.fillna("")
+    preview_data = preview_df.to_dict("records")
+    return {
+        "modification": {
+            "column_name": modification.column_name,
+            "regex_pattern": modification.regex_pattern,
+            "replacement": modification.replacement,
+            "description": modification.description,
+            "confidence": modification.confidence,
+        },
+        "preview": {
+            "data": preview_data,
+            "stats": preview_stats,
+            "columns": list(preview_df.columns),
+        },
+        "impact": estimate_impact(file_obj, modification),
+    }
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -161,29 +376,22 @@ class ColumnModificationView(View):
 
     def post(self, request, pk):
         file_obj = UploadedFile.objects.get(pk=pk)
-        try:
-            data = json.loads(request.body)
-            instruction = data.get("instruction", "").strip()
-        except json.JSONDecodeError:
-            instruction = request.POST.get("instruction", "").strip()
+        instruction, bypass_cache = parse_instruction_request(request)
         if not instruction:
             return JsonResponse({"error": "Instruction is required"}, status=400)
         # Load file data
-        file_path = file_obj.file.path
-        if file_obj.file_type == "csv":
-            df = pd.read_csv(file_path)
-        elif file_obj.file_type == "excel":
-            if file_path.endswith(".xlsx"):
-                df = pd.read_excel(file_path, engine="openpyxl")
-            else:
-                df = pd.read_excel(file_path, engine="xlrd")
-        else:
+        if file_obj.file_type not in dict(UploadedFile.FILE_TYPE_CHOICES):
             return JsonResponse({"error": "Unsupported file type"}, status=400)
+        df = load_dataframe(file_obj)
         # Process with LLM
         llm_processor = LLMDataProcessor()
         try:
             modification = llm_processor.process_instruction(
-                instruction, df, file_id=file_obj.pk
+                instruction,
+                df,
+                file_id=file_obj.pk,
+                use_cache=not bypass_cache,
+                profile=ensure_column_profile(file_obj, df),
             )
         except Exception as e:
             return JsonResponse(
@@ -194,30 +402,167 @@ class ColumnModificationView(View):
                 status=500,
             )
         # Generate preview
-        preview_df, preview_stats = llm_processor.preview_modification(
-            modification, df, preview_rows=10
+        try:
+            payload = modification_preview_payload(
+                llm_processor, modification, df, file_obj
+            )
+        except RegexTimeoutError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        payload["file_info"] = file_to_dict(file_obj, request)
+        return JsonResponse(payload)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class BatchColumnModificationView(View):
+    """Process several LLM instructions for one file in a single LLM call"""
+
+    max_instructions = 20
+
+    def post(self, request, pk):
+        try:
+            file_obj = UploadedFile.objects.select_related("uploaded_by").get(pk=pk)
+        except UploadedFile.DoesNotExist:
+            return JsonResponse({"error": "File not found"}, status=404)
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        instructions = data.get("instructions")
+        if not isinstance(instructions, list) or not instructions:
+            return JsonResponse(
+                {"error": "instructions must be a non-empty list"}, status=400
+            )
+        instructions = [str(instruction).strip() for instruction in instructions]
+        if not all(instructions):
+            return JsonResponse({"error": "Instructions must not be empty"}, status=400)
+        if len(instructions) > self.max_instructions:
+            return JsonResponse(
+                {"error": f"At most {self.max_instructions} instructions per batch"},
+                status=400,
+            )
+        if file_obj.file_type not in dict(UploadedFile.FILE_TYPE_CHOICES):
+            return JsonResponse({"error": "Unsupported file type"}, status=400)
+        df = load_dataframe(file_obj)
+        llm_processor = LLMDataProcessor()
+        results = llm_processor.process_instructions(
+            instructions,
+            df,
+            file_id=file_obj.pk,
+            use_cache=not bool(data.get("bypass_cache", False)),
+            profile=ensure_column_profile(file_obj, df),
         )
-        preview_df = preview_df.fillna("")
-        preview_data = preview_df.to_dict("records")
+        payload = []
+        for result in results:
+            if result.modification is None:
+                payload.append(
+                    {"instruction": result.instruction, "error": result.error}
+                )
+                continue
+            try:
+                item = modification_preview_payload(
+                    llm_processor, result.modification, df, file_obj
+                )
+            except RegexTimeoutError as e:
+                item = {"error": str(e)}
+            item["instruction"] = result.instruction
+            payload.append(item)
         return JsonResponse(
-            {
-                "modification": {
-                    "column_name": modification.column_name,
-                    "regex_pattern": modification.regex_pattern,
-                    "replacement": modification.replacement,
-                    "description": modification.description,
-                    "confidence": modification.confidence,
-                },
-                "preview": {
-                    "data": preview_data,
-                    "stats": preview_stats,
-                    "columns": list(preview_df.columns),
-                },
-                "file_info": file_to_dict(file_obj, request),
-            }
+            {"results": payload, "file_info": file_to_dict(file_obj, request)}
         )
 
 
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncColumnModificationView(View):
+    """Async variant of ColumnModificationView for ASGI deployments.
+
+    The LLM call is awaited rather than holding a worker thread, and file
+    parsing and pandas work run in a thread pool off the event loop.
+    """
+
+    async def post(self, request, pk):
+        file_obj = (
+            await UploadedFile.objects.select_related("uploaded_by")
+            .filter(pk=pk)
+            .afirst()
+        )
+        if file_obj is None:
+            return JsonResponse({"error": "File not found"}, status=404)
+        instruction, bypass_cache = parse_instruction_request(request)
+        if not instruction:
+            return JsonResponse({"error": "Instruction is required"}, status=400)
+        if file_obj.file_type not in dict(UploadedFile.FILE_TYPE_CHOICES):
+            return JsonResponse({"error": "Unsupported file type"}, status=400)
+        df = await sync_to_async(load_dataframe, thread_sensitive=False)(file_obj)
+        profile = await aensure_column_profile(file_obj, df)
+        llm_processor = LLMDataProcessor()
+        try:
+            modification = await llm_processor.aprocess_instruction(
+                instruction,
+                df,
+                file_id=file_obj.pk,
+                use_cache=not bypass_cache,
+                profile=profile,
+            )
+        except Exception as e:
+            return JsonResponse(
+                {
+                    "error": "Failed to process instruction. Please try again.",
+                    "details": str(e),
+                },
+                status=500,
+            )
+        try:
+            payload = await sync_to_async(
+                modification_preview_payload, thread_sensitive=False
+            )(llm_processor, modification, df, file_obj)
+        except RegexTimeoutError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        payload["file_info"] = file_to_dict(file_obj, request)
+        return JsonResponse(payload)
+
+
+REQUIRED_MODIFICATION_FIELDS = [
+    "column_name",
+    "regex_pattern",
+    "replacement",
+    "description",
+]
+
+
+def parse_output_format(data, file_obj):
+    """The file type to write results as, by default the upload's own"""
+    output_format = data.get("output_format") or file_obj.file_type
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {', '.join(OUTPUT_FORMATS)}")
+    return output_format
+
+
+def parse_output_compression(data, output_format):
+    """The codec to compress the output with, or "" to leave it uncompressed"""
+    compression = data.get("output_compression") or ""
+    if compression and compression not in COMPRESSION_SUFFIXES:
+        codecs = ", ".join(COMPRESSION_SUFFIXES)
+        raise ValueError(f"output_compression must be one of {codecs}")
+    if compression and output_format != "csv":
+        raise ValueError("output_compression is only supported for CSV output")
+    return compression
+
+
+def parse_modification(modification_data, columns=None):
+    """Build a RegexModification from request data; raises ValueError if invalid"""
+    if not isinstance(modification_data, dict) or not all(
+        field in modification_data for field in REQUIRED_MODIFICATION_FIELDS
+    ):
+        raise ValueError("Missing modification data")
+    try:
+        modification = modification_from_dict(modification_data)
+    except re.error as e:
+        raise ValueError(f"Invalid regex: {e}")
+    if columns is not None and modification.column_name not in columns:
+        raise ValueError(f"Column '{modification.column_name}' not found")
+    return modification
+
+
 @method_decorator(csrf_exempt, name="dispatch")
 class ApplyModificationView(View):
     """Apply modification to entire file"""
@@ -226,67 +571,34 @@ class ApplyModificationView(View):
         file_obj = UploadedFile.objects.get(pk=pk)
         data = json.loads(request.body)
         modification_data = data.get("modification", {})
-        required_fields = [
-            "column_name",
-            "regex_pattern",
-            "replacement",
-            "description",
-        ]
-        if not all(field in modification_data for field in required_fields):
-            return JsonResponse({"error": "Missing modification data"}, status=400)
-        # Load file data
-        file_path = file_obj.file.path
-        if file_obj.file_type == "csv":
-            df = pd.read_csv(file_path)
-        elif file_obj.file_type == "excel":
-            if file_path.endswith(".xlsx"):
-                df = pd.read_excel(file_path, engine="openpyxl")
-            else:
-                df = pd.read_excel(file_path, engine="xlrd")
-        else:
+        if file_obj.file_type not in dict(UploadedFile.FILE_TYPE_CHOICES):
             return JsonResponse({"error": "Unsupported file type"}, status=400)
-        # Create modification object
-        from .llm_service import RegexModification
-
-        modification = RegexModification(
-            column_name=modification_data["column_name"],
-            regex_pattern=modification_data["regex_pattern"],
-            replacement=modification_data["replacement"],
-            description=modification_data["description"],
-            confidence=modification_data.get("confidence", 1.0),
-        )
-        # Apply modification
-        llm_processor = LLMDataProcessor()
-        modified_df, stats = llm_processor.apply_modification_to_file(modification, df)
-        # Save processed file
-        import tempfile
-
-        from django.core.files.base import ContentFile
-        from django.utils import timezone
-
-        base_name = os.path.splitext(file_obj.name)[0]
-        extension = ".csv" if file_obj.file_type == "csv" else ".xlsx"
-        processed_filename = f"{base_name}_processed_{timezone.now().strftime('%Y%m%d_%H%M%S')}{extension}"
-        with tempfile.NamedTemporaryFile(
-            mode="w+b", delete=False, suffix=extension
-        ) as temp_file:
-            if file_obj.file_type == "csv":
-                modified_df.to_csv(temp_file.name, index=False)
-            else:
-                modified_df.to_excel(temp_file.name, index=False)
-            temp_file.seek(0)
-            with open(temp_file.name, "rb") as f:
-                file_content = f.read()
-            processed_file = UploadedFile.objects.create(
-                name=processed_filename,
-                file=ContentFile(file_content, name=processed_filename),
-                file_type=file_obj.file_type,
-                file_size=len(file_content),
-                headers=list(modified_df.columns),
-                row_count=len(modified_df),
-                uploaded_by=file_obj.uploaded_by,
+        try:
+            modification = parse_modification(modification_data, file_obj.headers)
+            output_format = parse_output_format(data, file_obj)
+            compression = parse_output_compression(data, output_format)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        if data.get("background"):
+            job = ModificationJob.objects.create(
+                file=file_obj,
+                modification=asdict(modification),
+                output_format=output_format,
+                output_compression=compression,
+                total_rows=file_obj.row_count,
             )
-            os.unlink(temp_file.name)
+            modification_job_runner.submit(job)
+            job.refresh_from_db()
+            return JsonResponse({"job": job_to_dict(job, request)}, status=202)
+        try:
+            processed_file, stats = apply_modification_to_upload(
+                file_obj,
+                modification,
+                output_format=output_format,
+                compression=compression or None,
+            )
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
         return JsonResponse(
             {
                 "success": True,
@@ -300,3 +612,105 @@ class ApplyModificationView(View):
                 },
             }
         )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ApplyPipelineView(View):
+    """Apply an ordered list of modifications to entire file in one pass"""
+
+    max_steps = 20
+
+    def post(self, request, pk):
+        try:
+            file_obj = UploadedFile.objects.get(pk=pk)
+        except UploadedFile.DoesNotExist:
+            return JsonResponse({"error": "File not found"}, status=404)
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        steps = data.get("modifications")
+        if not isinstance(steps, list) or not steps:
+            return JsonResponse(
+                {"error": "modifications must be a non-empty list"}, status=400
+            )
+        if len(steps) > self.max_steps:
+            return JsonResponse(
+                {"error": f"At most {self.max_steps} modifications per pipeline"},
+                status=400,
+            )
+        if file_obj.file_type not in dict(UploadedFile.FILE_TYPE_CHOICES):
+            return JsonResponse({"error": "Unsupported file type"}, status=400)
+        try:
+            output_format = parse_output_format(data, file_obj)
+            compression = parse_output_compression(data, output_format)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        modifications = []
+        for index, step in enumerate(steps):
+            try:
+                modifications.append(parse_modification(step, file_obj.headers))
+            except ValueError as e:
+                return JsonResponse({"error": str(e), "step": index}, status=400)
+        if data.get("background"):
+            job = ModificationJob.objects.create(
+                file=file_obj,
+                modification=[asdict(modification) for modification in modifications],
+                output_format=output_format,
+                output_compression=compression,
+                total_rows=file_obj.row_count,
+            )
+            modification_job_runner.submit(job)
+            job.refresh_from_db()
+            return JsonResponse({"job": job_to_dict(job, request)}, status=202)
+        try:
+            processed_file, stats = apply_pipeline_to_upload(
+                file_obj,
+                modifications,
+                output_format=output_format,
+                compression=compression or None,
+            )
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return JsonResponse(
+            {
+                "success": True,
+                "processed_file": file_to_dict(processed_file, request),
+                "stats": stats,
+                "modifications": [
+                    {
+                        "column_name": modification.column_name,
+                        "regex_pattern": modification.regex_pattern,
+                        "replacement": modification.replacement,
+                        "description": modification.description,
+                    }
+                    for modification in modifications
+                ],
+            }
+        )
+
+
+class JobDetailView(View):
+    """Report progress and result of a background modification job"""
+
+    def get(self, request, pk):
+        try:
+            job = ModificationJob.objects.select_related("processed_file").get(pk=pk)
+        except ModificationJob.DoesNotExist:
+            return JsonResponse({"error": "Job not found"}, status=404)
+        return JsonResponse(job_to_dict(job, request))
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class JobCancelView(View):
+    """Cancel a background modification job"""
+
+    def post(self, request, pk):
+        try:
+            job = ModificationJob.objects.get(pk=pk)
+        except ModificationJob.DoesNotExist:
+            return JsonResponse({"error": "Job not found"}, status=404)
+        if job.status in ModificationJob.FINISHED_STATUSES:
+            return JsonResponse({"error": "Job already finished"}, status=409)
+        job = cancel_job(job)
+        return JsonResponse(job_to_dict(job, request))
@@ -156,3 +156,55 @@ CORS_ALLOW_CREDENTIALS = True
 FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 1024  # 1GB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 1024  # 1GB
 FILE_UPLOAD_TEMP_DIR = BASE_DIR / "temp_uploads"
+# Uploads are hashed as they stream in so duplicates can share stored files
+FILE_UPLOAD_HANDLERS = [
+    "data_processing.upload_handlers.HashingUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+# Parsed file cache: columnar (Parquet) copies of uploads reused across requests
+PARSED_FILE_CACHE_DIR = BASE_DIR / "parsed_cache"
+PARSED_FILE_CACHE_MAX_BYTES = int(
+    os.getenv("PARSED_FILE_CACHE_MAX_BYTES", "10737418240")
+)  # 10GB
+
+# LLM result cache: in-memory LRU in front of the LLMCacheEntry table
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "604800"))  # a week
+
+# LLM clients are pooled per process; LLM_PROVIDER selects the registered factory
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "google")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Wider tables only show the LLM this many columns, ranked by relevance
+LLM_PROMPT_MAX_COLUMNS = int(os.getenv("LLM_PROMPT_MAX_COLUMNS", "50"))
+
+# Background modification jobs: "thread" runs them on a local pool, "eager"
+# runs them inline and "external" leaves them to `manage.py run_modification_jobs`
+MODIFICATION_JOB_MODE = os.getenv("MODIFICATION_JOB_MODE", "thread")
+MODIFICATION_JOB_WORKERS = int(os.getenv("MODIFICATION_JOB_WORKERS", "2"))
+MODIFICATION_JOB_STALE_SECONDS = int(os.getenv("MODIFICATION_JOB_STALE_SECONDS", "300"))
+# Running jobs refresh their heartbeat this often, whatever their progress
+MODIFICATION_JOB_HEARTBEAT_SECONDS = int(
+    os.getenv("MODIFICATION_JOB_HEARTBEAT_SECONDS", "30")
+)
+# In "thread" mode, stale jobs are requeued and pending ones picked up this often
+MODIFICATION_JOB_POLL_SECONDS = int(os.getenv("MODIFICATION_JOB_POLL_SECONDS", "60"))
+
+# Response caching: previews are cached server-side and file responses carry
+# ETag/Last-Modified so clients revalidate with 304s after FILE_CACHE_MAX_AGE
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "rhombus-ai",
+    }
+}
+PREVIEW_CACHE_TIMEOUT = int(os.getenv("PREVIEW_CACHE_TIMEOUT", "3600"))
+FILE_CACHE_MAX_AGE = int(os.getenv("FILE_CACHE_MAX_AGE", "60"))
+
+# Regex replacements over more than 10k rows per worker are split across
+# this many worker processes; 1 keeps them in the request process
+REGEX_WORKERS = int(os.getenv("REGEX_WORKERS", "1"))
+# Wall-clock budget, per chunk, for replaces on Python's re; past it the
+# replace is killed and the request fails instead of pinning a CPU
+REGEX_TIME_BUDGET_SECONDS = float(os.getenv("REGEX_TIME_BUDGET_SECONDS", "10"))
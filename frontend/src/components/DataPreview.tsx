@@ -52,6 +52,13 @@ interface ModificationResult {
     };
     columns: string[];
   };
+  impact?: {
+    total_rows: number;
+    sampled_rows: number;
+    estimated_modification_rate: number;
+    confidence_interval: [number, number];
+    estimated_modified_rows: number;
+  } | null;
 }
 
 interface ProcessedFileInfo {
@@ -259,6 +266,23 @@ export function DataPreview({
                 </strong>{' '}
                 change rate
               </span>
+              {modificationResult.impact && (
+                <span>
+                  ~
+                  <strong>
+                    {modificationResult.impact.estimated_modified_rows}
+                  </strong>{' '}
+                  of {modificationResult.impact.total_rows} rows in file (
+                  {Math.round(
+                    modificationResult.impact.confidence_interval[0] * 100
+                  )}
+                  –
+                  {Math.round(
+                    modificationResult.impact.confidence_interval[1] * 100
+                  )}
+                  %)
+                </span>
+              )}
             </div>
           ) : (
             originalPreview && <div />
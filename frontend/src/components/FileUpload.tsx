@@ -81,10 +81,14 @@ export function FileUpload({ onFileUploaded, className }: FileUploadProps) {
     onDrop,
     accept: {
       'text/csv': ['.csv'],
+      'application/gzip': ['.csv.gz'],
+      'application/zstd': ['.csv.zst'],
       'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': [
         '.xlsx',
       ],
       'application/vnd.ms-excel': ['.xls'],
+      'application/vnd.apache.parquet': ['.parquet'],
+      'application/vnd.apache.arrow.file': ['.feather', '.arrow'],
     },
     multiple: false,
     disabled: uploading,
@@ -123,7 +127,8 @@ export function FileUpload({ onFileUploaded, className }: FileUploadProps) {
               Drag & drop a file here, or click to select
             </p>
             <p className="text-xs text-muted-foreground">
-              Supports CSV, XLSX, and XLS files (max 1GB)
+              Supports CSV (also .gz or .zst), XLSX, XLS, Parquet and Feather
+              files (max 1GB)
             </p>
           </div>
         )}
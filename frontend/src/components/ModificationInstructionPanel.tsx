@@ -35,6 +35,13 @@ interface ModificationResult {
     };
     columns: string[];
   };
+  impact?: {
+    total_rows: number;
+    sampled_rows: number;
+    estimated_modification_rate: number;
+    confidence_interval: [number, number];
+    estimated_modified_rows: number;
+  } | null;
 }
 
 interface ModificationInstructionPanelProps {
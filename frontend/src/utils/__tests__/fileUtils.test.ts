@@ -30,6 +30,9 @@ describe('fileUtils', () => {
       expect(isValidFileType('test.xls')).toBe(true);
       expect(isValidFileType('TEST.CSV')).toBe(true);
       expect(isValidFileType('data.XLSX')).toBe(true);
+      expect(isValidFileType('data.parquet')).toBe(true);
+      expect(isValidFileType('data.csv.gz')).toBe(true);
+      expect(isValidFileType('data.feather')).toBe(true);
     });
 
     it('should return false for invalid file types', () => {
@@ -63,6 +66,9 @@ describe('fileUtils', () => {
       expect(getFileType('test.xls')).toBe('excel');
       expect(getFileType('TEST.CSV')).toBe('csv');
       expect(getFileType('data.XLSX')).toBe('excel');
+      expect(getFileType('data.parquet')).toBe('parquet');
+      expect(getFileType('data.csv.zst')).toBe('csv');
+      expect(getFileType('data.arrow')).toBe('feather');
     });
   });
 
@@ -86,7 +92,9 @@ describe('fileUtils', () => {
 
       const result = validateFile(file);
       expect(result.isValid).toBe(false);
-      expect(result.error).toBe('Please upload a CSV or Excel file');
+      expect(result.error).toBe(
+        'Please upload a CSV, Excel, Parquet or Feather file'
+      );
     });
 
     it('should reject oversized file', () => {
@@ -3,6 +3,7 @@
  */
 
 import config from '@/config/env';
+import { getFileType } from './fileUtils';
 
 /**
  * Builds API URL for file operations
@@ -35,8 +36,7 @@ export function createUploadFormData(file: File): FormData {
   formData.append('file', file);
 
   // Determine file type based on extension
-  const fileType = file.name.toLowerCase().endsWith('.csv') ? 'csv' : 'excel';
-  formData.append('file_type', fileType);
+  formData.append('file_type', getFileType(file.name));
 
   return formData;
 }
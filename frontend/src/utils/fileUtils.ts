@@ -21,7 +21,16 @@ export function formatFileSize(bytes: number): string {
  * @returns Boolean indicating if file type is valid
  */
 export function isValidFileType(fileName: string): boolean {
-  const validTypes = ['.csv', '.xlsx', '.xls'];
+  const validTypes = [
+    '.csv',
+    '.csv.gz',
+    '.csv.zst',
+    '.xlsx',
+    '.xls',
+    '.parquet',
+    '.feather',
+    '.arrow',
+  ];
   return validTypes.some((type) => fileName.toLowerCase().endsWith(type));
 }
 
@@ -41,10 +50,16 @@ export function isValidFileSize(
 /**
  * Gets file type from file name
  * @param fileName - Name of the file
- * @returns File type ('csv' or 'excel')
+ * @returns File type ('csv', 'excel', 'parquet' or 'feather')
  */
-export function getFileType(fileName: string): 'csv' | 'excel' {
-  return fileName.toLowerCase().endsWith('.csv') ? 'csv' : 'excel';
+export function getFileType(
+  fileName: string
+): 'csv' | 'excel' | 'parquet' | 'feather' {
+  const name = fileName.toLowerCase();
+  if (/\.csv(\.gz|\.zst)?$/.test(name)) return 'csv';
+  if (name.endsWith('.parquet')) return 'parquet';
+  if (name.endsWith('.feather') || name.endsWith('.arrow')) return 'feather';
+  return 'excel';
 }
 
 /**
@@ -58,7 +73,10 @@ export function validateFile(
   maxSizeMB: number = 1024
 ): { isValid: boolean; error?: string } {
   if (!isValidFileType(file.name)) {
-    return { isValid: false, error: 'Please upload a CSV or Excel file' };
+    return {
+      isValid: false,
+      error: 'Please upload a CSV, Excel, Parquet or Feather file',
+    };
   }
 
   if (!isValidFileSize(file.size, maxSizeMB)) {